@@ -3,19 +3,62 @@
 """Universidad de Salamanca - Raúl Rengel Estévez"""
 """Versión 2.0"""
 
-import csv
+import time
+_INICIO = time.perf_counter()
+
+import argparse
+import os
+import queue
+import sqlite3
+import sys
 import tkinter as tk
-import nidaqmx.system
-import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 from tkinter import ttk
 from tkinter import scrolledtext as st
-from tkinter.filedialog import asksaveasfilename
-from matplotlib.backends.backend_tkagg import (FigureCanvasTkAgg, NavigationToolbar2Tk)
+from tkinter.filedialog import askdirectory, askopenfilename, askopenfilenames, asksaveasfilename
+from tkinter.messagebox import askyesno
 import threading
 from datetime import datetime
+from backend import ErrorDispositivo, RegistroDispositivos, crear_backend, comparar_latencia
+from parametros import VALORES_POR_DEFECTO, parametros_por_defecto
+
+# Cada cuánto se comprueba si se ha conectado o desconectado un myDAQ (ms)
+INTERVALO_VIGILANCIA = 2000
+
+# matplotlib, numpy y el driver del myDAQ tardan en cargarse: se importan
+# la primera vez que hacen falta, con la ventana ya abierta
+
+ETIQUETAS = {
+    "I-V Diodo": ("$V_{pn}$ (V)", "$I_d$ (mA)", None),
+    "Id-Vds MOS": ("$V_{DS}$ (V)", "$I_D$ (mA)", "VGS = {:.2f} V"),
+    "Id-Vgs MOS": ("$V_{GS}$ (V)", "$I_D$ (mA)", "VDS = {:.2f} V"),
+    "Ic-Vce BJT": ("$V_{CE}$ (V)", "$I_C$ (mA)", "IB = {:.2f} µA"),
+}
+
+def _matplotlib():
+    """Importa matplotlib para dibujar dentro de Tk"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+    return plt, FigureCanvasTkAgg, NavigationToolbar2Tk
+
+def _estilo_linea(linea, tipografica):
+    """Alterna una curva entre línea continua y puntos sin redibujarla"""
+    if tipografica == "Línea":
+        linea.set_linestyle('-')
+        linea.set_marker('None')
+    else:
+        linea.set_linestyle('None')
+        linea.set_marker('o')
+        linea.set_markersize(4.5)
+
+def _mostrar_texto(caja, texto):
+    """Sustituye el texto de una caja de solo lectura y la lleva al final"""
+    caja.configure(state='normal')
+    caja.delete('1.0', tk.END)
+    caja.insert(tk.END, texto)
+    caja.see(tk.END)
+    caja.configure(state='disabled')
 
 class BoundText(tk.Text):
     """Un widget de texto junto con una variable ligada"""
@@ -40,6 +83,56 @@ class BoundText(tk.Text):
             self._variable.set(content)
             self.edit_modified(False)
             
+class Consola(st.ScrolledText):
+    """Consola de solo lectura que puede escribirse desde cualquier hilo
+    
+    Los textos se encolan y el bucle de Tk los inserta con after() a un
+    ritmo fijo, todos los de un fotograma en una sola llamada. Solo se
+    conservan las últimas max_lineas líneas.
+    """
+    
+    def __init__(self, *args, fps=25, max_lineas=2000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_lineas = max_lineas
+        self._periodo = int(1000/fps)
+        self._cola = queue.SimpleQueue()
+        self._colores = set()
+        self.after(self._periodo, self._vaciar)
+        
+    def escribir(self, text, *color):
+        self._cola.put((text, color[0] if color else None))
+        
+    def limpiar(self):
+        """Borra la consola y lo pendiente. Solo desde el hilo de Tk"""
+        while not self._cola.empty():
+            self._cola.get_nowait()
+        self.configure(state='normal')
+        self.delete('1.0', tk.END)
+        self.configure(state='disabled')
+        
+    def _vaciar(self):
+        trozos = []
+        while not self._cola.empty():
+            text, color = self._cola.get_nowait()
+            if color not in self._colores and color is not None:
+                self.tag_config(color, foreground=color)
+                self._colores.add(color)
+            if trozos and trozos[-1] == (color or ()):
+                trozos[-2] += text
+            else:
+                trozos.extend([text, color or ()])
+        
+        if trozos:
+            self.configure(state='normal')
+            self.insert(tk.END, *trozos)
+            lineas = int(self.index('end-1c').split('.')[0])
+            if lineas > self.max_lineas:
+                self.delete('1.0', '{}.0'.format(lineas - self.max_lineas + 1))
+            self.see(tk.END)
+            self.configure(state='disabled')
+        self.after(self._periodo, self._vaciar)
+
+            
 class LabelInput(tk.Frame):
     """Widget que contiene una etiqueta y una entrada juntas"""
     def __init__(
@@ -107,24 +200,33 @@ class DataRecordForm(ttk.Frame):
             'VGS Max': tk.DoubleVar(),
             'IncrementoVGS': tk.DoubleVar(),
             'Valor de R (Ohm)': tk.DoubleVar(),
+            'Temporizado por hardware': tk.BooleanVar(),
+            'Frecuencia (S/s)': tk.DoubleVar(),
+            'Registro continuo': tk.BooleanVar(),
+            'Barrido adaptativo': tk.BooleanVar(),
+            'Tolerancia (mA)': tk.DoubleVar(),
+            'Puntos máximos': tk.IntVar(),
+            'Muestras por punto': tk.IntVar(),
+            'Muestras con señal baja': tk.IntVar(),
+            'Umbral señal baja (mA)': tk.DoubleVar(),
+            'Promedio': tk.StringVar(),
+            'Asentamiento': tk.StringVar(),
+            'Tolerancia asentamiento (mV)': tk.DoubleVar(),
+            'Espera máxima (ms)': tk.DoubleVar(),
+            'Orden': tk.StringVar(),
+            'Repeticiones': tk.IntVar(),
             'Consola': tk.StringVar()
         }
 
-        self._vars["VDD Min"].set(-2)
-        self._vars["VDD Max"].set(2)
-        self._vars["Incremento"].set(0.02)
-        self._vars["Valor de R (Ohm)"].set(100)
-
-        self._vars["VGS Min"].set(0)
-        self._vars["VGS Max"].set(5)
-        self._vars["IncrementoVGS"].set(0.5)
+        for clave, valor in parametros_por_defecto("I-V Diodo").items():
+            self._vars[clave].set(valor)
         
         t_select = self._add_frame("Tipo de medida")
         
         LabelInput(
             t_select, "Selección de la medida a realizar", input_class=ttk.Radiobutton,
             var=self._vars['Tipo de medida'],
-            input_args={"values": ["I-V Diodo", "Id-Vds MOS", "Id-Vgs MOS", "Ic-Vce BJT"]}
+            input_args={"values": ["I-V Diodo", "Id-Vds MOS", "Id-Vgs MOS", "Ic-Vce BJT", "Superficie MOS"]}
             ).grid(row=0, column=0)
              
         LabelInput(
@@ -185,8 +287,95 @@ class DataRecordForm(ttk.Frame):
         
         self.resistencia.grid(row=2, column=0)
         
+        LabelInput(
+            p_select, "Temporizado por hardware",
+            input_class=ttk.Checkbutton, var=self._vars['Temporizado por hardware']
+            ).grid(row=3, column=0)
+        
+        LabelInput(
+            p_select, "Frecuencia (S/s)",
+            input_class=ttk.Spinbox, var=self._vars['Frecuencia (S/s)'],
+            input_args={"from_": 1, "to": 100000, "increment": 100}
+            ).grid(row=3, column=1)
+        
+        LabelInput(
+            p_select, "Registro continuo en disco",
+            input_class=ttk.Checkbutton, var=self._vars['Registro continuo']
+            ).grid(row=3, column=2)
+        
+        LabelInput(
+            p_select, "Barrido adaptativo",
+            input_class=ttk.Checkbutton, var=self._vars['Barrido adaptativo']
+            ).grid(row=4, column=0)
+        
+        LabelInput(
+            p_select, "Tolerancia (mA)",
+            input_class=ttk.Spinbox, var=self._vars['Tolerancia (mA)'],
+            input_args={"from_": 0.001, "to": 10, "increment": .01}
+            ).grid(row=4, column=1)
+        
+        LabelInput(
+            p_select, "Puntos máximos por curva",
+            input_class=ttk.Spinbox, var=self._vars['Puntos máximos'],
+            input_args={"from_": 2, "to": 10000, "increment": 10}
+            ).grid(row=4, column=2)
+        
+        LabelInput(
+            p_select, "Muestras por punto",
+            input_class=ttk.Spinbox, var=self._vars['Muestras por punto'],
+            input_args={"from_": 1, "to": 10000, "increment": 1}
+            ).grid(row=5, column=0)
+        
+        LabelInput(
+            p_select, "Muestras con señal baja",
+            input_class=ttk.Spinbox, var=self._vars['Muestras con señal baja'],
+            input_args={"from_": 1, "to": 10000, "increment": 1}
+            ).grid(row=5, column=1)
+        
+        LabelInput(
+            p_select, "Umbral señal baja (mA)",
+            input_class=ttk.Spinbox, var=self._vars['Umbral señal baja (mA)'],
+            input_args={"from_": 0, "to": 16, "increment": .01}
+            ).grid(row=5, column=2)
+        
+        LabelInput(
+            p_select, "Promedio",
+            input_class=ttk.Combobox, var=self._vars['Promedio'],
+            input_args={"values": ["media", "mediana", "recortada"], "state": "readonly"}
+            ).grid(row=6, column=0)
+        
+        LabelInput(
+            p_select, "Asentamiento",
+            input_class=ttk.Combobox, var=self._vars['Asentamiento'],
+            input_args={"values": ["ninguno", "sondeo", "aprendido"], "state": "readonly"}
+            ).grid(row=6, column=1)
+        
+        LabelInput(
+            p_select, "Tolerancia asentamiento (mV)",
+            input_class=ttk.Spinbox, var=self._vars['Tolerancia asentamiento (mV)'],
+            input_args={"from_": 0.01, "to": 100, "increment": .1}
+            ).grid(row=6, column=2)
+        
+        LabelInput(
+            p_select, "Espera máxima (ms)",
+            input_class=ttk.Spinbox, var=self._vars['Espera máxima (ms)'],
+            input_args={"from_": 1, "to": 10000, "increment": 10}
+            ).grid(row=7, column=0)
+        
+        LabelInput(
+            p_select, "Orden de las curvas",
+            input_class=ttk.Combobox, var=self._vars['Orden'],
+            input_args={"values": ["ascendente", "serpentina"], "state": "readonly"}
+            ).grid(row=7, column=1)
+        
+        LabelInput(
+            p_select, "Repeticiones",
+            input_class=ttk.Spinbox, var=self._vars['Repeticiones'],
+            input_args={"from_": 1, "to": 1000, "increment": 1}
+            ).grid(row=7, column=2)
+        
         c_frame = self._add_frame("Consola")
-        self.consola = st.ScrolledText(c_frame, width = 75, height= 10)
+        self.consola = Consola(c_frame, width = 75, height= 10)
         self.consola.configure(state='disabled',background="whitesmoke")
         self.consola.grid(sticky=tk.W, row=0, column=0)
         
@@ -197,13 +386,33 @@ class DataRecordForm(ttk.Frame):
             buttons, text="Dibujar gráfica", command=self.master._on_plot)
         self.graphbutton.pack(side=tk.RIGHT)
         
+        self.livebutton = ttk.Button(
+            buttons, text="En vivo", command=self.master._on_liveplot)
+        self.livebutton.pack(side=tk.RIGHT)
+        
         self.savebutton = ttk.Button(
             buttons, text="Guardar", command=self.master._on_save)
         self.savebutton.pack(side=tk.RIGHT)
         
-        # self.stopbutton = ttk.Button(
-        #     buttons, text="Parar", command=self.master.stopthread)
-        # self.stopbutton.pack(side=tk.RIGHT)
+        self.openbutton = ttk.Button(
+            buttons, text="Abrir", command=self.master._on_open)
+        self.openbutton.pack(side=tk.RIGHT)
+        
+        self.catalogbutton = ttk.Button(
+            buttons, text="Catálogo", command=self.master._on_catalogo)
+        self.catalogbutton.pack(side=tk.RIGHT)
+        
+        self.stopbutton = ttk.Button(
+            buttons, text="Parar", command=self.master._on_stop)
+        self.stopbutton.pack(side=tk.RIGHT)
+        
+        self.pausebutton = ttk.Button(
+            buttons, text="Pausa", command=self.master._on_pause)
+        self.pausebutton.pack(side=tk.RIGHT)
+        
+        self.stationsbutton = ttk.Button(
+            buttons, text="Estaciones", command=self.master._on_estaciones)
+        self.stationsbutton.pack(side=tk.RIGHT)
         
         self.measurebutton = ttk.Button(
             buttons, text="Medir", command=self.master.threading)
@@ -216,11 +425,14 @@ class DataRecordForm(ttk.Frame):
         
 
     def _show_widgets(self, *_):
-        if self._vars["Tipo de medida"].get()=="I-V Diodo":
-            self._vars["VDD Min"].set(-2)
-            self._vars["VDD Max"].set(2)
-            self._vars["Incremento"].set(0.02)
-            self._vars["Valor de R (Ohm)"].set(100)
+        tipo = self._vars["Tipo de medida"].get()
+        if tipo in VALORES_POR_DEFECTO:
+            # Los mismos valores propuestos que en los lotes
+            defecto = parametros_por_defecto(tipo)
+            for clave in VALORES_POR_DEFECTO[tipo]:
+                self._vars[clave].set(defecto[clave])
+
+        if tipo=="I-V Diodo":
             self.vddmax.label.config(text='VDD Máximo')
             self.vddmin.grid(row=0, column=0)
             self.vddmax.grid(row=0, column=1)
@@ -229,19 +441,13 @@ class DataRecordForm(ttk.Frame):
             self.vgsmin.grid_forget()
             self.vgsmax.grid_forget()
             self.incrementovgs.grid_forget()
-            self.consola.configure(state='normal')
-            self.consola.delete('1.0', tk.END)
-            self.consola.configure(state='disabled')
+            self.consola.limpiar()
             self.master._console_print(self.consola,"Seleccionada medida I-V del diodo\n","green")
             self.master._console_print(self.consola,"Asegúrese de que el primer interruptor está en MOSFET/Diode\n","green")
             self.master._console_print(self.consola,"Asegúrese de que el segundo interruptor está en Diode\n","green")
-            self.master.medida_output=""
+            self.master.medida_output=None
 
-        elif self._vars["Tipo de medida"].get()=="Id-Vds MOS":
-            self._vars["VDD Min"].set(0)
-            self._vars["VDD Max"].set(10)
-            self._vars["Incremento"].set(0.2)
-            self._vars["Valor de R (Ohm)"].set(100)
+        elif tipo=="Id-Vds MOS":
             self.vddmin.grid(row=0, column=0)
             self.vddmax.grid(row=0, column=1)
             self.incremento.grid(row=0, column=2)
@@ -252,26 +458,14 @@ class DataRecordForm(ttk.Frame):
             self.vgsmin.label.config(text='VGS Mínimo')
             self.vgsmax.label.config(text='VGS Máximo')
             self.incrementovgs.grid(row=1, column=2)
-            self._vars["VGS Min"].set(0)
-            self._vars["VGS Max"].set(5)
-            self._vars["IncrementoVGS"].set(0.5)
             self.resistencia.grid(row=2, column=0)
-            self.consola.configure(state='normal')
-            self.consola.delete('1.0', tk.END)
-            self.consola.configure(state='disabled')
+            self.consola.limpiar()
             self.master._console_print(self.consola,"Seleccionada medida Id-Vds del MOSFET\n","green")
             self.master._console_print(self.consola,"Asegúrese de que el primer interruptor está en MOSFET/Diode\n","green")
             self.master._console_print(self.consola,"Asegúrese de que el segundo interruptor está en MOSFET\n","green")
-            self.master.medida_output=""
+            self.master.medida_output=None
             
-        elif self._vars["Tipo de medida"].get()=="Id-Vgs MOS":
-            self._vars["VDD Min"].set(1)
-            self._vars["VDD Max"].set(5)
-            self._vars["Incremento"].set(1)
-            self._vars["VGS Min"].set(-2)
-            self._vars["VGS Max"].set(5)
-            self._vars["IncrementoVGS"].set(0.05)
-            self._vars["Valor de R (Ohm)"].set(100)
+        elif tipo=="Id-Vgs MOS":
             self.vddmin.label.config(text='VDS Mínimo')
             self.vddmax.label.config(text='VDS Máximo')
             self.vgsmin.label.config(text='VGS Mínimo')
@@ -283,19 +477,13 @@ class DataRecordForm(ttk.Frame):
             self.vgsmax.grid(row=1, column=1)
             self.incrementovgs.grid(row=1, column=2)
             self.resistencia.grid(row=2, column=0)
-            self.consola.configure(state='normal')
-            self.consola.delete('1.0', tk.END)
-            self.consola.configure(state='disabled')
+            self.consola.limpiar()
             self.master._console_print(self.consola,"Seleccionada medida Id-Vgs del MOSFET\n","green")
             self.master._console_print(self.consola,"Asegúrese de que el primer interruptor está en MOSFET/Diode\n","green")
             self.master._console_print(self.consola,"Asegúrese de que el segundo interruptor está en MOSFET\n","green")
-            self.master.medida_output=""
+            self.master.medida_output=None
 
-        elif self._vars["Tipo de medida"].get()=="Ic-Vce BJT":
-            self._vars["VDD Min"].set(0)
-            self._vars["VDD Max"].set(5)
-            self._vars["Incremento"].set(0.1)
-            self._vars["Valor de R (Ohm)"].set(100)
+        elif tipo=="Ic-Vce BJT":
             self.vddmin.grid(row=0, column=0)
             self.vddmax.grid(row=0, column=1)
             self.incremento.grid(row=0, column=2)
@@ -306,21 +494,458 @@ class DataRecordForm(ttk.Frame):
             self.vgsmin.label.config(text='IB (µA) Mínima')
             self.vgsmax.label.config(text='IB (µA) Máxima')
             self.incrementovgs.grid(row=1, column=2)
-            self._vars["VGS Min"].set(0)
-            self._vars["VGS Max"].set(50)
-            self._vars["IncrementoVGS"].set(10)
             self.resistencia.grid_forget()
-            self.consola.configure(state='normal')
-            self.consola.delete('1.0', tk.END)
-            self.consola.configure(state='disabled')
+            self.consola.limpiar()
             self.master._console_print(self.consola,"Seleccionada medida Ic-Vce del BJT\n","green")
             self.master._console_print(self.consola,"Asegúrese de que el primer interruptor está en BJT\n","green")
-            self.master.medida_output=""
+            self.master.medida_output=None
+
+        elif tipo=="Superficie MOS":
+            self.vddmin.grid(row=0, column=0)
+            self.vddmax.grid(row=0, column=1)
+            self.incremento.grid(row=0, column=2)
+            self.vgsmin.grid(row=1, column=0)
+            self.vgsmax.grid(row=1, column=1)
+            self.vddmin.label.config(text='VDS Mínimo')
+            self.vddmax.label.config(text='VDS Máximo')
+            self.vgsmin.label.config(text='VGS Mínimo')
+            self.vgsmax.label.config(text='VGS Máximo')
+            self.incrementovgs.grid(row=1, column=2)
+            self.resistencia.grid(row=2, column=0)
+            self.consola.limpiar()
+            self.master._console_print(self.consola,"Seleccionada superficie ID(VGS, VDS) del MOSFET\n","green")
+            self.master._console_print(self.consola,"Se obtienen las características de salida y de transferencia con una sola medida\n","green")
+            self.master._console_print(self.consola,"Asegúrese de que el primer interruptor está en MOSFET/Diode\n","green")
+            self.master._console_print(self.consola,"Asegúrese de que el segundo interruptor está en MOSFET\n","green")
+            self.master.medida_output=None
 
         
+class GraficaEnVivo(tk.Toplevel):
+    """Gráfica que se va completando mientras se mide
+    
+    Sigue la medida en curso de la aplicación. En cada refresco alarga las
+    líneas de las curvas con los puntos nuevos, que son vistas de la medida
+    sin copias salvo si hay que ordenarlas, crea una línea por cada curva
+    que empieza y pide un redibujado con draw_idle, como mucho fps veces
+    por segundo.
+    """
+    
+    def __init__(self, app, fps=10):
+        super().__init__(app)
+        self.title("Medida en curso")
+        self.app = app
+        self._periodo = int(1000/fps)
+        plt, FigureCanvasTkAgg, _ = _matplotlib()
+        self.fig = plt.Figure()
+        self.ax = self.fig.add_subplot(111)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
+        self.canvas.get_tk_widget().grid(sticky=tk.W + tk.E, row=0)
+        self.parametros = st.ScrolledText(self, width=75, height=4)
+        self.parametros.configure(state='disabled', background="whitesmoke")
+        self.parametros.grid(sticky=tk.W + tk.E, row=1)
+        self._medida = None
+        self._lineas = []
+        self._dibujados = []
+        self._analizadas = 0
+        self._after = self.after(self._periodo, self._actualizar)
+        
+    def destroy(self):
+        self.after_cancel(self._after)
+        super().destroy()
+        
+    def _reiniciar(self):
+        self.ax.clear()
+        self.ax.set_axisbelow(True)
+        self.ax.grid(visible=True, which='major', color='gainsboro', linestyle='-')
+        self._lineas = []
+        self._dibujados = []
+        self._analizadas = 0
+        _mostrar_texto(self.parametros, "")
+        if self._medida is not None:
+            xlabel, ylabel, leyenda = ETIQUETAS[self._medida.tipo]
+            self.ax.set_xlabel(xlabel)
+            self.ax.set_ylabel(ylabel)
+            self.fig.subplots_adjust(right=0.73 if leyenda else 0.85)
+        self.canvas.draw_idle()
+        
+    def _actualizar(self):
+        medida = self.app.medida_output
+        if medida is not self._medida:
+            self._medida = medida
+            self._reiniciar()
+        
+        if medida is not None:
+            leyenda = ETIQUETAS[medida.tipo][2]
+            while len(self._lineas) < medida.ncurvas:
+                linea, = self.ax.plot([], [])
+                self._lineas.append(linea)
+                self._dibujados.append(0)
+            
+            cambios = nuevas = False
+            for i, linea in enumerate(self._lineas):
+                n = medida.n[i]
+                if n != self._dibujados[i]:
+                    x, y = medida.columna(1, i), medida.columna(2, i)
+                    # El barrido adaptativo rellena huecos entre puntos ya
+                    # medidos: se ordena por x para no dibujar zigzags
+                    paso = x[1:] - x[:-1]
+                    if (paso < 0).any() and (paso > 0).any():
+                        orden = x.argsort(kind='stable')
+                        x, y = x[orden], y[orden]
+                    linea.set_data(x, y)
+                    if leyenda and self._dibujados[i] == 0:
+                        linea.set_label(leyenda.format(medida.valor_parametro(i)))
+                        nuevas = True
+                    self._dibujados[i] = n
+                    cambios = True
+            
+            if cambios:
+                self.ax.relim()
+                self.ax.autoscale_view()
+                if nuevas:
+                    self.ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
+                self.canvas.draw_idle()
+            
+            # Cada curva se analiza en cuanto termina: al empezar la
+            # siguiente o al acabar la medida
+            terminadas = medida.ncurvas if medida.fin is not None else max(medida.ncurvas - 1, 0)
+            if terminadas != self._analizadas:
+                from analisis import resumen
+                self._analizadas = terminadas
+                _mostrar_texto(self.parametros, resumen(medida, terminadas))
+        
+        self._after = self.after(self._periodo, self._actualizar)
+
+
+class Estaciones(tk.Toplevel):
+    """Estado de las medidas repartidas entre todos los myDAQ conectados
+
+    Cada dispositivo mide en su propio proceso con su cola de medidas. La
+    tabla muestra por dispositivo su número de serie, qué está haciendo, la
+    pieza en curso y las medidas hechas, fallidas y pendientes. Los avisos
+    de los procesos se recogen con after(), sin bloquear la ventana.
+    """
+
+    COLUMNAS = (("serie", "Serie"), ("estado", "Estado"), ("ref", "Pieza"),
+                ("hechas", "Hechas"), ("fallidas", "Fallidas"), ("pendientes", "Pendientes"))
+
+    def __init__(self, app, periodo=200):
+        super().__init__(app)
+        self.title("Estaciones de medida")
+        self.app = app
+        self._periodo = periodo
+        self.planificador = None
+        self.tabla = ttk.Treeview(self, columns=[c for c, _ in self.COLUMNAS], height=6)
+        self.tabla.heading("#0", text="Dispositivo")
+        for columna, titulo in self.COLUMNAS:
+            self.tabla.heading(columna, text=titulo)
+            self.tabla.column(columna, width=90, anchor=tk.CENTER)
+        self.tabla.grid(sticky=tk.W + tk.E, row=0, padx=10, pady=10)
+        botones = tk.Frame(self)
+        botones.grid(sticky=tk.W + tk.E, row=1, padx=10, pady=(0, 10))
+        ttk.Button(botones, text="Cargar receta", command=self._on_receta).pack(side=tk.RIGHT)
+        self.protocol("WM_DELETE_WINDOW", self._on_cerrar)
+        self._after = None
+
+    def ocupadas(self):
+        return self.planificador is not None and self.planificador.pendientes() > 0
+
+    def _on_receta(self):
+        """Reparte las medidas de una receta entre los dispositivos"""
+        filename = askopenfilename(filetypes=[('Recetas', '*.toml *.json')])
+        if filename == "":
+            return
+        from lote import cargar_receta
+        consola = self.app.recordform.consola
+        try:
+            medidas = cargar_receta(filename)
+        except (OSError, ValueError) as error:
+            self.app._console_print(consola, "Receta no válida: {}\n".format(error), 'red')
+            return
+        if self.app._midiendo():
+            self.app._console_print(consola, "Espere a que termine la medida en curso\n", 'red')
+            return
+        if self.planificador is None:
+            from planificador import Planificador
+            self.planificador = Planificador(self.app._simulado)
+            dispositivos = self.planificador.iniciar()
+            if not dispositivos:
+                self.planificador = None
+                self.app._console_print(consola, "No hay ningún myDAQ conectado\n", 'red')
+                return
+            for dispositivo in dispositivos:
+                self.tabla.insert("", tk.END, iid=dispositivo, text=dispositivo)
+            self._after = self.after(self._periodo, self._actualizar)
+        for parametros, salida in medidas:
+            self.planificador.encargar(parametros, salida)
+        self.app._console_print(consola, "{} medidas repartidas entre {} dispositivos\n".format(
+            len(medidas), len(self.planificador.estado)), 'green')
+        self._mostrar()
+
+    def _mostrar(self):
+        for dispositivo, estado in self.planificador.estado.items():
+            self.tabla.item(dispositivo, values=[estado[c] for c, _ in self.COLUMNAS])
+
+    def _actualizar(self):
+        consola = self.app.recordform.consola
+        mensajes, resultados = self.planificador.recoger()
+        for dispositivo, (texto, color) in mensajes:
+            self.app._console_print(consola, "[{}] {}".format(dispositivo, texto), color)
+        for dispositivo, resultado in resultados:
+            if resultado["error"]:
+                self.app._console_print(consola, "[{}] Error en la medida {}: {}\n".format(
+                    dispositivo, resultado["ref"], resultado["error"]), 'red')
+            else:
+                self.app.medida_output = resultado["medida"]
+        if mensajes or resultados:
+            self._mostrar()
+        self._after = self.after(self._periodo, self._actualizar)
+
+    def _on_cerrar(self):
+        if self.ocupadas() and not askyesno("Estaciones de medida",
+                                            "Quedan medidas pendientes. ¿Esperar a que terminen y cerrar?"):
+            return
+        if self._after is not None:
+            self.after_cancel(self._after)
+        if self.planificador is not None:
+            self.planificador.terminar()
+        self.destroy()
+
+
+class ExploradorCatalogo(tk.Toplevel):
+    """Búsqueda en el catálogo de medidas guardadas
+
+    Filtra por referencia (con * al final, las que empiezan así), tipo y
+    fechas AAAA-MM-DD. La medida elegida se carga y se abre en la ventana
+    de la gráfica, y con "Comparar" todas las elegidas van a los mismos ejes.
+    """
+
+    COLUMNAS = (("fecha", "Fecha", 140), ("ref", "Ref", 90), ("tipo", "Tipo", 90),
+                ("dispositivo", "Dispositivo", 80), ("curvas", "Curvas", 60), ("puntos", "Puntos", 60),
+                ("archivo", "Archivo", 260))
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.title("Catálogo de medidas")
+        self.app = app
+        self._filas = {}
+        filtros = tk.Frame(self)
+        filtros.grid(sticky=tk.W + tk.E, row=0, padx=10, pady=10)
+        self._vars = {nombre: tk.StringVar() for nombre in ("Ref", "Tipo", "Desde", "Hasta")}
+        for columna, nombre in enumerate(self._vars):
+            LabelInput(filtros, nombre, self._vars[nombre],
+                       input_class=ttk.Combobox if nombre == "Tipo" else ttk.Entry,
+                       input_args={"values": ("",) + tuple(ETIQUETAS)} if nombre == "Tipo" else None
+                       ).grid(row=0, column=columna)
+        ttk.Button(filtros, text="Buscar", command=self._on_buscar).grid(row=0, column=4, sticky=tk.S)
+        self.tabla = ttk.Treeview(self, columns=[c for c, _, _ in self.COLUMNAS], show="headings",
+                                  height=15, selectmode="extended")
+        for columna, titulo, ancho in self.COLUMNAS:
+            self.tabla.heading(columna, text=titulo)
+            self.tabla.column(columna, width=ancho)
+        self.tabla.grid(sticky=tk.W + tk.E, row=1, padx=10)
+        self.tabla.bind("<Double-1>", lambda _: self._on_dibujar())
+        botones = tk.Frame(self)
+        botones.grid(sticky=tk.W + tk.E, row=2, padx=10, pady=10)
+        ttk.Button(botones, text="Comparar", command=self._on_comparar).pack(side=tk.RIGHT)
+        ttk.Button(botones, text="Dibujar", command=self._on_dibujar).pack(side=tk.RIGHT)
+        ttk.Button(botones, text="Añadir carpeta", command=self._on_indexar).pack(side=tk.RIGHT)
+        self._on_buscar()
+
+    def _consola(self, texto, color):
+        self.app._console_print(self.app.recordform.consola, texto, color)
+
+    def _on_buscar(self):
+        from catalogo import Catalogo
+        try:
+            desde, hasta = (datetime.strptime(self._vars[n].get(), "%Y-%m-%d").date()
+                            if self._vars[n].get() else None for n in ("Desde", "Hasta"))
+        except ValueError:
+            self._consola("Las fechas deben ir como AAAA-MM-DD\n", 'red')
+            return
+        try:
+            with Catalogo() as catalogo:
+                filas = catalogo.buscar(self._vars["Ref"].get(), self._vars["Tipo"].get(), desde, hasta)
+        except (OSError, sqlite3.Error) as error:
+            self._consola("No se pudo leer el catálogo: {}\n".format(error), 'red')
+            return
+        self.tabla.delete(*self.tabla.get_children())
+        self._filas = {}
+        for fila in filas:
+            iid = self.tabla.insert("", tk.END, values=[
+                fila["fecha"][:19].replace("T", " ") if c == "fecha" else fila[c] for c, _, _ in self.COLUMNAS])
+            self._filas[iid] = fila
+
+    def _on_indexar(self):
+        directorio = askdirectory()
+        if directorio == "":
+            return
+        from catalogo import Catalogo
+        try:
+            with Catalogo() as catalogo:
+                anotadas = catalogo.indexar(directorio)
+        except (OSError, sqlite3.Error) as error:
+            self._consola("No se pudo actualizar el catálogo: {}\n".format(error), 'red')
+            return
+        self._consola("{} medidas anotadas de {}\n".format(anotadas, directorio), 'green')
+        self._on_buscar()
+
+    def _on_dibujar(self):
+        seleccion = self.tabla.selection()
+        if not seleccion:
+            return
+        from catalogo import cargar
+        archivo = self._filas[seleccion[0]]["archivo"]
+        try:
+            self.app.medida_output = cargar(archivo)
+        except (OSError, ValueError, KeyError):
+            self._consola("No se pudo abrir {}\n".format(archivo), 'red')
+            return
+        self.app._on_plot()
+
+    def _on_comparar(self):
+        seleccion = self.tabla.selection()
+        if seleccion:
+            VistaComparacion(self.app, [self._filas[iid]["archivo"] for iid in seleccion])
+
+
+class VistaComparacion(tk.Toplevel):
+    """Muchas medidas guardadas sobre los mismos ejes
+
+    Los archivos se leen en un hilo, uno tras otro, y cada medida se dibuja
+    en cuanto está leída, con un color por medida. Cada línea conserva
+    todos sus puntos pero solo dibuja los que da comparacion.diezmar para
+    la vista y el ancho del gráfico, y se vuelve a diezmar al mover,
+    ampliar o cambiar el tamaño de la vista.
+    """
+
+    MAX_LEYENDA = 20    # Con más medidas no se muestra la leyenda
+
+    def __init__(self, app, archivos=()):
+        super().__init__(app)
+        self.title("Comparación de medidas")
+        self.app = app
+        plt, FigureCanvasTkAgg, NavigationToolbar2Tk = _matplotlib()
+
+        class NavigationToolbar(NavigationToolbar2Tk):
+            toolitems = [t for t in NavigationToolbar2Tk.toolitems if t[0] in ('Home', 'Forward', 'Back', 'Pan', 'Zoom', 'Save')]
+
+        from comparacion import Comparacion
+        self.comparacion = Comparacion()
+        self.fig = plt.Figure()
+        self.ax = self.fig.add_subplot(111)
+        self.ax.set_axisbelow(True)
+        self.ax.grid(visible=True, which='major', color='gainsboro', linestyle='-')
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
+        self.canvas.get_tk_widget().grid(sticky=tk.W + tk.E, row=0)
+        barra = tk.Frame(self)
+        barra.grid(sticky=tk.W + tk.E, row=1, padx=10)
+        self.estado = tk.StringVar()
+        ttk.Label(barra, textvariable=self.estado).pack(side=tk.LEFT)
+        ttk.Button(barra, text="Añadir archivos", command=self._on_anadir).pack(side=tk.RIGHT)
+        frame_toolbar = tk.Frame(self)
+        NavigationToolbar(self.canvas, frame_toolbar).update()
+        frame_toolbar.grid(sticky=tk.W + tk.E, row=99)
+
+        self._lineas = []
+        self._dibujadas = 0
+        self._diezmado = None
+        self._encargos = queue.SimpleQueue()
+        self._leidas = queue.SimpleQueue()
+        threading.Thread(target=self._leer, daemon=True).start()
+        self.ax.callbacks.connect('xlim_changed', self._al_mover)
+        self.canvas.mpl_connect('resize_event', self._al_mover)
+        self._after = self.after(100, self._actualizar)
+        self.anadir(archivos)
+
+    def destroy(self):
+        self.after_cancel(self._after)
+        self._encargos.put(None)
+        super().destroy()
+
+    def anadir(self, archivos):
+        for i in self.comparacion.anadir(archivos):
+            self._encargos.put(i)
+        self._mostrar_estado()
+
+    def _on_anadir(self):
+        archivos = askopenfilenames(filetypes=[('Medidas', '*.npz *.csv')])
+        if archivos:
+            self.anadir(archivos)
+
+    def _leer(self):
+        # Hilo de lectura: solo lee archivos, sin tocar Tk
+        while True:
+            i = self._encargos.get()
+            if i is None:
+                return
+            try:
+                self._leidas.put((i, self.comparacion.medida(i)))
+            except (OSError, ValueError, KeyError) as error:
+                self._leidas.put((i, error))
+
+    def _mostrar_estado(self):
+        self.estado.set("{} de {} medidas leídas; {} puntos, {} dibujados".format(
+            self._dibujadas, len(self.comparacion), self.comparacion.puntos(),
+            sum(len(linea.get_xdata()) for linea, _, _ in self._lineas)))
+
+    def _actualizar(self):
+        nuevas = False
+        while not self._leidas.empty():
+            i, medida = self._leidas.get()
+            self._dibujadas += 1
+            if isinstance(medida, Exception):
+                self.app._console_print(self.app.recordform.consola,
+                    "No se pudo comparar {}: {}\n".format(self.comparacion.archivos[i], medida), 'red')
+                continue
+            self._dibujar(i, medida)
+            nuevas = True
+        if nuevas:
+            if len(self.comparacion) <= self.MAX_LEYENDA:
+                self.ax.legend(loc='center left', bbox_to_anchor=(1, 0.5), fontsize='small')
+                self.fig.subplots_adjust(right=0.75)
+            if self.ax.get_autoscale_on():
+                self.ax.relim()
+                self.ax.autoscale_view()
+            self._diezmar()
+        self._after = self.after(100, self._actualizar)
+
+    def _dibujar(self, i, medida):
+        from comparacion import diezmar
+        xlabel, ylabel, _ = ETIQUETAS[medida.tipo]
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+        pixeles = self.ax.bbox.width
+        for curva in range(medida.ncurvas):
+            x, y = medida.columna(1, curva), medida.columna(2, curva)
+            if len(x) == 0:
+                continue
+            # Mientras no se ajusta la vista, se diezma sobre toda la curva
+            indices = diezmar(x, y, x.min(), x.max(), pixeles)
+            linea, = self.ax.plot(x[indices], y[indices], color="C{}".format(i % 10), linewidth=1,
+                                  label=self.comparacion.nombre(i) if curva == 0 else None)
+            self._lineas.append((linea, x, y))
+
+    def _al_mover(self, *_):
+        # Los cambios de la vista llegan de muchos en muchos al arrastrar
+        if self._diezmado is None:
+            self._diezmado = self.after_idle(self._diezmar)
+
+    def _diezmar(self):
+        from comparacion import diezmar
+        self._diezmado = None
+        xmin, xmax = self.ax.get_xlim()
+        pixeles = self.ax.bbox.width
+        for linea, x, y in self._lineas:
+            indices = diezmar(x, y, xmin, xmax, pixeles)
+            linea.set_data(x[indices], y[indices])
+        self._mostrar_estado()
+        self.canvas.draw_idle()
+
+
 class Application(tk.Tk):
     """Aplicación raíz"""
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, backend=None, simulado=False, **kwargs):
         super().__init__(*args, **kwargs)
         self.title("USAL myDAQ - Medida de dispositivos")
         self.columnconfigure(0, weight=1)
@@ -342,33 +967,107 @@ class Application(tk.Tk):
 
         self._records_saved = 0
         
-        self.system = nidaqmx.system.System.local()
+        self.backend = backend
+        self._simulado = simulado
+        self.t1 = None
+        self.control = None
+        self._vigilando = False
         self._checkmyDAQ()
         
-        self.medida_output=[]
+        self.medida_output=None
+        self.grafica_en_vivo = None
+        self.estaciones = None
+        self.catalogo = None
+        self.after_idle(self._recuperar_registros)
         
     def _console_print(self,box,text,*color):
-        box.configure(state='normal')
-        if color:
-            tagname=str(color)
-            box.tag_config(tagname, foreground=color)
-            box.insert("insert",text,tagname)
-        else:
-            box.insert("insert",text)
-
-        box.see(tk.END)
-        box.configure(state='disabled')
+        box.escribir(text,*color)
+        
+    def _recuperar_registros(self):
+        """Ofrece recuperar las medidas que quedaron a medias en disco"""
+        from registros import registros_parciales
+        for filename in registros_parciales():
+            from medidas import recuperar
+            nombre = os.path.basename(filename)[:-len(".csv.parcial")]
+            final = filename[:-len(".csv.parcial")] + "-interrumpida.csv"
+            if askyesno("Medida interrumpida",
+                        "La medida {} no llegó a terminar. ¿Recuperar los datos?".format(nombre)):
+                try:
+                    self.medida_output = recuperar(filename)
+                except (OSError, ValueError, KeyError):
+                    self._console_print(self.recordform.consola,"No se pudo recuperar {}\n".format(nombre),'red')
+                    continue
+                self._console_print(self.recordform.consola,
+                    "Recuperados {} puntos de {}\n".format(self.medida_output.puntos, nombre),'green')
+            os.replace(filename, final)
         
     def _checkmyDAQ(self):
-        if len(self.system.devices)>0:
-            self.status.set("Dispositivo encontrado: {}".format(self.system.devices[0].name))
-            self._is_device = True
+        """Busca dispositivos en segundo plano para no retrasar la ventana"""
+        self._is_device = False
+        self.dispositivo = None
+        self.registro_dispositivos = None
+        self.status.set("Buscando dispositivos...")
+        # La búsqueda carga el driver y numpy: empieza con la ventana ya creada
+        self._busqueda = None
+        self.after_idle(self._vigilar_dispositivos)
+
+    def _vigilar_dispositivos(self):
+        """Vuelve a enumerar los dispositivos, salvo mientras se mide, para
+        detectar si se conecta o se desconecta un myDAQ"""
+        if self._midiendo():
+            self.after(INTERVALO_VIGILANCIA, self._vigilar_dispositivos)
+            return
+        self._busqueda = threading.Thread(target=self._buscar_dispositivos, daemon=True)
+        self._busqueda.start()
+        self.after(50, self._fin_busqueda)
+
+    def _buscar_dispositivos(self):
+        try:
+            if self.registro_dispositivos is None:
+                if self.backend is None:
+                    self.backend = crear_backend(self._simulado)
+                self.registro_dispositivos = RegistroDispositivos(self.backend)
+            # Una medida pudo empezar mientras arrancaba este hilo
+            if self._midiendo():
+                self._cambios = ([], [])
+                return
+            self._cambios = self.registro_dispositivos.actualizar()
+        except Exception as error:
+            # Sin driver instalado o con el driver en mal estado
+            self._cambios = error
+
+    def _fin_busqueda(self):
+        if self._busqueda.is_alive():
+            self.after(50, self._fin_busqueda)
+            return
+        if isinstance(self._cambios, Exception):
+            self.status.set("Error al buscar dispositivos: {}".format(self._cambios))
+            self._is_device = False
+            # Se sigue vigilando por si el driver se recupera o se instala
+            self.after(INTERVALO_VIGILANCIA, self._vigilar_dispositivos)
+            return
+        
+        nuevos, retirados = self._cambios
+        if self.dispositivo in retirados:
+            self._console_print(self.recordform.consola,"Dispositivo desconectado: {}\n".format(self.dispositivo),'red')
+            self.dispositivo = None
+        if self.dispositivo is None and self.registro_dispositivos.dispositivos():
+            self.dispositivo = self.registro_dispositivos.dispositivos()[0]
+            if self._vigilando:
+                self._console_print(self.recordform.consola,"Dispositivo conectado: {}\n".format(self.dispositivo),'green')
+        
+        self._is_device = self.dispositivo is not None
+        if self._is_device:
+            self.status.set("Dispositivo encontrado: {}".format(self.dispositivo))
         else:
             self.status.set("No se encontraron dispositivos")
-            self._is_device = False
+        self._vigilando = True
+        self.after(INTERVALO_VIGILANCIA, self._vigilar_dispositivos)
         
     def _on_plot(self):
         
+        plt, FigureCanvasTkAgg, NavigationToolbar2Tk = _matplotlib()
+        
         class NavigationToolbar(NavigationToolbar2Tk):
        
             toolitems = [t for t in NavigationToolbar2Tk.toolitems if t[0] in ('Home', 'Forward', 'Back', 'Pan', 'Zoom', 'Save')]
@@ -380,108 +1079,83 @@ class Application(tk.Tk):
             
             def _replot():
 
-                ax.clear()
-                ax.set_axisbelow(True)
-                ax.grid(visible=True, which='major', color='gainsboro', linestyle='-')
-                canvas.get_tk_widget().pack_forget()                
-                _plot()
+                for linea in ax.get_lines():
+                    _estilo_linea(linea, tipografica.get())
+                if ETIQUETAS[tipomedida][2]:
+                    ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
+                canvas.draw_idle()
                 
             def _plot():
-                                
-                xdata=[]
-                ydata=[]
-            
-                if tipomedida=="I-V Diodo":
-                    xdata=[d["Vpn (V)"] for d in medidaploteada]
-                    ydata=[d["Id (mA)"] for d in medidaploteada]        
-                    
-                    xdata=np.delete(np.array(xdata),0).astype(np.float32)
-                    ydata=np.delete(np.array(ydata),0).astype(np.float32)       
-                    
-                    if tipografica.get() == "Línea":
-                        ax.plot(xdata,ydata)
-                    else:
-                        ax.scatter(xdata,ydata,s=20)
-                        
-                    ax.set_xlabel("$V_{pn}$ (V)")
-                    ax.set_ylabel("$I_d$ (mA)")
-                    fig.subplots_adjust(right=0.85)
-                    
-                elif tipomedida=="Id-Vds MOS":
-                    for i in range(len(medidaploteada)):
-                        xdata=[d["VDS (V)"] for d in medidaploteada[i]]
-                        ydata=[d["ID (mA)"] for d in medidaploteada[i]]        
-                        
-                        xdata=np.delete(np.array(xdata),0).astype(np.float32)
-                        ydata=np.delete(np.array(ydata),0).astype(np.float32)       
-
-                        try:
-                            vgsvalue = "%.2f" % float(medidaploteada[i][1]["VGS (V)"])
-                        except:
-                            pass
-                        
-                        if tipografica.get() == "Línea":
-                            ax.plot(xdata,ydata,label=f"VGS = {vgsvalue} V")
-                        else:
-                            ax.scatter(xdata,ydata,s=20,label=f"VGS = {vgsvalue} V")
-                            
-                    ax.set_xlabel("$V_{DS}$ (V)")
-                    ax.set_ylabel("$I_D$ (mA)")
-                    ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
-                    fig.subplots_adjust(right=0.73)
+                
+                xlabel, ylabel, leyenda = ETIQUETAS[tipomedida]
+                for i in range(medidaploteada.ncurvas):
+                    xdata = medidaploteada.columna(1, i)
+                    ydata = medidaploteada.columna(2, i)
+                    label = None
+                    if leyenda and medidaploteada.n[i]:
+                        label = leyenda.format(medidaploteada.valor_parametro(i))
                     
-                elif tipomedida=="Id-Vgs MOS":
-                    for i in range(len(medidaploteada)):
-                        xdata=[d["VGS (V)"] for d in medidaploteada[i]]
-                        ydata=[d["ID (mA)"] for d in medidaploteada[i]]        
-                        
-                        xdata=np.delete(np.array(xdata),0).astype(np.float32)
-                        ydata=np.delete(np.array(ydata),0).astype(np.float32)       
-
-                        try:
-                            vdsvalue = "%.2f" % float(medidaploteada[i][1]["VDS (V)"])
-                        except:
-                            pass
-                        
-                        if tipografica.get() == "Línea":
-                            ax.plot(xdata,ydata,label=f"VDS = {vdsvalue} V")
-                        else:
-                            ax.scatter(xdata,ydata,s=20,label=f"VDS = {vdsvalue} V")
-                            
-                    ax.set_xlabel("$V_{GS}$ (V)")
-                    ax.set_ylabel("$I_D$ (mA)")
-                    ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
-                    fig.subplots_adjust(right=0.73)
-
-                elif tipomedida=="Ic-Vce BJT":
-                    for i in range(len(medidaploteada)):
-                        xdata=[d["VCE (V)"] for d in medidaploteada[i]]
-                        ydata=[d["IC (mA)"] for d in medidaploteada[i]]        
+                    linea, = ax.plot(xdata,ydata,label=label)
+                    _estilo_linea(linea, tipografica.get())
+                    if medidaploteada.estadistica is not None:
+                        # Banda de ± una desviación típica entre repeticiones
+                        desviacion = medidaploteada.estadistica[1, i, :medidaploteada.n[i]]
+                        ax.fill_between(xdata, ydata - desviacion, ydata + desviacion,
+                                        color=linea.get_color(), alpha=0.25, linewidth=0)
                         
-                        xdata=np.delete(np.array(xdata),0).astype(np.float32)
-                        ydata=np.delete(np.array(ydata),0).astype(np.float32)       
-                        try:
-                            ibvalue = "%.2f" % float(medidaploteada[i][1]["IB (µA)"])
-                        except:
-                            pass
-                        if tipografica.get() == "Línea":
-                            ax.plot(xdata,ydata,label=f"IB = {ibvalue} µA")
-                        else:
-                            ax.scatter(xdata,ydata,s=20,label=f"IB = {ibvalue} µA")
-                            
-                    ax.set_xlabel("$V_{CE}$ (V)")
-                    ax.set_ylabel("$I_C$ (mA)")
+                ax.set_xlabel(xlabel)
+                ax.set_ylabel(ylabel)
+                if leyenda:
                     ax.legend(loc='center left', bbox_to_anchor=(1, 0.5))
                     fig.subplots_adjust(right=0.73)
+                else:
+                    fig.subplots_adjust(right=0.85)
                     
-                canvas.get_tk_widget().grid(sticky=tk.W + tk.E, row=2)
+                canvas.get_tk_widget().grid(sticky=tk.W + tk.E, row=2, columnspan=2)
                 canvas.draw()
+                _mostrar_texto(parametros, resumen(medidaploteada))
             
+            def _familia(*_):
+                # Corte de la superficie con las curvas añadidas fuera de la rejilla
+                nonlocal medidaploteada, tipomedida
+                if caracteristica.get() == "Salida":
+                    tipo, rejilla = "Id-Vds MOS", superficie.vgs
+                else:
+                    tipo, rejilla = "Id-Vgs MOS", superficie.vds
+                valores = sorted(set(rejilla.round(9)) | set(anadidas[tipo]))
+                try:
+                    medidaploteada = superficie.familia(tipo, valores)
+                except ValueError as error:
+                    anadidas[tipo].pop()
+                    self._console_print(self.recordform.consola,"{}\n".format(error),"red")
+                    return
+                tipomedida = tipo
+                ax.clear()
+                ax.set_axisbelow(True)
+                ax.grid(visible=True, which='major', color='gainsboro', linestyle='-')
+                _plot()
+
+            def _anadir_curva():
+                tipo = "Id-Vds MOS" if caracteristica.get() == "Salida" else "Id-Vgs MOS"
+                try:
+                    anadidas[tipo].append(round(valor_curva.get(), 9))
+                except tk.TclError:
+                    self._console_print(self.recordform.consola,"Valor de la curva no válido\n","red")
+                    return
+                _familia()
+
             popup = tk.Toplevel(app)          
                         
             medidaploteada = self.medida_output
-            tipomedida = self.recordform._vars["Tipo de medida"].get()
-            tipodispo = self.recordform._vars["Ref"].get()
+            tipomedida = medidaploteada.tipo
+            
+            superficie = None
+            if medidaploteada.parametros.get('Tipo de medida') == "Superficie MOS":
+                from superficie import SuperficieMOS
+                try:
+                    superficie = SuperficieMOS.desde_medida(medidaploteada)
+                except (ValueError, KeyError):
+                    self._console_print(self.recordform.consola,"No se pudo reconstruir la rejilla de la superficie\n","red")
             
             tipografica = tk.StringVar()
             frame_window = tk.Frame(popup)
@@ -490,7 +1164,7 @@ class Application(tk.Tk):
             buttons.grid(sticky=tk.W,padx=10,row=1, column=0,columnspan=1)
 
             savebutton = ttk.Button(
-                buttons, text="Guardar datos", command= lambda : self._on_savedata(medidaploteada,tipomedida,tipodispo))
+                buttons, text="Guardar datos", command= lambda : self._on_savedata(medidaploteada))
             savebutton.grid(row=0)
             
             LabelInput(
@@ -501,6 +1175,11 @@ class Application(tk.Tk):
              
             fig = plt.Figure()
             canvas = FigureCanvasTkAgg(fig, master=frame_window)
+            
+            from analisis import resumen
+            parametros = st.ScrolledText(frame_window, width=75, height=6)
+            parametros.configure(state='disabled', background="whitesmoke")
+            parametros.grid(sticky=tk.W + tk.E, row=3, columnspan=2)
             frame_toolbar = tk.Frame(popup)
             toolbar = NavigationToolbar(canvas,frame_toolbar)
             toolbar.update()
@@ -511,6 +1190,26 @@ class Application(tk.Tk):
             ax.set_axisbelow(True)
             ax.grid(visible=True, which='major', color='gainsboro', linestyle='-')
 
+            if superficie is not None:
+                caracteristica = tk.StringVar()
+                valor_curva = tk.DoubleVar()
+                anadidas = {"Id-Vds MOS": [], "Id-Vgs MOS": []}
+                LabelInput(
+                    frame_window, "Característica", input_class=ttk.Radiobutton,
+                    var=caracteristica,
+                    input_args={"values": ["Salida", "Transferencia"]}
+                    ).grid(sticky=tk.W, padx=10, row=0, column=1,columnspan=1)
+                curvas = tk.Frame(frame_window)
+                curvas.grid(sticky=tk.W, padx=10, row=1, column=1)
+                LabelInput(
+                    curvas, "Curva en (V)",
+                    input_class=ttk.Spinbox, var=valor_curva,
+                    input_args={"from_": -10, "to": 10, "increment": .05}
+                    ).grid(row=0, column=0)
+                ttk.Button(curvas, text="Añadir curva", command=_anadir_curva).grid(row=0, column=1)
+                caracteristica.set("Salida")
+                caracteristica.trace_add('write',_familia)
+
             _plot()
             
             tipografica.trace_add('write',lambda *args: _replot())
@@ -520,172 +1219,60 @@ class Application(tk.Tk):
         else:
             self._console_print(self.recordform.consola,"No hay medidas para representar\n","red")
 
-    def _on_savedata(self,data,reftipo,refdispo):
-        """Guardar archivo"""
-        
-        if data:
-            datestring = datetime.today().strftime("%Y-%m-%d")
-            
-            files = [('Archivo separado por comas', '*.csv'),('Archivo de texto', '*.txt'),('Todos los archivos', '*.*')]
-            if refdispo != "":      
-                prename = "{}-{}-{}".format(refdispo,datestring,reftipo)
-            else:
-                prename = "{}-{}".format(datestring,reftipo)
-                
-            filename = asksaveasfilename(filetypes = files, defaultextension = files, initialfile = prename)
-
-            if reftipo == "Id-Vds MOS":
-                medidalist=[]
-                mkeys=[]
-                for k in range(len(data)):
-                    mkeys.append(f"VGS (V) {k+1}")
-                    mkeys.append(f"VDS (V) {k+1}")
-                    mkeys.append(f"ID (mA) {k+1}")
-                    
-                for i in range(len(data[0])):  
-
-                    medidasingle = []                      
-                    for j in range(len(data)):
-                        medidasingle.extend(list(data[j][i].values()))
-                    medidalist.append(dict(zip(mkeys,medidasingle)))
-
-            elif reftipo == "Ic-Vgs MOS":
-                medidalist=[]
-                mkeys=[]
-                for k in range(len(data)):
-                    mkeys.append(f"VDS (V) {k+1}")
-                    mkeys.append(f"VGS (V) {k+1}")
-                    mkeys.append(f"ID (mA) {k+1}")
-                    
-                for i in range(len(data[0])):  
-
-                    medidasingle = []                      
-                    for j in range(len(data)):
-                        medidasingle.extend(list(data[j][i].values()))
-                    medidalist.append(dict(zip(mkeys,medidasingle)))
-                    
-            elif reftipo == "Ic-Vce BJT":
-                medidalist=[]
-                mkeys=[]
-                for k in range(len(data)):
-                    mkeys.append(f"IB (µA) {k+1}")
-                    mkeys.append(f"VCE (V) {k+1}")
-                    mkeys.append(f"IC (mA) {k+1}")
-                    
-                for i in range(len(data[0])):  
+    def _on_liveplot(self):
+        """Abre la gráfica de la medida en curso, o la trae al frente"""
+        if self.grafica_en_vivo is not None and self.grafica_en_vivo.winfo_exists():
+            self.grafica_en_vivo.lift()
+        else:
+            self.grafica_en_vivo = GraficaEnVivo(self)
 
-                    medidasingle = []                      
-                    for j in range(len(data)):
-                        medidasingle.extend(list(data[j][i].values()))
-                    medidalist.append(dict(zip(mkeys,medidasingle)))
-            else:
-                medidalist = data
-                
-            
-            if filename!="":
-                try:
-                    a_file = open(filename, 'w', newline='')
-                    if refdispo!="":
-                        a_file.write(f"Dispositivo: {refdispo}\n")
-                    else:
-                        a_file.write("Dispositivo sin referencia\n")
-                        
-                    keys = medidalist[0].keys()
-                    dict_writer = csv.DictWriter(a_file, keys, delimiter=";")
-                    #dict_writer.writeheader()
-                    dict_writer.writerows(medidalist)
-                    a_file.close()
-                    self._console_print(self.recordform.consola,"Archivo guardado con éxito\n","green")
-    
-                except:
-                    self._console_print(self.recordform.consola,"Error al guardar el archivo\n","red")
-                    self._console_print(self.recordform.consola,"Compruebe que no está abierto por otra aplicación\n","red")
-            else:
-                self._console_print(self.recordform.consola,"No se ha guardado la medida\n","red")
+    def _on_estaciones(self):
+        """Abre el estado de las medidas en paralelo, o lo trae al frente"""
+        if self.estaciones is not None and self.estaciones.winfo_exists():
+            self.estaciones.lift()
         else:
-            self._console_print(self.recordform.consola,"No hay datos que guardar\n","red")
+            self.estaciones = Estaciones(self)
 
+    def _on_catalogo(self):
+        """Abre el catálogo de medidas guardadas, o lo trae al frente"""
+        if self.catalogo is not None and self.catalogo.winfo_exists():
+            self.catalogo.lift()
+        else:
+            self.catalogo = ExploradorCatalogo(self)
 
-        
-    def _on_save(self):
+    def _on_savedata(self,medida):
         """Guardar archivo"""
         
-        if self.medida_output:
+        if medida:
+            from medidas import guardar_csv, guardar_npz
             datestring = datetime.today().strftime("%Y-%m-%d")
-            reftipo = self.recordform._vars["Tipo de medida"].get()
-            refdispo = self.recordform._vars["Ref"].get()
-            files = [('Archivo separado por comas', '*.csv'),('Archivo de texto', '*.txt'),('Todos los archivos', '*.*')]
-            if refdispo != "":      
-                prename = "{}-{}-{}".format(refdispo,datestring,reftipo)
+            
+            files = [('Archivo separado por comas', '*.csv'),('Datos binarios NumPy', '*.npz'),('Archivo de texto', '*.txt'),('Todos los archivos', '*.*')]
+            superficie = medida.parametros.get('Tipo de medida') == "Superficie MOS"
+            if superficie:
+                # Solo el NPZ guarda los parámetros con los que se reconstruye la rejilla
+                files = [files[1]] + [f for f in files if f is not files[1]]
+            if medida.ref != "":      
+                prename = "{}-{}-{}".format(medida.ref,datestring,medida.tipo)
             else:
-                prename = "{}-{}".format(datestring,reftipo)
+                prename = "{}-{}".format(datestring,medida.tipo)
                 
             filename = asksaveasfilename(filetypes = files, defaultextension = files, initialfile = prename)
-
-            if self.recordform._vars["Tipo de medida"].get() == "Id-Vds MOS":
-                medidalist=[]
-                mkeys=[]
-                for k in range(len(self.medida_output)):
-                    mkeys.append(f"VGS (V) {k+1}")
-                    mkeys.append(f"VDS (V) {k+1}")
-                    mkeys.append(f"ID (mA) {k+1}")
-                    
-                for i in range(len(self.medida_output[0])):  
-
-                    medidasingle = []                      
-                    for j in range(len(self.medida_output)):
-                        medidasingle.extend(list(self.medida_output[j][i].values()))
-                    medidalist.append(dict(zip(mkeys,medidasingle)))
-
-            elif self.recordform._vars["Tipo de medida"].get() == "Id-Vgs MOS":
-                medidalist=[]
-                mkeys=[]
-                for k in range(len(self.medida_output)):
-                    mkeys.append(f"VDS (V) {k+1}")
-                    mkeys.append(f"VGS (V) {k+1}")
-                    mkeys.append(f"ID (mA) {k+1}")
-                    
-                for i in range(len(self.medida_output[0])):  
-
-                    medidasingle = []                      
-                    for j in range(len(self.medida_output)):
-                        medidasingle.extend(list(self.medida_output[j][i].values()))
-                    medidalist.append(dict(zip(mkeys,medidasingle)))
-
-            elif self.recordform._vars["Tipo de medida"].get() == "Ic-Vce BJT":
-                medidalist=[]
-                mkeys=[]
-                for k in range(len(self.medida_output)):
-                    mkeys.append(f"IB (µA) {k+1}")
-                    mkeys.append(f"VCE (V) {k+1}")
-                    mkeys.append(f"IC (mA) {k+1}")
-                    
-                for i in range(len(self.medida_output[0])):  
-
-                    medidasingle = []                      
-                    for j in range(len(self.medida_output)):
-                        medidasingle.extend(list(self.medida_output[j][i].values()))
-                    medidalist.append(dict(zip(mkeys,medidasingle)))
-            else:
-                medidalist = self.medida_output
-                
             
             if filename!="":
                 try:
-                    a_file = open(filename, 'w', newline='')
-                    if refdispo!="":
-                        a_file.write(f"Dispositivo: {refdispo}\n")
+                    if filename.lower().endswith(".npz"):
+                        guardar_npz(medida, filename)
                     else:
-                        a_file.write("Dispositivo sin referencia\n")
-                        
-                    keys = medidalist[0].keys()
-                    dict_writer = csv.DictWriter(a_file, keys, delimiter=";")
-                    #dict_writer.writeheader()
-                    dict_writer.writerows(medidalist)
-                    a_file.close()
+                        guardar_csv(medida, filename)
                     self._console_print(self.recordform.consola,"Archivo guardado con éxito\n","green")
+                    if superficie and not filename.lower().endswith(".npz"):
+                        self._console_print(self.recordform.consola,"Este formato no guarda la rejilla: al abrirlo no se podrá ver como superficie\n","red")
+                    from catalogo import catalogar
+                    if not catalogar(medida, filename):
+                        self._console_print(self.recordform.consola,"No se pudo anotar la medida en el catálogo\n","red")
     
-                except:
+                except OSError:
                     self._console_print(self.recordform.consola,"Error al guardar el archivo\n","red")
                     self._console_print(self.recordform.consola,"Compruebe que no está abierto por otra aplicación\n","red")
             else:
@@ -693,308 +1280,137 @@ class Application(tk.Tk):
         else:
             self._console_print(self.recordform.consola,"No hay datos que guardar\n","red")
 
+    def _on_save(self):
+        """Guardar archivo"""
+        self._on_savedata(self.medida_output)
+        
+    def _on_open(self):
+        """Abrir una medida guardada en NPZ o CSV"""
+        filename = askopenfilename(filetypes = [('Datos binarios NumPy', '*.npz'),('Archivo separado por comas', '*.csv')])
+        if filename!="":
+            from catalogo import cargar
+            try:
+                self.medida_output = cargar(filename)
+            except (OSError, ValueError, KeyError):
+                self._console_print(self.recordform.consola,"Error al abrir el archivo\n","red")
+                return
+            self._console_print(self.recordform.consola,
+                "Abierta medida {} ({} puntos)\n".format(self.medida_output.tipo, self.medida_output.puntos),"green")
         
     def threading(self):
-        # Call work function
-        self.t1=threading.Thread(target=self._on_run)
+        if not self._vigilando and (self._busqueda is None or self._busqueda.is_alive()):
+            self._console_print(self.recordform.consola,"Espere: se están buscando dispositivos\n",'red')
+            return
+        if not self._is_device:
+            self._console_print(self.recordform.consola,"No hay ningún myDAQ conectado\n",'red')
+            return
+        if self._midiendo():
+            self._console_print(self.recordform.consola,"Ya hay una medida en curso\n",'red')
+            return
+        if self.estaciones is not None and self.estaciones.winfo_exists() and self.estaciones.ocupadas():
+            self._console_print(self.recordform.consola,"Las estaciones tienen medidas pendientes\n",'red')
+            return
+        # Los parámetros se leen aquí, en el hilo de Tk
+        parametros = {k: v.get() for k, v in self.recordform._vars.items() if k != 'Consola'}
+        from adquisicion import Control
+        self.control = Control()
+        self.recordform.pausebutton.config(text="Pausa")
+        self.t1=threading.Thread(target=self._on_run, args=(parametros, self.control))
         self.t1.setDaemon(True)
         self.t1.start()        
 
-    # def stopthread(self):
-    #     if self.t1:
-    #         self.t1._stop()
+    def _midiendo(self):
+        return self.t1 is not None and self.t1.is_alive()
+
+    def _on_stop(self):
+        """Cancela la medida en curso; lo ya medido se conserva"""
+        if self._midiendo():
+            self.control.cancelar()
+            self.recordform.pausebutton.config(text="Pausa")
+
+    def _on_pause(self):
+        """Pausa la medida en curso o la reanuda desde el último punto"""
+        if not self._midiendo():
+            return
+        if self.control.en_pausa:
+            self.control.reanudar()
+            self.recordform.pausebutton.config(text="Pausa")
+        else:
+            self.control.pausar()
+            self.recordform.pausebutton.config(text="Reanudar")
             
-    def _on_run(self):
+    def _on_run(self, parametros, control=None):
         """Ejecución de las medidas"""
 
         if self._is_device:
-            
-            if self.recordform._vars["Tipo de medida"].get()=="I-V Diodo":
-                self._IVdiode_measure()
-            elif self.recordform._vars["Tipo de medida"].get()=="Id-Vds MOS":
-                self._IVMOS_measure()
-            elif self.recordform._vars["Tipo de medida"].get()=="Id-Vgs MOS":
-                self._IVGMOS_measure()
-            elif self.recordform._vars["Tipo de medida"].get()=="Ic-Vce BJT":
-                self._IVBJT_measure()
-    
-    def _writemyDAQ(self,channel,value,*_):
-        with nidaqmx.Task() as task:
-            task.ao_channels.add_ao_voltage_chan('{}/{}'.format(self.system.devices[0].name,channel))
-            task.write(value)
-            task.wait_until_done()
-            
-    def _readmyDAQ(self,channel,*_):
-        with nidaqmx.Task() as task:
-            task.ai_channels.add_ai_voltage_chan('{}/{}'.format(self.system.devices[0].name,channel))
-            return task.read()
-        
-    def _IVdiode_measure(self):
-        rangemin = self.recordform._vars['VDD Min'].get()
-        rangemax = self.recordform._vars['VDD Max'].get()
-        incr = self.recordform._vars['Incremento'].get()
-        resistor = self.recordform._vars['Valor de R (Ohm)'].get()
-
-        if incr != 0:
+            from adquisicion import Adquisicion
             try:
-                numvdd = int((rangemax-rangemin)/incr)+1
-                vdd = np.linspace(rangemin, rangemax, numvdd)
-            except:
-                self._console_print(self.recordform.consola,"Revise los parámetros elegidos\n",'red')
-                return
-        else:
-            if rangemax != rangemin:
-                self._console_print(self.recordform.consola,"Revise los parámetros elegidos\n",'red')
-                return
-            else:
-                vdd = [rangemax]
-                
-        self._console_print(self.recordform.consola,"Iniciando medida\n",'blue')      
-        self.medida_output = [{"VDD (V)": "VDD (V)", "Vpn (V)": "Vpn (V)", "Id (mA)": "Id (mA)"}]
-        
-        countervdd = 0
-        
-        while countervdd < len(vdd):
-            value = vdd[countervdd]
-            self._writemyDAQ("ao0", value)
-            vpn = self._readmyDAQ("ai0")
-           
-            valim = "%.4f" % round(vpn,4)
-            vdiodo = "%.4f" % round(value,4)
-            current = "%.4f" % round(((vpn-value)/resistor*1000),4)
-            if abs(float(current))*30 <= 500:   #Se comprueba en relación a la potencia total disponible (500 mw) en los +-15 (30)     
-                lectura = 'VDD (V): '+str(valim)+ \
-                    ' ; Vpn (V): '+str(vdiodo)+ \
-                        ' ; ID (mA): '+ str(current)+'\n'
-                self._console_print(self.recordform.consola,lectura)
-                self.medida_output.append({"VDD (V)": valim, "Vpn (V)": vdiodo, "Id (mA)": current})
-                countervdd = countervdd + 1
-            else:
-                self._console_print(self.recordform.consola,"Excedida potencia máxima\n",'blue')
-                countervdd = len(vdd)
-        self._console_print(self.recordform.consola,"Medida finalizada\n",'blue')
-        
-    def _IVMOS_measure(self):
-        
-        rangemin = self.recordform._vars['VDD Min'].get()
-        rangemax = self.recordform._vars['VDD Max'].get()
-        incr = self.recordform._vars['Incremento'].get()
-        resistor = self.recordform._vars['Valor de R (Ohm)'].get()
+                Adquisicion(self.registro_dispositivos, self.dispositivo, parametros,
+                            mensaje=lambda text, *color: self._console_print(self.recordform.consola, text, *color),
+                            al_empezar=self._al_empezar, control=control).ejecutar()
+            except ErrorDispositivo as error:
+                self._console_print(self.recordform.consola,"Error del dispositivo: {}\n".format(error),'red')
+                self._console_print(self.recordform.consola,"Compruebe que el myDAQ sigue conectado\n",'red')
 
-        rangevgsmin = self.recordform._vars['VGS Min'].get()
-        rangevgsmax = self.recordform._vars['VGS Max'].get()
-        incrvgs = self.recordform._vars['IncrementoVGS'].get()
-        
-        if incr != 0:
-            try:
-                numvdd = int((rangemax-rangemin)/incr)+1
-                vdd = np.linspace(rangemin, rangemax, numvdd)
-            except:
-                self._console_print(self.recordform.consola,"Revise los parámetros elegidos\n",'red')
-                return
-        else:
-            if rangemax != rangemin:
-                self._console_print(self.recordform.consola,"Revise los parámetros elegidos\n",'red')
-                return
-            else:
-                vdd = [rangemax]
-                
-        if incrvgs != 0:
-            try:
-                numvgs = int((rangevgsmax-rangevgsmin)/incrvgs)+1
-                vgs = np.linspace(rangevgsmin, rangevgsmax, numvgs)
-            except:
-                self._console_print(self.recordform.consola,"Revise los parámetros elegidos\n",'red')
-                return
-        else:
-            if rangevgsmax != rangevgsmin:
-                self._console_print(self.recordform.consola,"Revise los parámetros elegidos\n",'red')
-                return
-            else:
-                vgs = [rangevgsmax]
-
-        self._console_print(self.recordform.consola,"Iniciando medida\n",'blue')
-        self.medida_output =[]        
-        countervgs = 0
-        while countervgs < len(vgs):
-            countervdd = 0
-            valuevgs = vgs[countervgs]
-            self._writemyDAQ("ao1", valuevgs)
-            medida_given_vgs = [{"VGS (V)": "VGS (V)", "VDS (V)": "VDS (V)", "ID (mA)": "ID (mA)"}]
-        
-            while countervdd < len(vdd):
-                value = vdd[countervdd]
-                self._writemyDAQ("ao0", value)
-                vpuerta = "%.4f" % round(valuevgs,4)
-                vmeas = self._readmyDAQ("ai0")
-                if vmeas < 10.5 and vmeas > -10.5:  # Se fija límite 10.5, máximo que se puede leer por AI
-                    ids = (vmeas-value)/resistor*1000
-                    vds = "%.4f" % round(value,4)
-                    ids = "%.4f" % round(ids,4)
-                    if abs(float(ids))*30 <= 500:   #Se comprueba en relación a la potencia total disponible (500 mw) en los +-15 (30)                      
-                        lectura = 'VGS (V): '+str(vpuerta)+ \
-                            ' ; VDS (V): '+str(vds)+ \
-                                ' ; ID (mA): '+ str(ids)+'\n' 
-                        self._console_print(self.recordform.consola,lectura)
-                        medida_given_vgs.append({"VGS (V)": vpuerta, "VDS (V)": vds, "ID (mA)": ids})
-                        countervdd = countervdd + 1
-                    else:
-                        self._console_print(self.recordform.consola,"Excedida potencia máxima\n",'blue')
-                        countervdd = len(vdd)
-                else:
-                    countervdd = countervdd + 1
-            self.medida_output.append(medida_given_vgs)
-            countervgs = countervgs + 1    
+    def _al_empezar(self, medida):
+        self.medida_output = medida
 
-        self._console_print(self.recordform.consola,"Medida finalizada\n",'blue')
 
-    def _IVGMOS_measure(self):
-        rangemin = self.recordform._vars['VDD Min'].get()
-        rangemax = self.recordform._vars['VDD Max'].get()
-        incr = self.recordform._vars['Incremento'].get()
-        resistor = self.recordform._vars['Valor de R (Ohm)'].get()
+def medir_arranque(simulado=False):
+    """Tiempos de arranque en ms desde que empieza a cargarse el programa:
+    importaciones, ventana dibujada y búsqueda de dispositivos terminada.
+    Devuelve también si numpy ya estaba cargado al crear la ventana, antes
+    de empezar a buscar dispositivos"""
+    tiempos = {"importaciones": time.perf_counter()}
+    app = Application(simulado=simulado)
+    numpy_al_crear = "numpy" in sys.modules
 
-        rangevgsmin = self.recordform._vars['VGS Min'].get()
-        rangevgsmax = self.recordform._vars['VGS Max'].get()
-        incrvgs = self.recordform._vars['IncrementoVGS'].get()
-        
-        if incr != 0:
-            try:
-                numvdd = int((rangemax-rangemin)/incr)+1
-                vdd = np.linspace(rangemin, rangemax, numvdd)
-            except:
-                self._console_print(self.recordform.consola,"Revise los parámetros elegidos\n",'red')
-                return
-        else:
-            if rangemax != rangemin:
-                self._console_print(self.recordform.consola,"Revise los parámetros elegidos\n",'red')
-                return
-            else:
-                vdd = [rangemax]
-                
-        if incrvgs != 0:
-            try:
-                numvgs = int((rangevgsmax-rangevgsmin)/incrvgs)+1
-                vgs = np.linspace(rangevgsmin, rangevgsmax, numvgs)
-            except:
-                self._console_print(self.recordform.consola,"Revise los parámetros elegidos\n",'red')
-                return
-        else:
-            if rangevgsmax != rangevgsmin:
-                self._console_print(self.recordform.consola,"Revise los parámetros elegidos\n",'red')
-                return
-            else:
-                vgs = [rangevgsmax]
-
-        self._console_print(self.recordform.consola,"Iniciando medida\n",'blue')
-        self.medida_output =[]        
-        countervdd = 0
-
-        while countervdd < len(vdd):
-            countervgs = 0
-            valuevds = vdd[countervdd]
-            self._writemyDAQ("ao0", valuevds) 
-            medida_given_vds = [{"VDS (V)": "VDS (V)", "VGS (V)": "VGS (V)", "ID (mA)": "ID (mA)"}]
-        
-            while countervgs < len(vgs):
-                valuevgs = vgs[countervgs]
-                self._writemyDAQ("ao1", valuevgs)
-                vpuerta = "%.4f" % round(valuevgs,4)
-                vmeas = self._readmyDAQ("ai0")
-                if vmeas < 10.5 and vmeas > -10.5:  # Se fija límite 10.5, máximo que se puede leer por AI
-                    ids = (vmeas-valuevds)/resistor*1000
-                    vds = "%.4f" % round(valuevds,4)
-                    ids = "%.4f" % round(ids,4)
-                    if abs(float(ids))*30 <= 500:   #Se comprueba en relación a la potencia total disponible (500 mw) en los +-15 (30)                      
-                        lectura = 'VDS (V): '+str(vds)+ \
-                            ' ; VGS (V): '+str(vpuerta)+ \
-                                ' ; ID (mA): '+ str(ids)+'\n' 
-                        self._console_print(self.recordform.consola,lectura)
-                        medida_given_vds.append({"VDS (V)": vds, "VGS (V)": vpuerta, "ID (mA)": ids})
-                        countervgs = countervgs + 1
-                    else:
-                        self._console_print(self.recordform.consola,"Excedida potencia máxima\n",'blue')
-                        countervgs = len(vgs)
-                else:
-                    countervgs = countervgs + 1
-            self.medida_output.append(medida_given_vds)
-            countervdd = countervdd + 1  
-            
-        self._console_print(self.recordform.consola,"Medida finalizada\n",'blue')
-        
-    def _IVBJT_measure(self):
-        
-        rangemin = self.recordform._vars['VDD Min'].get()
-        rangemax = self.recordform._vars['VDD Max'].get()
-        incr = self.recordform._vars['Incremento'].get()
-        resistor = 10
+    def ventana():
+        app.update()
+        tiempos["ventana"] = time.perf_counter()
 
-        rangevgsmin = self.recordform._vars['VGS Min'].get()
-        rangevgsmax = self.recordform._vars['VGS Max'].get()
-        incrvgs = self.recordform._vars['IncrementoVGS'].get()
+    def dispositivos():
+        if app._busqueda is None or app._busqueda.is_alive():
+            app.after(5, dispositivos)
+            return
+        tiempos["dispositivos"] = time.perf_counter()
+        app.destroy()
+
+    app.after_idle(ventana)
+    app.after(5, dispositivos)
+    app.mainloop()
+    return {k: (v - _INICIO)*1000 for k, v in tiempos.items()}, numpy_al_crear
 
-        if incr != 0:
-            try:
-                numvdd = int((rangemax-rangemin)/incr)+1
-                vdd = np.linspace(rangemin, rangemax, numvdd)
-            except:
-                self._console_print(self.recordform.consola,"Revise los parámetros elegidos\n",'red')
-                return
-        else:
-            if rangemax != rangemin:
-                self._console_print(self.recordform.consola,"Revise los parámetros elegidos\n",'red')
-                return
-            else:
-                vdd = [rangemax]
-                
-        if incrvgs != 0:
-            try:
-                numvgs = int((rangevgsmax-rangevgsmin)/incrvgs)+1
-                vgs = np.linspace(rangevgsmin, rangevgsmax, numvgs)*0.1
-            except:
-                self._console_print(self.recordform.consola,"Revise los parámetros elegidos\n",'red')
-                return
-        else:
-            if rangevgsmax != rangevgsmin:
-                self._console_print(self.recordform.consola,"Revise los parámetros elegidos\n",'red')
-                return
-            else:
-                vgs = [rangevgsmax]*0.1
-
-        self._console_print(self.recordform.consola,"Iniciando medida\n",'blue')
-        self.medida_output =[]        
-        countervgs = 0
-        while countervgs < len(vgs):
-            countervdd = 0
-            valuevgs = vgs[countervgs]
-            self._writemyDAQ("ao0", valuevgs)
-            medida_given_vgs = [{"IB (µA)": "IB (µA)", "VCE (V)": "VCE (V)", "IC (mA)": "IC (mA)"}]
-        
-            while countervdd < len(vdd):
-                value = vdd[countervdd]
-                self._writemyDAQ("ao1", value)
-                vpuerta = "%.4f" % round(valuevgs*10,4)
-                vmeas = self._readmyDAQ("ai0")
-                vemitter = self._readmyDAQ("ai1")
-                ids = (value-vmeas)/resistor*1000
-                vds = "%.4f" % round(vmeas-vemitter,4)
-                ids = "%.4f" % round(ids,4)
-                if abs(float(ids))*30 <= 500:   #Se comprueba en relación a la potencia total disponible (500 mw) en los +-15 (30)      
-                    lectura = 'IB (µA): '+str(vpuerta)+ \
-                     ' ; VCE (V): '+str(vds)+ \
-                     ' ; IC (mA): '+ str(ids)+'\n' 
-                    self._console_print(self.recordform.consola,lectura)
-                    medida_given_vgs.append({"IB (µA)": vpuerta, "VCE (V)": vds, "IC (mA)": ids})
-                    countervdd = countervdd + 1
-                else:
-                    self._console_print(self.recordform.consola,"Excedida potencia máxima\n",'blue')
-                    countervdd = len(vdd)  
-            self.medida_output.append(medida_given_vgs)
-            countervgs = countervgs + 1    
 
-        self._console_print(self.recordform.consola,"Medida finalizada\n",'blue')
-        
 if __name__ == "__main__":
-    app = Application()
+    parser = argparse.ArgumentParser(description="USAL myDAQ - Medida de dispositivos")
+    parser.add_argument("--simulado", nargs="?", type=int, const=1, default=0, metavar="N",
+                        help="usar N myDAQ simulados con la placa USAL (1 si no se indica)")
+    parser.add_argument("--latencia", action="store_true",
+                        help="comparar la latencia por punto y salir")
+    parser.add_argument("--arranque", action="store_true",
+                        help="medir el tiempo de arranque y salir")
+    args = parser.parse_args()
+    
+    if args.arranque:
+        tiempos, numpy_al_crear = medir_arranque(args.simulado)
+        for etapa, ms in tiempos.items():
+            print("{:<14} {:8.1f} ms".format(etapa, ms))
+        print("numpy cargado al crear la ventana: {}".format("sí" if numpy_al_crear else "no"))
+        sys.exit()
+    
+    if args.latencia:
+        backend = crear_backend(args.simulado)
+        dispositivos = backend.dispositivos()
+        if len(dispositivos) == 0:
+            sys.exit("No se encontraron dispositivos")
+        por_tarea, por_sesion = comparar_latencia(backend, dispositivos[0])
+        if por_tarea is None:
+            print("Una tarea por operación:  no se puede comparar con el myDAQ simulado")
+        else:
+            print("Una tarea por operación:  {:.2f} ms por punto".format(por_tarea*1000))
+        print("Sesión persistente:       {:.2f} ms por punto".format(por_sesion*1000))
+        sys.exit()
+    app = Application(simulado=args.simulado)
     #app.iconbitmap('D:\\beta\\ICONO.ico')
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,598 @@
+# adquisicion.py
+"""Ejecución de los barridos, sin interfaz gráfica"""
+
+import queue
+import threading
+import time
+import numpy as np
+from asentamiento import Asentamiento
+from barrido import RESISTENCIA_BJT, LimitePotencia, PlanBarrido, PotenciaExcedida, barrido_adaptativo
+from medidas import Estadistica, Medida, RegistroContinuo, convertir, reducir
+
+# Latencia por punto de los últimos barridos temporizados por software,
+# por dispositivo y forma de leer cada punto, para estimar la duración
+_LATENCIAS = {}
+SONDEOS_LATENCIA = 5     # Puntos de prueba si aún no se ha medido
+TROZO_BUFFER = 10        # Consignas por onda en las curvas de subida temporizadas por hardware
+
+
+class MedidaCancelada(Exception):
+    """Se pidió cancelar la medida en curso"""
+
+
+class Control:
+    """Órdenes de cancelar, pausar y reanudar para una medida en otro hilo
+
+    La medida las atiende entre punto y punto, o entre onda y onda con
+    temporizado por hardware.
+    """
+
+    def __init__(self):
+        self._cancelado = threading.Event()
+        self._activo = threading.Event()
+        self._activo.set()
+
+    def cancelar(self):
+        self._cancelado.set()
+        self._activo.set()
+
+    def pausar(self):
+        self._activo.clear()
+
+    def reanudar(self):
+        self._activo.set()
+
+    @property
+    def cancelado(self):
+        return self._cancelado.is_set()
+
+    @property
+    def en_pausa(self):
+        return not self._activo.is_set()
+
+    def esperar(self):
+        """Espera mientras la medida está en pausa"""
+        self._activo.wait()
+
+
+class Consumidor(threading.Thread):
+    """Segunda etapa de la medida punto a punto
+
+    El hilo que mide solo aplica las consignas, lee las entradas y deja
+    cada punto en un búfer preasignado para todo el barrido; este hilo
+    formatea las lecturas, escribe los mensajes, guarda los puntos en la
+    medida, el registro continuo y la estadística, mientras el siguiente
+    punto ya se está midiendo. Las tareas se atienden en el orden en que
+    se encargan. Un error al guardar se lanza de nuevo en terminar().
+    """
+
+    def __init__(self, adquisicion, medida, capacidad):
+        super().__init__(daemon=True)
+        self.adquisicion = adquisicion
+        self.medida = medida
+        self.filas = np.empty((capacidad, len(medida.columnas)))
+        self.incertidumbres = np.empty(capacidad)
+        self.instantes = np.empty(capacidad)
+        self.error = None
+        self._ocupados = 0
+        self._tareas = queue.SimpleQueue()
+
+    def punto(self, curva, indice, fila, incertidumbre):
+        """Encarga guardar un punto medido en la consigna `indice` de la curva"""
+        hueco = self._ocupados
+        self.filas[hueco] = fila
+        self.incertidumbres[hueco] = incertidumbre
+        self.instantes[hueco] = time.monotonic()
+        self._ocupados += 1
+        self._tareas.put((self._guardar, (curva, indice, hueco)))
+
+    def mensaje(self, texto, *color):
+        self._tareas.put((self.adquisicion.mensaje, (texto,) + color))
+
+    def encargar(self, funcion, *args):
+        self._tareas.put((funcion, args))
+
+    def _guardar(self, curva, indice, hueco):
+        fila = tuple(self.filas[hueco])
+        incertidumbre = self.incertidumbres[hueco]
+        self.adquisicion._lectura(self.medida.columnas, fila, incertidumbre)
+        self.medida.agregar(curva, *fila, incertidumbre=incertidumbre, instante=self.instantes[hueco])
+        self.adquisicion._acumular(curva, indice, fila)
+
+    def run(self):
+        while True:
+            tarea = self._tareas.get()
+            if tarea is None:
+                return
+            if self.error is None:
+                funcion, args = tarea
+                try:
+                    funcion(*args)
+                except Exception as error:
+                    # Se lanza en el hilo que mide, al terminar
+                    self.error = error
+
+    def terminar(self):
+        """Espera a que se atiendan todas las tareas encargadas"""
+        self._tareas.put(None)
+        self.join()
+        if self.error is not None:
+            raise self.error
+
+
+class Adquisicion:
+    """Un barrido completo sobre un dispositivo
+
+    `parametros` usa los nombres de las variables del formulario. Los
+    mensajes para el usuario se entregan a mensaje(texto, *color), y
+    al_empezar(medida) recibe la medida en cuanto se crea, para poder
+    seguirla mientras se llena. Con un `control` la medida puede
+    cancelarse o pausarse desde otro hilo.
+    """
+
+    def __init__(self, backend, dispositivo, parametros, mensaje=None, al_empezar=None, control=None):
+        self.backend = backend
+        self.dispositivo = dispositivo
+        self.parametros = parametros
+        self.mensaje = mensaje or (lambda texto, *color: None)
+        self.al_empezar = al_empezar or (lambda medida: None)
+        self.control = control or Control()
+        self.sesion = None
+        self.medida = None
+        self.asentamiento = None
+        self.estadistica = None
+        self._salidas = {}
+        self._salto = 0.0
+
+    def ejecutar(self):
+        """Mide y devuelve la medida, o None si los parámetros no son válidos
+
+        Con varias repeticiones se devuelve la media de cada consigna, con
+        su estadística, en lugar de las medidas de cada repetición.
+        """
+        repeticiones = max(1, self.parametros['Repeticiones'])
+        try:
+            plan = PlanBarrido.desde_parametros(self.parametros)
+            if self.parametros['Barrido adaptativo']:
+                if self.parametros['Tipo de medida'] == "Superficie MOS":
+                    raise ValueError("la superficie MOS necesita una rejilla fija, sin barrido adaptativo")
+                if repeticiones > 1:
+                    raise ValueError("las repeticiones necesitan una rejilla fija, sin barrido adaptativo")
+        except ValueError as error:
+            self.mensaje("Revise los parámetros elegidos: {}\n".format(error),'red')
+            return None
+        tipo = plan.tipo
+
+        sesion = self.backend.sesion(self.dispositivo)
+        try:
+            plan.validar(sesion.rango)
+        except ValueError as error:
+            self.mensaje("Revise los parámetros elegidos: {}\n".format(error),'red')
+            return None
+        self.asentamiento = Asentamiento(
+            tipo, plan.resistencia, self.parametros['Asentamiento'],
+            self.parametros['Tolerancia asentamiento (mV)']/1000, self.parametros['Espera máxima (ms)']/1000)
+        if repeticiones > 1:
+            self.estadistica = Estadistica(3, plan.ncurvas, plan.npuntos)
+        puntos = 0
+        with sesion as self.sesion:
+            self.sesion.configurar(tipo, self.parametros['Valor de R (Ohm)'])
+            self._informe_plan(plan, repeticiones)
+            inicio = time.perf_counter()
+            try:
+                for repeticion in range(repeticiones):
+                    if repeticiones > 1:
+                        self.mensaje("Repetición {} de {}\n".format(repeticion + 1, repeticiones),'blue')
+                    if self.parametros['Barrido adaptativo']:
+                        self._medida_adaptativa(plan)
+                    elif self.parametros['Temporizado por hardware']:
+                        self._medida_buffer(plan)
+                    else:
+                        self._medida_puntual(plan)
+                    self.medida.terminar()
+                    puntos += self.medida.puntos
+                    self._cerrar_registro()
+            except MedidaCancelada:
+                # Se conserva lo medido hasta el último punto completo
+                self._apagar_salidas()
+                self.medida.terminar()
+                puntos += self.medida.puntos
+                self._cerrar_registro()
+                self.mensaje("Medida cancelada\n",'red')
+            duracion = time.perf_counter() - inicio
+        self.sesion = None
+        self._informe_latencia(duracion, puntos)
+        self._informe_asentamiento()
+        if self.estadistica is not None:
+            fecha = self.medida.fecha
+            self.medida = self.estadistica.medida(
+                tipo, self.parametros['Ref'], plan.resistencia, self.medida.parametros)
+            self.medida.fecha = fecha
+            self.medida.terminar()
+            self.al_empezar(self.medida)
+        return self.medida
+
+    def _apagar_salidas(self):
+        for canal in self._salidas:
+            self._escribir(canal, 0.0)
+
+    def _punto_de_control(self):
+        """Atiende las órdenes del control entre dos puntos
+
+        En pausa las salidas quedan a 0 V y al reanudar recuperan sus
+        valores, así que la medida sigue tras el último punto completo.
+        Lanza MedidaCancelada si se canceló.
+        """
+        if self.control.en_pausa and not self.control.cancelado:
+            salidas = dict(self._salidas)
+            self._apagar_salidas()
+            self.mensaje("Medida en pausa\n",'blue')
+            self.control.esperar()
+            if not self.control.cancelado:
+                for canal, valor in salidas.items():
+                    self._escribir(canal, valor)
+                self.mensaje("Medida reanudada\n",'blue')
+        if self.control.cancelado:
+            raise MedidaCancelada
+
+    def _cerrar_registro(self):
+        if self.medida.registro is not None:
+            registro, self.medida.registro = self.medida.registro, None
+            registro.cerrar()
+            self.mensaje("Registro guardado en {}\n".format(registro.filename),'green')
+
+    def _acumular(self, curva, indices, columnas):
+        """Añade los puntos a la estadística de las repeticiones, si la hay"""
+        if self.estadistica is not None:
+            self.estadistica.agregar(curva, indices, columnas)
+
+    def _clave_latencia(self):
+        return (self.dispositivo, self.parametros['Muestras por punto'],
+                self.parametros['Muestras con señal baja'], self.parametros['Asentamiento'])
+
+    def _latencia(self, plan):
+        """Latencia por punto: la del último barrido parecido o, si no lo
+        hay, la de unos puntos de prueba en la primera consigna"""
+        latencia = _LATENCIAS.get(self._clave_latencia())
+        if latencia is not None:
+            return latencia
+        if plan.canal_exterior is not None:
+            self._escribir(plan.canal_exterior, plan.exterior[0])
+        inicio = time.perf_counter()
+        for _ in range(SONDEOS_LATENCIA):
+            self._leer_punto(plan.tipo, plan.exterior[0], plan.canal_interior, plan.interior[0], plan.resistencia)
+        return (time.perf_counter() - inicio)/SONDEOS_LATENCIA
+
+    def _informe_plan(self, plan, repeticiones=1):
+        """Muestra el número de puntos y la duración prevista antes de medir"""
+        if self.parametros['Barrido adaptativo']:
+            puntos = plan.ncurvas*max(2, self.parametros['Puntos máximos'])
+            duracion = puntos*self._latencia(plan)
+            self.mensaje("{} curvas de hasta {} puntos; duración estimada hasta {:.1f} s\n".format(
+                plan.ncurvas, puntos//plan.ncurvas, duracion),'blue')
+            return
+        if self.parametros['Temporizado por hardware']:
+            duracion = plan.duracion(frecuencia=self.parametros['Frecuencia (S/s)'],
+                                     muestras=max(1, self.parametros['Muestras por punto']))
+        else:
+            duracion = plan.duracion(self._latencia(plan))
+        if repeticiones > 1:
+            self.mensaje("{} repeticiones de {} curvas × {} puntos = {} puntos; duración estimada {:.1f} s\n".format(
+                repeticiones, plan.ncurvas, plan.npuntos, repeticiones*plan.puntos, repeticiones*duracion),'blue')
+        else:
+            self.mensaje("{} curvas × {} puntos = {} puntos; duración estimada {:.1f} s\n".format(
+                plan.ncurvas, plan.npuntos, plan.puntos, duracion),'blue')
+        if plan.orden == "serpentina" and plan.ncurvas > 1:
+            self.mensaje("Orden en serpentina: recorrido de la salida de {:.0f} V en lugar de {:.0f} V\n".format(
+                plan.recorrido(), plan.recorrido("ascendente")),'blue')
+
+    def _informe_latencia(self, duracion, puntos):
+        """Muestra el tiempo medio por punto del barrido"""
+        if puntos > 0:
+            if not self.parametros['Temporizado por hardware']:
+                _LATENCIAS[self._clave_latencia()] = duracion/puntos
+            self.mensaje("{} puntos en {:.2f} s ({:.2f} ms por punto)\n".format(
+                puntos, duracion, duracion/puntos*1000),'blue')
+
+    @property
+    def promedia(self):
+        """Si se toma más de una muestra en algún punto"""
+        return max(self.parametros['Muestras por punto'], self.parametros['Muestras con señal baja']) > 1
+
+    def _informe_asentamiento(self):
+        """Muestra el retardo aprendido y lo guarda para otras medidas"""
+        if self.asentamiento.modo == "ninguno":
+            return
+        if self.asentamiento.constante is not None:
+            self.mensaje("Constante de asentamiento aprendida: {:.2f} ms\n".format(self.asentamiento.constante*1000),'blue')
+        if self.asentamiento.agotados:
+            self.mensaje("{} puntos no se asentaron en la espera máxima\n".format(self.asentamiento.agotados),'red')
+        try:
+            self.asentamiento.guardar()
+        except OSError:
+            self.mensaje("No se pudieron guardar los tiempos de asentamiento\n",'red')
+
+    def _nueva_medida(self, tipo, ncurvas, npuntos, resistor):
+        """Medida vacía para el barrido, con su registro en disco si se pide"""
+        # Con la medida se guardan también el dispositivo y su número de serie
+        parametros = {k: v for k, v in self.parametros.items() if k != 'Ref'}
+        parametros.update(Dispositivo=self.dispositivo, Serie=self.backend.serie(self.dispositivo))
+        medida = Medida(tipo, ncurvas, npuntos, self.parametros['Ref'], resistor, parametros,
+                        incertidumbre=self.promedia)
+        if self.parametros['Registro continuo']:
+            try:
+                medida.registro = RegistroContinuo(medida)
+            except OSError:
+                self.mensaje("No se pudo crear el registro continuo\n",'red')
+        self.medida = medida
+        self.al_empezar(medida)
+        return medida
+
+    def _escribir(self, canal, valor):
+        """Escribe una salida y acumula el salto hasta el próximo asentamiento"""
+        self._salto = max(self._salto, abs(valor - self._salidas.get(canal, 0.0)))
+        self._salidas[canal] = valor
+        self.sesion.escribir(canal, valor)
+
+    def _leer_punto(self, tipo, valor, canal, consigna, resistor):
+        """Aplica una consigna del barrido interior y lee el punto
+
+        Devuelve la fila de la medida y la incertidumbre de la corriente, o
+        None si la lectura no es válida. Si se promedia, las muestras se
+        leen de una vez, y si la corriente queda por debajo del umbral de
+        señal baja se completan hasta las muestras de esa región.
+        """
+        self._escribir(canal, consigna)
+        self.asentamiento.esperar(self.sesion, self._salto)
+        self._salto = 0.0
+        if not self.promedia:
+            ai0 = self.sesion.leer("ai0")
+            ai1 = self.sesion.leer("ai1") if tipo == "Ic-Vce BJT" else 0.0
+            fila, valido = convertir(tipo, valor, consigna, ai0, ai1, resistor)
+            return (fila, np.nan) if valido else None
+
+        n = max(1, self.parametros['Muestras por punto'])
+        n_bajo = self.parametros['Muestras con señal baja']
+        muestras = np.asarray(self.sesion.leer_muestras(n))
+        (ai0, ai1), (u0, _) = reducir(muestras, self.parametros['Promedio'])
+        fila, valido = convertir(tipo, valor, consigna, ai0, ai1, resistor)
+        if valido and n_bajo > n and abs(fila[2]) < self.parametros['Umbral señal baja (mA)']:
+            muestras = np.hstack([muestras, self.sesion.leer_muestras(n_bajo - n)])
+            (ai0, ai1), (u0, _) = reducir(muestras, self.parametros['Promedio'])
+            fila, valido = convertir(tipo, valor, consigna, ai0, ai1, resistor)
+        return (fila, u0/resistor*1000) if valido else None
+
+    def _lectura(self, columnas, fila, incertidumbre):
+        lectura = ' ; '.join('%s: %.4f' % c for c in zip(columnas, fila))
+        if not np.isnan(incertidumbre):
+            lectura += ' ± %.4f' % incertidumbre
+        self.mensaje(lectura + '\n')
+
+    def _bajando(self, plan, interior, limite):
+        """Si la curva se recorre de bajada: en serpentina, cuando la salida
+        quedó más cerca del final del barrido y la potencia lo permite"""
+        if plan.orden != "serpentina" or plan.canal_interior not in self._salidas:
+            return False
+        ultima = self._salidas[plan.canal_interior]
+        return ultima > (interior[0] + interior[-1])/2 and limite.permite_bajar()
+
+    def _medida_puntual(self, plan):
+        """Medida punto a punto temporizada por software
+
+        Antes de cada consigna se comprueba que la potencia prevista no
+        excede la disponible, y después, que no la excedió la medida. Este
+        hilo solo mide; los mensajes y el guardado de los puntos van a un
+        Consumidor que trabaja mientras se mide el punto siguiente.
+        """
+        tipo = plan.tipo
+        exterior, resistor = plan.exterior, plan.resistencia
+        canal_ext, canal_int = plan.canal_exterior, plan.canal_interior
+
+        self.mensaje("Iniciando medida\n",'blue')
+        medida = self._nueva_medida(tipo, plan.ncurvas, plan.npuntos, resistor)
+        limite = LimitePotencia()
+        consumidor = Consumidor(self, medida, plan.puntos)
+        consumidor.start()
+
+        try:
+            for curva, valor in enumerate(exterior):
+                interior = plan.consignas[curva]
+                limite.empezar_curva()
+                if not limite.permite(interior[0]):
+                    consumidor.mensaje("Se omiten las curvas restantes: excederían la potencia máxima\n",'blue')
+                    break
+                bajando = self._bajando(plan, interior, limite)
+                if canal_ext is not None:
+                    if not bajando and self._salidas.get(canal_int, interior[0]) != interior[0]:
+                        # La curva nueva no debe empezar con la salida
+                        # interior en el final de la anterior
+                        self._escribir(canal_int, interior[0])
+                    self._escribir(canal_ext, valor)
+                consumidor.encargar(medida.empezar_curva, curva)
+                corte = None
+                excesos = 0
+
+                # De bajada, un punto que excede la potencia no detiene la
+                # curva, porque los siguientes están por debajo, pero dos
+                # seguidos sí
+                try:
+                    for indice in range(len(interior))[::-1] if bajando else range(len(interior)):
+                        consigna = interior[indice]
+                        self._punto_de_control()
+                        if not limite.permite(consigna):
+                            consumidor.mensaje("Se prevé exceder la potencia máxima en {:.4f} V\n".format(consigna),'blue')
+                            corte = consigna
+                            if bajando:
+                                continue
+                            break
+                        punto = self._leer_punto(tipo, valor, canal_int, consigna, resistor)
+                        if punto is None:
+                            continue
+                        fila, incertidumbre = punto
+                        if limite.excede(fila[2]):
+                            consumidor.mensaje("Excedida potencia máxima\n",'blue')
+                            corte = consigna
+                            excesos += 1
+                            if bajando and excesos < 2:
+                                continue
+                            break
+                        excesos = 0
+                        consumidor.punto(curva, indice, fila, incertidumbre)
+                        limite.registrar(consigna, fila[2])
+                finally:
+                    if bajando:
+                        consumidor.encargar(medida.ordenar_curva, curva)
+                limite.terminar_curva(corte)
+        finally:
+            consumidor.terminar()
+
+        self.mensaje("Medida finalizada\n",'blue')
+
+    def _medida_buffer(self, plan):
+        """Medida con barridos temporizados por hardware
+
+        Las curvas de subida se envían en ondas de hasta TROZO_BUFFER
+        consignas y entre una onda y la siguiente se comprueba la potencia
+        como en la medida punto a punto: se descartan los puntos desde el
+        primero que la excede, la onda siguiente se acorta hasta la primera
+        consigna que se prevé que la excederá y las curvas siguientes ya no
+        llegan hasta ese punto. Una curva de bajada va en una sola onda, y solo si la
+        potencia lo permite como en la medida punto a punto. Si se promedia,
+        cada consigna se repite 'Muestras por punto' veces; el umbral de
+        señal baja no se aplica porque la onda se fija antes. El tiempo de
+        asentamiento lo marca la frecuencia de muestreo.
+        """
+        tipo = plan.tipo
+        frecuencia = self.parametros['Frecuencia (S/s)']
+        repeticiones = max(1, self.parametros['Muestras por punto'])
+        exterior, resistor = plan.exterior, plan.resistencia
+        canal_ext, canal_int = plan.canal_exterior, plan.canal_interior
+
+        self.mensaje("Iniciando medida temporizada por hardware\n",'blue')
+        medida = self._nueva_medida(tipo, plan.ncurvas, plan.npuntos, resistor)
+        limite = LimitePotencia()
+        ultima = None
+
+        for curva, valor in enumerate(exterior):
+            interior = plan.consignas[curva]
+            limite.empezar_curva()
+            fin = limite.alcance(interior)
+            if fin == 0 or not limite.permite(interior[0]):
+                self.mensaje("Se omiten las curvas restantes: excederían la potencia máxima\n",'blue')
+                break
+            consignas = interior[:fin]
+            bajando = (plan.orden == "serpentina" and ultima is not None
+                       and ultima > (consignas[0] + consignas[-1])/2 and limite.permite_bajar())
+            corte = interior[fin] if fin < len(interior) else None
+            excedida = False
+            inicio = 0
+            parametro = None
+            while inicio < fin and not excedida:
+                self._punto_de_control()
+                # Sin puntos de la curva no hay previsión: las ondas empiezan
+                # con tres consignas y crecen con los puntos ya medidos
+                trozo = consignas if bajando else consignas[inicio:inicio + min(TROZO_BUFFER, max(3, inicio))]
+                if not bajando:
+                    permitidas = [limite.permite(consigna) for consigna in trozo]
+                    if not all(permitidas):
+                        trozo = trozo[:permitidas.index(False)]
+                        corte = consignas[inicio + len(trozo)]
+                        self.mensaje("Se prevé exceder la potencia máxima en {:.4f} V\n".format(corte),'blue')
+                        fin = inicio + len(trozo)
+                        if not len(trozo):
+                            break
+                # La onda puede ir de bajada, pero las lecturas se vuelven a
+                # poner en orden creciente antes de procesarlas
+                onda = trozo[::-1] if bajando else trozo
+                canales = {canal_int: np.repeat(onda, repeticiones)}
+                if canal_ext is not None:
+                    canales[canal_ext] = np.full(len(onda)*repeticiones, valor)
+                lecturas = np.asarray(self.sesion.barrido(frecuencia, **canales)).reshape(2, len(onda), repeticiones)
+                if bajando:
+                    lecturas = lecturas[:, ::-1]
+                ultima = onda[-1]
+                self._salidas[canal_int] = ultima
+                if canal_ext is not None:
+                    self._salidas[canal_ext] = valor
+                (ai0, ai1), (u0, _) = reducir(lecturas, self.parametros['Promedio'])
+
+                columnas, validos = convertir(tipo, valor, trozo, ai0, ai1, resistor)
+                parametro = columnas[0][0]
+                validos = np.broadcast_to(validos, len(trozo)).copy()
+                exceso = np.flatnonzero(validos & (np.abs(columnas[2]) > limite.corriente_max))
+                if exceso.size:
+                    corte = trozo[exceso[0]]
+                    validos[exceso[0]:] = False
+                    excedida = True
+                for consigna, corriente in zip(trozo[validos], columnas[2][validos]):
+                    limite.registrar(consigna, corriente)
+
+                medida.agregar_bloque(curva, *(c[validos] for c in columnas),
+                                      incertidumbre=(u0/resistor*1000)[validos])
+                self._acumular(curva, inicio + np.flatnonzero(validos), [c[validos] for c in columnas])
+                inicio += len(trozo)
+            limite.terminar_curva(corte)
+
+            if canal_ext is not None and parametro is not None:
+                self.mensaje("{}: {:.4f} ; {} puntos\n".format(medida.parametro, parametro, medida.n[curva]))
+            if excedida:
+                self.mensaje("Excedida potencia máxima\n",'blue')
+
+        self.mensaje("Medida finalizada\n",'blue')
+
+    def _medida_adaptativa(self, plan):
+        """Medida con el paso de la curva interior adaptado a su forma
+
+        Cada curva empieza con una rejilla gruesa entre los extremos del
+        barrido y se refina donde más se dobla, hasta la tolerancia o el
+        número máximo de puntos por curva. Cada ronda de refinado mide en
+        orden creciente, así que el orden en serpentina no se aplica.
+        """
+        tipo = plan.tipo
+        incr = self.parametros['IncrementoVGS' if tipo == "Id-Vgs MOS" else 'Incremento']
+        tolerancia = self.parametros['Tolerancia (mA)']
+        presupuesto = max(2, self.parametros['Puntos máximos'])
+        exterior, resistor = plan.exterior, plan.resistencia
+        canal_ext, canal_int = plan.canal_exterior, plan.canal_interior
+
+        self.mensaje("Iniciando medida adaptativa\n",'blue')
+        medida = self._nueva_medida(tipo, plan.ncurvas, presupuesto, resistor)
+        limite = LimitePotencia()
+
+        for curva, valor in enumerate(exterior):
+            interior = plan.consignas[curva]
+            limite.empezar_curva()
+            if not limite.permite(interior[0]):
+                self.mensaje("Se omiten las curvas restantes: excederían la potencia máxima\n",'blue')
+                break
+            if canal_ext is not None:
+                self._escribir(canal_ext, valor)
+            medida.empezar_curva(curva)
+
+            def medir(consigna):
+                self._punto_de_control()
+                if not limite.permite(consigna):
+                    raise PotenciaExcedida
+                punto = self._leer_punto(tipo, valor, canal_int, consigna, resistor)
+                if punto is None:
+                    return None
+                fila, incertidumbre = punto
+                if limite.excede(fila[2]):
+                    self.mensaje("Excedida potencia máxima\n",'blue')
+                    # Las previsiones siguientes interpolan hacia este punto
+                    limite.registrar(consigna, fila[2])
+                    raise PotenciaExcedida
+                self._lectura(medida.columnas, fila, incertidumbre)
+                medida.agregar(curva, *fila, incertidumbre=incertidumbre)
+                limite.registrar(consigna, fila[2])
+                return fila[2]
+
+            # No se refina por debajo de la cuarta parte del incremento elegido,
+            # y a la zona de corriente apreciable se llega con ese incremento
+            _, _, corte = barrido_adaptativo(medir, interior[0], interior[-1], tolerancia, presupuesto,
+                                             paso_min=abs(incr)/4 or 1e-3, paso_max=abs(incr) or None,
+                                             umbral=limite.corriente_max/100)
+            limite.terminar_curva(corte)
+            medida.ordenar_curva(curva)
+
+        self.mensaje("Medida finalizada\n",'blue')
@@ -0,0 +1,140 @@
+# analisis.py
+"""Extracción de los parámetros de los dispositivos a partir de las medidas
+
+Todas las curvas de una familia se ajustan a la vez: cada ajuste es una
+recta por mínimos cuadrados y las sumas de todas las curvas se calculan de
+una vez sobre la matriz (curva, punto) de la medida, con los puntos que no
+entran en el ajuste fuera de la máscara.
+"""
+
+import numpy as np
+
+VT = 0.02585            # Tensión térmica a 300 K (V)
+CORRIENTE_MIN = 0.05    # Por debajo de esta corriente manda el ruido (mA)
+VCE_ACTIVA = 0.5        # El BJT se considera en activa por encima (V)
+
+# Parámetros de cada tipo de medida, con su unidad para mostrarlos
+UNIDADES = {
+    "n": "", "Is": "A",
+    "Vth": "V", "k": "mA/V²", "λ": "1/V", "gm": "mS",
+    "β": "", "VA": "V",
+}
+
+
+def _rectas(x, y, mascara):
+    """Pendiente y ordenada de la recta de cada fila, y puntos usados
+
+    x e y tienen forma (curva, punto); solo cuentan los puntos de la
+    máscara. Las filas con menos de dos puntos dan NaN.
+    """
+    w = (mascara & ~np.isnan(x) & ~np.isnan(y)).astype(float)
+    x = np.where(w > 0, x, 0.0)
+    y = np.where(w > 0, y, 0.0)
+    n = w.sum(axis=-1)
+    sx, sy = (w*x).sum(axis=-1), (w*y).sum(axis=-1)
+    sxx, sxy = (w*x*x).sum(axis=-1), (w*x*y).sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        det = n*sxx - sx*sx
+        pendiente = (n*sxy - sx*sy)/det
+        ordenada = (sy - pendiente*sx)/n
+    malas = (n < 2) | (det == 0)
+    pendiente[malas] = np.nan
+    ordenada[malas] = np.nan
+    return pendiente, ordenada, n
+
+
+def _diodo(p, x, y):
+    # Región directa: ln(I) = ln(Is) + V/(n·VT)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mascara = (y > CORRIENTE_MIN) & (x > 0)
+        pendiente, ordenada, _ = _rectas(x, np.log(np.where(mascara, y, 1.0)), mascara)
+        return {}, {"n": 1/(pendiente*VT), "Is": np.exp(ordenada)/1000}
+
+
+def _mos_salida(vgs, vds, i):
+    # En saturación (VDS ≥ VGS) ID = a·(1 + λ·VDS), con a = k/2·(VGS - Vth)²
+    pendiente, ordenada, _ = _rectas(vds, i, vds >= np.maximum(vgs, 0) + 0.5)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        conduce = ordenada > CORRIENTE_MIN
+        lam = np.where(conduce, pendiente/ordenada, np.nan)
+        raiz = np.sqrt(np.where(conduce, ordenada, np.nan))
+    v = vgs[:, :1]
+    s, o, _ = _rectas(v.T, raiz[None, :], conduce[None, :])
+    k = 2*s[0]**2
+    vth = -o[0]/s[0]
+    return {"Vth": vth, "k": k}, {"λ": lam, "gm": np.where(conduce, k*(v[:, 0] - vth), np.nan)}
+
+
+def _mos_transferencia(vds, vgs, i):
+    # En saturación √ID = √(k/2)·(VGS - Vth). Una primera estimación de
+    # Vth sale de las corrientes más bajas por encima del ruido, que aún
+    # están en saturación, y el ajuste final usa todos los puntos con
+    # VGS - Vth ≤ VDS
+    pico = np.where(np.isnan(i), 0, i).max(axis=-1)[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raiz = np.sqrt(np.maximum(i, 0))
+        mascara = i > CORRIENTE_MIN
+        s, o, _ = _rectas(vgs, raiz, mascara & (i <= 0.3*pico))
+        vth = -o/s
+        s, o, _ = _rectas(vgs, raiz, mascara & (vgs - vth[:, None] <= vds))
+        vth = -o/s
+        # Los puntos válidos de cada curva son consecutivos: las diferencias
+        # con el relleno dan NaN
+        gm = np.diff(i, axis=-1)/np.diff(vgs, axis=-1)
+        gm = np.where(np.isnan(gm), -np.inf, gm).max(axis=-1, initial=-np.inf)
+    gm[np.isinf(gm)] = np.nan
+    return {}, {"Vth": vth, "k": 2*s**2, "gm": gm}
+
+
+def _bjt(ib, vce, i):
+    # En activa IC = β·IB·(1 + VCE/VA)
+    pendiente, ordenada, _ = _rectas(vce, i, vce >= VCE_ACTIVA)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        conduce = (ib[:, 0] > 0) & (ordenada > CORRIENTE_MIN)
+        beta = np.where(conduce, ordenada*1000/ib[:, 0], np.nan)
+        return {}, {"β": beta, "VA": np.where(conduce, ordenada/pendiente, np.nan)}
+
+
+AJUSTES = {
+    "I-V Diodo": _diodo,
+    "Id-Vds MOS": _mos_salida,
+    "Id-Vgs MOS": _mos_transferencia,
+    "Ic-Vce BJT": _bjt,
+}
+
+
+def analizar(medida, curvas=None):
+    """Parámetros extraídos de las primeras `curvas` curvas de la medida
+
+    Devuelve un diccionario con los parámetros comunes a la familia y otro
+    con un array por parámetro, con un valor por curva; NaN donde no hay
+    puntos suficientes para el ajuste.
+    """
+    curvas = medida.ncurvas if curvas is None else curvas
+    datos = medida.datos[:, :curvas]
+    return AJUSTES[medida.tipo](*datos)
+
+
+def _formato(nombre, valor):
+    if np.isnan(valor):
+        return "{} = -".format(nombre)
+    unidad = UNIDADES[nombre]
+    numero = "{:.3e}".format(valor) if nombre == "Is" else "{:.4g}".format(valor)
+    return "{} = {}{}".format(nombre, numero, " " + unidad if unidad else "")
+
+
+def resumen(medida, curvas=None):
+    """Texto con los parámetros extraídos, una línea por curva"""
+    curvas = medida.ncurvas if curvas is None else curvas
+    if curvas == 0:
+        return ""
+    familia, por_curva = analizar(medida, curvas)
+    lineas = []
+    if familia:
+        lineas.append(" ; ".join(_formato(k, v) for k, v in familia.items()))
+    for curva in range(curvas):
+        texto = " ; ".join(_formato(k, v[curva]) for k, v in por_curva.items())
+        if medida.parametro is not None:
+            texto = "{} = {:.4g}: {}".format(medida.parametro, medida.valor_parametro(curva), texto)
+        lineas.append(texto)
+    return "\n".join(lineas)
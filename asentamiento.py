@@ -0,0 +1,115 @@
+# asentamiento.py
+"""Espera tras cada escalón de las salidas hasta que las entradas se asientan"""
+
+import json
+import os
+import tempfile
+import numpy as np
+
+ARCHIVO_ASENTAMIENTO = os.path.join(os.path.expanduser("~"), "USALmyDAQ", "asentamiento.json")
+
+MODOS = ("ninguno", "sondeo", "aprendido")
+MIN_OBSERVACIONES = 20      # Observaciones necesarias para fijar un retardo
+MAX_OBSERVACIONES = 200     # Solo se guardan las más recientes
+VERIFICAR_CADA = 50         # Con retardo aprendido, se sondea uno de cada tantos puntos
+MARGEN = 1.2                # Sobre el percentil 95 de lo observado
+
+
+class Asentamiento:
+    """Control del tiempo de asentamiento de un barrido
+
+    En modo "sondeo" se leen bloques de muestras tras cada escritura hasta
+    que la media de dos bloques seguidos difiere menos que la tolerancia,
+    o hasta agotar la espera máxima.
+
+    Un salto de tensión ΔV tarda en entrar en la tolerancia unas
+    τ·ln(ΔV/tolerancia), así que cada tiempo observado se guarda como una
+    constante de tiempo equivalente, por tipo de medida y resistencia de la
+    placa. En modo "aprendido", con bastantes observaciones, se espera sin
+    sondear el percentil 95 de esa constante, con un margen, por el
+    logaritmo del salto; uno de cada VERIFICAR_CADA puntos se sigue
+    sondeando para que el retardo se ajuste si la placa cambia. Las
+    observaciones se guardan en un JSON para las siguientes medidas.
+    """
+
+    def __init__(self, tipo, resistencia, modo="aprendido", tolerancia=1e-3, espera_max=0.1,
+                 bloque=10, archivo=ARCHIVO_ASENTAMIENTO):
+        if modo not in MODOS:
+            raise ValueError("Modo de asentamiento desconocido: {}".format(modo))
+        self.clave = "{}|{:g}".format(tipo, resistencia)
+        self.modo = modo
+        self.tolerancia = tolerancia
+        self.espera_max = espera_max
+        self.bloque = bloque
+        self.archivo = archivo
+        self.agotados = 0
+        self._puntos = 0
+        self.observaciones = []
+        if modo != "ninguno":
+            self.observaciones = _leer(archivo).get(self.clave, [])
+        self.constante = self._estimar()
+
+    def _estimar(self):
+        if self.modo != "aprendido" or len(self.observaciones) < MIN_OBSERVACIONES:
+            return None
+        return float(np.percentile(self.observaciones, 95))*MARGEN
+
+    def _escala(self, salto):
+        return np.log(max(salto/self.tolerancia, np.e))
+
+    def retardo(self, salto):
+        """Espera aprendida para un salto de las salidas, o None"""
+        if self.constante is None:
+            return None
+        return self.constante*self._escala(salto)
+
+    def esperar(self, sesion, salto):
+        """Espera a que se asiente un salto de `salto` voltios en las salidas"""
+        if self.modo == "ninguno" or salto == 0:
+            return
+        self._puntos += 1
+        if self.constante is not None and self._puntos % VERIFICAR_CADA:
+            sesion.esperar(self.retardo(salto))
+            return
+
+        inicio = sesion.reloj()
+        anterior = np.mean(sesion.leer_muestras(self.bloque), axis=1)
+        while True:
+            actual = np.mean(sesion.leer_muestras(self.bloque), axis=1)
+            transcurrido = sesion.reloj() - inicio
+            if np.all(np.abs(actual - anterior) < self.tolerancia):
+                break
+            if transcurrido > self.espera_max:
+                # Se anota lo esperado aunque se quede corto, para no
+                # aprender solo de los saltos que se asientan antes
+                self.agotados += 1
+                break
+            anterior = actual
+
+        self.observaciones = (self.observaciones + [transcurrido/self._escala(salto)])[-MAX_OBSERVACIONES:]
+        self.constante = self._estimar()
+
+    def guardar(self):
+        """Sustituye en el archivo las observaciones de esta clave por las actuales
+
+        Se escribe un temporal que luego reemplaza al archivo, para que los
+        procesos que miden en paralelo nunca lo lean a medio escribir.
+        """
+        if self.modo == "ninguno":
+            return
+        datos = _leer(self.archivo)
+        datos[self.clave] = self.observaciones
+        directorio = os.path.dirname(self.archivo)
+        os.makedirs(directorio, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directorio,
+                                         suffix=".tmp", delete=False) as a_file:
+            json.dump(datos, a_file, ensure_ascii=False, indent=1)
+        os.replace(a_file.name, self.archivo)
+
+
+def _leer(archivo):
+    try:
+        with open(archivo, encoding='utf-8') as a_file:
+            return json.load(a_file)
+    except (OSError, ValueError):
+        return {}
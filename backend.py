@@ -0,0 +1,173 @@
+# backend.py
+"""Interfaz común de los sistemas de adquisición"""
+
+import threading
+import time
+
+
+class ErrorDispositivo(Exception):
+    """El dispositivo dejó de responder, normalmente porque se desconectó"""
+
+
+class SesionDAQ:
+    """Canales AO/AI de un dispositivo abiertos durante un barrido
+
+    Las subclases implementan abrir, cerrar, escribir, leer y barrido con
+    la misma semántica que SesionmyDAQ. `canales` asocia a cada canal su
+    ruta física y su rango de tensión (mínimo, máximo).
+    """
+
+    def __init__(self, dispositivo, canales):
+        self.dispositivo = dispositivo
+        self.canales = canales
+
+    def __enter__(self):
+        self.abrir()
+        return self
+
+    def __exit__(self, *_):
+        self.cerrar()
+
+    def rango(self, canal):
+        return self.canales[canal][1]
+
+    def configurar(self, tipo, resistencia):
+        """Informa del tipo de medida y de la resistencia de la placa.
+        En el myDAQ real lo fijan los interruptores, así que no hace nada"""
+
+    def abrir(self):
+        raise NotImplementedError
+
+    def cerrar(self):
+        raise NotImplementedError
+
+    def escribir(self, canal, valor):
+        raise NotImplementedError
+
+    def leer(self, canal):
+        raise NotImplementedError
+
+    def leer_muestras(self, n):
+        """n lecturas seguidas de ai0 y ai1, como lista [ai0, ai1] de listas"""
+        muestras = [[], []]
+        for _ in range(n):
+            muestras[0].append(self.leer("ai0"))
+            muestras[1].append(self.leer("ai1"))
+        return muestras
+
+    def barrido(self, frecuencia, **canales):
+        raise NotImplementedError
+
+    def esperar(self, segundos):
+        time.sleep(segundos)
+
+    def reloj(self):
+        """Segundos en la escala de tiempo del dispositivo"""
+        return time.perf_counter()
+
+
+class BackendDAQ:
+    """Enumera dispositivos y abre sesiones sobre ellos
+
+    sesion() acepta los canales ya resueltos; si no se dan, los resuelve
+    con canales(), que pregunta al driver.
+    """
+
+    def dispositivos(self):
+        raise NotImplementedError
+
+    def canales(self, dispositivo):
+        raise NotImplementedError
+
+    def sesion(self, dispositivo, canales=None):
+        raise NotImplementedError
+
+    def serie(self, dispositivo):
+        """Número de serie del dispositivo, o "" si no se conoce"""
+        return ""
+
+    def tarea_suelta(self, ruta, valor=None):
+        """Escribe valor en el canal de la ruta dada, o lo lee si no se da
+        valor, con una tarea creada y cerrada solo para esa operación"""
+        raise NotImplementedError
+
+
+class RegistroDispositivos:
+    """Dispositivos conectados, con sus canales resueltos una sola vez
+
+    Se usa como un backend: dispositivos() devuelve la lista de la última
+    enumeración y sesion() entrega los canales guardados, así que medir no
+    consulta al driver. actualizar() vuelve a enumerar, descarta los canales
+    de los dispositivos retirados y devuelve los que aparecieron y los que
+    se retiraron. La vigilancia lo actualiza desde otro hilo, así que un
+    cerrojo separa la enumeración de la resolución de canales.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._dispositivos = []
+        self._canales = {}
+        self._cerrojo = threading.Lock()
+
+    def actualizar(self):
+        with self._cerrojo:
+            actuales = list(self.backend.dispositivos())
+            nuevos = [d for d in actuales if d not in self._dispositivos]
+            retirados = [d for d in self._dispositivos if d not in actuales]
+            for dispositivo in retirados:
+                self._canales.pop(dispositivo, None)
+            self._dispositivos = actuales
+        return nuevos, retirados
+
+    def dispositivos(self):
+        return list(self._dispositivos)
+
+    def canales(self, dispositivo):
+        with self._cerrojo:
+            if dispositivo not in self._canales:
+                self._canales[dispositivo] = self.backend.canales(dispositivo)
+            return self._canales[dispositivo]
+
+    def sesion(self, dispositivo, canales=None):
+        return self.backend.sesion(dispositivo, canales or self.canales(dispositivo))
+
+    def serie(self, dispositivo):
+        return self.backend.serie(dispositivo)
+
+
+def crear_backend(simulado=False):
+    """Backend del myDAQ real o, si se pide, el simulado
+
+    simulado puede ser el número de myDAQ simulados.
+    """
+    if simulado:
+        from simulador import BackendSimulado
+        return BackendSimulado(dispositivos=int(simulado))
+    from mydaq import BackendNI
+    return BackendNI()
+
+
+def comparar_latencia(backend, dispositivo, puntos=100):
+    """Mide la latencia por punto (escritura + lectura) con una tarea suelta
+    por operación, como el programa original, y con una sesión persistente.
+    Devuelve ambas en segundos; la primera es None si el backend no crea
+    tareas, como el simulado"""
+
+    canales = backend.canales(dispositivo)
+    try:
+        inicio = time.perf_counter()
+        for _ in range(puntos):
+            backend.tarea_suelta(canales["ao0"][0], 0.0)
+            backend.tarea_suelta(canales["ai0"][0])
+        por_tarea = (time.perf_counter() - inicio) / puntos
+    except NotImplementedError:
+        por_tarea = None
+
+    with backend.sesion(dispositivo, canales) as sesion:
+        inicio = time.perf_counter()
+        for _ in range(puntos):
+            sesion.escribir("ao0", 0.0)
+            sesion.leer("ai0")
+        por_sesion = (time.perf_counter() - inicio) / puntos
+
+    return por_tarea, por_sesion
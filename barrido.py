@@ -0,0 +1,368 @@
+# barrido.py
+"""Generación de las consignas de los barridos"""
+
+import numpy as np
+
+# Resistencia de colector de la placa en la medida del BJT (Ohm)
+RESISTENCIA_BJT = 10
+
+# Más consignas que estas en un eje suelen ser un incremento equivocado
+MAX_CONSIGNAS = 100000
+
+ORDENES = ("ascendente", "serpentina")
+
+
+class PotenciaExcedida(Exception):
+    """El punto medido supera la potencia disponible en la placa"""
+
+
+def rango(minimo, maximo, incremento, nombre="VDD"):
+    """Consignas de minimo a maximo con el incremento dado
+
+    Lanza ValueError con la causa si los valores no son coherentes.
+    """
+    if incremento == 0:
+        if maximo != minimo:
+            raise ValueError("el incremento de {} es 0 pero el mínimo y el máximo difieren".format(nombre))
+        return np.array([float(minimo)])
+    pasos = (maximo - minimo)/incremento
+    if pasos < 0:
+        raise ValueError("el incremento de {} no lleva de {:g} a {:g}".format(nombre, minimo, maximo))
+    # El margen evita perder el último punto por redondeo, como en 0.7/0.1
+    n = int(pasos + 1e-9) + 1
+    if n > MAX_CONSIGNAS:
+        raise ValueError("{} consignas de {} son demasiadas".format(n, nombre))
+    return np.linspace(minimo, maximo, n)
+
+
+class PlanBarrido:
+    """Consignas de todas las curvas de un barrido, calculadas de antemano
+
+    `exterior` tiene un valor por curva, con [None] si solo hay una curva
+    sin parámetro, y `consignas` es la matriz de consignas del barrido
+    interior de cada curva, una fila por curva, siempre en orden creciente.
+
+    Con orden "serpentina" las curvas pueden recorrerse alternando el
+    sentido, para que cada una empiece cerca de donde acabó la anterior en
+    lugar de volver de golpe al mínimo; la medida se guarda igualmente en
+    orden creciente.
+    """
+
+    def __init__(self, tipo, exterior, canal_exterior, interior, canal_interior, resistencia,
+                 orden="ascendente"):
+        if orden not in ORDENES:
+            raise ValueError("orden de barrido desconocido: {}".format(orden))
+        self.tipo = tipo
+        self.orden = orden
+        self.exterior = exterior
+        self.canal_exterior = canal_exterior
+        self.interior = np.asarray(interior, dtype=float)
+        self.canal_interior = canal_interior
+        self.resistencia = resistencia
+        self.consignas = np.tile(self.interior, (len(exterior), 1))
+
+    @classmethod
+    def desde_parametros(cls, parametros):
+        """Plan a partir de los parámetros del formulario; ValueError si no
+        son válidos"""
+        tipo = parametros['Tipo de medida']
+        orden = parametros['Orden']
+        vdd = rango(parametros['VDD Min'], parametros['VDD Max'], parametros['Incremento'], "VDD")
+        resistencia = parametros['Valor de R (Ohm)']
+        if tipo == "I-V Diodo":
+            return cls(tipo, [None], None, vdd, "ao0", resistencia, orden)
+        vgs = rango(parametros['VGS Min'], parametros['VGS Max'], parametros['IncrementoVGS'],
+                    "IB" if tipo == "Ic-Vce BJT" else "VGS")
+        if tipo in ("Id-Vds MOS", "Superficie MOS"):
+            # La superficie se mide como una familia Id-Vds
+            return cls("Id-Vds MOS", vgs, "ao1", vdd, "ao0", resistencia, orden)
+        if tipo == "Id-Vgs MOS":
+            return cls(tipo, vdd, "ao0", vgs, "ao1", resistencia, orden)
+        # IB en µA a través de RB = 100 kΩ
+        return cls(tipo, vgs*0.1, "ao0", vdd, "ao1", RESISTENCIA_BJT, orden)
+
+    @property
+    def ncurvas(self):
+        return len(self.exterior)
+
+    @property
+    def npuntos(self):
+        return len(self.interior)
+
+    @property
+    def puntos(self):
+        return self.consignas.size
+
+    def validar(self, rango_canal):
+        """Comprueba las consignas contra el rango de cada salida
+
+        rango_canal(canal) devuelve el (mínimo, máximo) de la salida. Lanza
+        ValueError si alguna consigna queda fuera.
+        """
+        for canal, consignas in ((self.canal_exterior, self.exterior), (self.canal_interior, self.interior)):
+            if canal is None:
+                continue
+            minimo, maximo = rango_canal(canal)
+            if min(consignas) < minimo or max(consignas) > maximo:
+                raise ValueError("las consignas de {} deben estar entre {:g} y {:g} V".format(
+                    canal, minimo, maximo))
+
+    def recorrido(self, orden=None):
+        """Suma de los saltos de la salida del barrido interior, en voltios,
+        si se recorre en el orden dado o en el del plan"""
+        filas = self.consignas.copy()
+        if (orden or self.orden) == "serpentina":
+            filas[1::2] = filas[1::2, ::-1]
+        return float(np.abs(np.diff(np.concatenate([[0.0], filas.ravel()]))).sum())
+
+    def duracion(self, latencia=None, frecuencia=None, muestras=1):
+        """Duración estimada del barrido en segundos
+
+        Con temporizado por hardware se da la frecuencia de muestreo y cada
+        curva dura lo que su forma de onda, con `muestras` muestras por
+        consigna; si no, cada punto tarda la latencia dada.
+        """
+        if frecuencia:
+            return self.ncurvas*(self.npuntos*muestras + 1)/frecuencia
+        return self.puntos*latencia
+
+
+def _error_intervalos(x, y):
+    """Error estimado al interpolar linealmente en cada intervalo
+
+    Para cada punto interior se mide cuánto se separa de la recta que une a
+    sus vecinos; cada intervalo toma el mayor de sus dos extremos.
+    """
+    pendiente = (y[2:] - y[:-2])/(x[2:] - x[:-2])
+    desvio = np.abs(y[1:-1] - (y[:-2] + pendiente*(x[1:-1] - x[:-2])))
+    errores = np.zeros(len(x) - 1)
+    errores[:-1] = desvio
+    errores[1:] = np.maximum(errores[1:], desvio)
+    return errores
+
+
+def barrido_adaptativo(medir, vmin, vmax, tolerancia, presupuesto, inicial=9, paso_min=1e-3,
+                       paso_max=None, umbral=0.0):
+    """Barrido que empieza con una rejilla gruesa y la refina donde la curva
+    se dobla
+
+    medir(v) aplica la consigna v y devuelve la corriente, None si la lectura
+    no es válida, o lanza PotenciaExcedida. En cada ronda se parten por la
+    mitad los intervalos cuyo error de interpolación supera la tolerancia,
+    empezando por los peores, hasta gastar el presupuesto de puntos o no
+    quedar intervalos de más de 2·paso_min que partir. Los puntos nuevos de
+    cada ronda se miden en orden creciente.
+
+    Con paso_max, en cuanto una corriente supera `umbral` en valor absoluto
+    la rejilla gruesa se acerca a cada punto siguiente en pasos que empiezan
+    en paso_max y se doblan mientras la corriente no llegue a doblarse de un
+    punto al siguiente: un salto grueso en una curva exponencial como la del
+    diodo podría aplicar mucha más corriente de la prevista.
+
+    La rejilla gruesa se detiene en la primera consigna que excede la
+    potencia; a partir de ahí ese límite se acota por bisección junto con
+    el resto de intervalos, sin aplicar consignas por encima de él. Devuelve
+    las consignas y corrientes válidas, ordenadas, y la consigna límite
+    (None si no se alcanzó).
+    """
+    x = []
+    y = []
+    limite = None
+    medidos = 0
+
+    def probar(v):
+        nonlocal limite, medidos
+        medidos += 1
+        try:
+            i = medir(v)
+        except PotenciaExcedida:
+            limite = v if limite is None else min(limite, v)
+            return False
+        if i is not None:
+            x.append(v)
+            y.append(i)
+        return True
+
+    def acercar(hasta):
+        """Mide entre el último punto y `hasta`; False si excede la potencia"""
+        v, paso = x[-1], paso_max
+        while abs(y[-1]) > umbral and hasta - v > paso and medidos < presupuesto:
+            anterior, validos, v = y[-1], len(y), v + paso
+            if not probar(v):
+                return False
+            crece_poco = len(y) > validos and abs(y[-1]) < 2*abs(anterior)
+            paso = min(2*paso, hasta - v) if crece_poco else paso_max
+        return True
+
+    for v in np.linspace(vmin, vmax, max(2, min(inicial, presupuesto))):
+        if paso_max and x and not acercar(v):
+            break
+        if medidos >= presupuesto or not probar(v):
+            break
+
+    while medidos < presupuesto and (len(x) >= 2 or (x and limite is not None)):
+        orden = np.argsort(x)
+        xs, ys = np.asarray(x)[orden], np.asarray(y)[orden]
+        errores = np.zeros(len(xs) - 1)
+        if len(xs) >= 3:
+            errores = _error_intervalos(xs, ys)
+        extremos = np.append(xs, limite) if limite is not None else xs
+        if limite is not None:
+            # El tramo hasta el límite de potencia siempre se acota
+            errores = np.append(errores, np.inf)
+        errores[np.diff(extremos) < 2*paso_min] = 0
+        medios = (extremos[:-1] + extremos[1:])/2
+        if limite is not None:
+            errores[medios >= limite] = 0
+        candidatos = np.flatnonzero(errores > tolerancia)
+        if candidatos.size == 0:
+            break
+        candidatos = candidatos[np.argsort(errores[candidatos])[::-1]][:presupuesto - medidos]
+        for v in np.sort(medios[candidatos]):
+            if limite is not None and v >= limite:
+                continue
+            probar(v)
+
+    orden = np.argsort(x)
+    return np.asarray(x)[orden], np.asarray(y)[orden], limite
+
+
+class LimitePotencia:
+    """Vigilancia predictiva de la potencia disponible en la placa
+
+    La placa dispone de 500 mW en sus fuentes de ±15 V (30 V en total). Antes
+    de aplicar cada consigna se extrapola su corriente a partir de los tres
+    puntos ya medidos más cercanos por debajo: de forma lineal con los dos
+    últimos y, si la corriente crece de forma exponencial, también así, y se
+    toma la mayor. Si la pendiente cae de un tramo al siguiente, la curva
+    se está aplanando: no se extrapola de forma exponencial, la recta
+    sigue con la pendiente reducida en la misma proporción y se acota con
+    la forma de la curva anterior, escalada a la corriente actual.
+
+    En las familias se recuerda la consigna en la que se cortó la curva
+    anterior: si las corrientes crecen de una curva a la siguiente, la
+    siguiente no llega a esa consigna, y si ni siquiera se puede aplicar
+    la primera se omiten las curvas restantes.
+
+    Una curva solo puede recorrerse de bajada si la anterior terminó entera
+    y su corriente máxima prevista no llega a la mitad de la disponible: de
+    bajada no hay puntos inferiores con los que prever la corriente.
+    """
+
+    def __init__(self, potencia=500, tension=30):
+        self.corriente_max = potencia/tension   # mA
+        self.corte = None
+        self._anterior = None
+        self._pico_penultima = None
+        self._completa = False
+        self._x = []
+        self._y = []
+
+    def excede(self, corriente):
+        return abs(corriente) > self.corriente_max
+
+    def empezar_curva(self):
+        self._x = []
+        self._y = []
+
+    def registrar(self, consigna, corriente):
+        self._x.append(consigna)
+        self._y.append(corriente)
+
+    def prevision(self, consigna):
+        """Corriente esperada en la consigna, o None si no hay datos"""
+        x = np.asarray(self._x)
+        if x.size and consigna <= x.max():
+            # Entre puntos ya medidos basta con interpolar
+            orden = np.argsort(x)
+            return np.interp(consigna, x[orden], np.asarray(self._y)[orden])
+        debajo = np.flatnonzero(x < consigna)
+        if debajo.size < 3:
+            return None
+        cercanos = debajo[np.argsort(consigna - x[debajo])[:3]]
+        (x2, x1, x0), (y2, y1, y0) = x[cercanos], np.asarray(self._y)[cercanos]
+        if x2 == x1 or x1 == x0:
+            return None
+        pendiente, pendiente_anterior = (y2 - y1)/(x2 - x1), (y1 - y0)/(x1 - x0)
+        aplana = pendiente*pendiente_anterior > 0 and abs(pendiente) < abs(pendiente_anterior)
+        if aplana:
+            # La pendiente cae, como en el codo de saturación del BJT o en
+            # la región óhmica del MOSFET: la recta sobrestima la corriente,
+            # así que la pendiente sigue cayendo al mismo ritmo
+            pendiente *= pendiente/pendiente_anterior
+            forma = self._forma_anterior(x2, consigna)
+            if forma is not None:
+                # La curva anterior ya pasó por el codo: su forma, escalada
+                # a la corriente actual, acota la recta
+                return min(y2 + pendiente*(consigna - x2), y2*forma, key=abs)
+        previsiones = [y2 + pendiente*(consigna - x2)]
+        # La extrapolación exponencial solo tiene sentido fuera del ruido y
+        # si la corriente ya venía creciendo así en los tres puntos, como en
+        # el diodo; se toma el menor de los dos ritmos de crecimiento
+        if not aplana and abs(y0) > self.corriente_max/100 and y1/y0 > 1 and y2/y1 > 1:
+            ritmo = min(np.log(y2/y1)/(x2 - x1), np.log(y1/y0)/(x1 - x0))
+            previsiones.append(y2*np.exp(min(ritmo*(consigna - x2), 50)))
+        return max(previsiones, key=abs)
+
+    def _forma_anterior(self, desde, hasta):
+        """Cociente de corrientes de la curva anterior entre dos consignas"""
+        if self._anterior is None or not len(self._anterior[0]):
+            return None
+        xa, ya = self._anterior
+        if desde < xa[0] or hasta > xa[-1]:
+            return None
+        inicio, fin = np.interp([desde, hasta], xa, ya)
+        if inicio <= self.corriente_max/100:
+            return None
+        return fin/inicio
+
+    def permite(self, consigna):
+        """Si la consigna puede aplicarse sin exceder la potencia"""
+        if self.corte is not None and consigna >= self.corte:
+            return False
+        prevision = self.prevision(consigna)
+        return prevision is None or not self.excede(prevision)
+
+    def alcance(self, consignas):
+        """Cuántas consignas de un barrido creciente quedan antes del corte"""
+        if self.corte is None:
+            return len(consignas)
+        return int(np.searchsorted(consignas, self.corte))
+
+    def permite_bajar(self):
+        """Si la curva siguiente puede empezar por su consigna más alta
+
+        La corriente máxima de la curva siguiente se prevé escalando la de
+        la anterior en la proporción en que creció de la penúltima a la
+        anterior.
+        """
+        if not self._completa or self.corte is not None or not len(self._anterior[1]):
+            return False
+        pico = self._anterior[1].max()
+        if self._pico_penultima is not None and self._pico_penultima > self.corriente_max/100:
+            pico *= max(pico/self._pico_penultima, 1)
+        return pico < self.corriente_max/2
+
+    def terminar_curva(self, corte):
+        """Actualiza el corte para la curva siguiente
+
+        corte es la primera consigna que no se aplicó o que excedió la
+        potencia, o None si la curva terminó entera. Las corrientes de esta
+        curva y la anterior se comparan en las consignas que comparten.
+        """
+        orden = np.argsort(self._x)
+        x, y = np.asarray(self._x)[orden], np.abs(self._y)[orden]
+        crece = True
+        if self._anterior is not None and len(x) and len(self._anterior[0]):
+            xa, ya = self._anterior
+            comunes = (x >= xa[0]) & (x <= xa[-1])
+            if comunes.any():
+                crece = y[comunes].mean() >= np.interp(x[comunes], xa, ya).mean()
+        if self._anterior is not None and len(self._anterior[1]):
+            self._pico_penultima = self._anterior[1].max()
+        self._anterior = (x, y)
+        self._completa = corte is None
+        if not crece:
+            self.corte = None
+        elif corte is not None:
+            self.corte = corte if self.corte is None else min(corte, self.corte)
@@ -0,0 +1,196 @@
+# catalogo.py
+"""Catálogo local de las medidas guardadas, en SQLite
+
+Cada medida guardada se anota con su referencia, tipo, fecha, dispositivo,
+parámetros del barrido y la ruta de su archivo, así que encontrar todas
+las medidas de una pieza o de un mes no obliga a recorrer carpetas ni a
+abrir los CSV. Las búsquedas por referencia, tipo y fecha usan índices.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from medidas import cargar_csv, cargar_npz
+
+ARCHIVO_CATALOGO = os.path.join(os.path.expanduser("~"), "USALmyDAQ", "catalogo.sqlite")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS medidas (
+    id INTEGER PRIMARY KEY,
+    archivo TEXT NOT NULL UNIQUE,
+    ref TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    dispositivo TEXT NOT NULL,
+    serie TEXT NOT NULL,
+    curvas INTEGER NOT NULL,
+    puntos INTEGER NOT NULL,
+    resistencia REAL,
+    parametros TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS medidas_ref ON medidas (ref, tipo, fecha);
+CREATE INDEX IF NOT EXISTS medidas_tipo ON medidas (tipo, fecha);
+CREATE INDEX IF NOT EXISTS medidas_fecha ON medidas (fecha);
+"""
+
+EXTENSIONES = (".csv", ".txt", ".npz")
+
+# Columnas de cada medida en las búsquedas, sin los parámetros
+CAMPOS = ("id", "archivo", "ref", "tipo", "fecha", "dispositivo", "serie", "curvas", "puntos", "resistencia")
+
+
+class Catalogo:
+    """Índice de las medidas guardadas en disco
+
+    Las fechas se guardan en ISO 8601, que se ordena igual como texto que
+    como fecha. Volver a guardar en el mismo archivo sustituye la entrada.
+    Varios procesos pueden anotar medidas a la vez: SQLite espera a que
+    quede libre el archivo.
+    """
+
+    def __init__(self, archivo=ARCHIVO_CATALOGO):
+        if archivo != ":memory:":
+            os.makedirs(os.path.dirname(archivo) or ".", exist_ok=True)
+        self.archivo = archivo
+        self._conexion = sqlite3.connect(archivo, timeout=10)
+        self._conexion.row_factory = sqlite3.Row
+        with self._conexion:
+            self._conexion.executescript(ESQUEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.cerrar()
+
+    def cerrar(self):
+        self._conexion.close()
+
+    def registrar(self, medida, filename):
+        """Anota la medida guardada en `filename` y devuelve su id"""
+        p = medida.parametros
+        with self._conexion:
+            cursor = self._conexion.execute(
+                "INSERT OR REPLACE INTO medidas (archivo, ref, tipo, fecha, dispositivo, serie, curvas,"
+                " puntos, resistencia, parametros) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(filename), medida.ref, medida.tipo, medida.fecha.isoformat(),
+                 p.get('Dispositivo', ""), p.get('Serie', ""), int(medida.ncurvas), medida.puntos,
+                 medida.resistencia, json.dumps(p, ensure_ascii=False, default=str)))
+        return cursor.lastrowid
+
+    def buscar(self, ref=None, tipo=None, desde=None, hasta=None, limite=1000):
+        """Medidas que cumplen los filtros dados, de la más reciente a la
+        más antigua, como diccionarios con los CAMPOS
+
+        Una `ref` terminada en * busca las referencias que empiezan así.
+        desde y hasta son fechas o datetime; hasta incluye todo ese día si
+        es solo una fecha.
+        """
+        condiciones, valores = [], []
+        if ref:
+            if ref.endswith("*"):
+                # Por rango, para que use el índice
+                condiciones.append("ref >= ? AND ref < ?")
+                valores += [ref[:-1], ref[:-1] + "\U0010ffff"]
+            else:
+                condiciones.append("ref = ?")
+                valores.append(ref)
+        if tipo:
+            condiciones.append("tipo = ?")
+            valores.append(tipo)
+        if desde:
+            condiciones.append("fecha >= ?")
+            valores.append(desde.isoformat())
+        if hasta:
+            # Con solo la fecha, "T99" queda detrás de cualquier hora del día
+            condiciones.append("fecha < ?")
+            valores.append(hasta.isoformat() if isinstance(hasta, datetime) else hasta.isoformat() + "T99")
+        consulta = "SELECT {} FROM medidas".format(", ".join(CAMPOS))
+        if condiciones:
+            consulta += " WHERE " + " AND ".join(condiciones)
+        consulta += " ORDER BY fecha DESC LIMIT ?"
+        return [dict(fila) for fila in self._conexion.execute(consulta, valores + [limite])]
+
+    def parametros(self, id_medida):
+        """Parámetros del barrido de una medida del catálogo"""
+        fila = self._conexion.execute("SELECT parametros FROM medidas WHERE id = ?", (id_medida,)).fetchone()
+        return json.loads(fila["parametros"]) if fila else None
+
+    def referencias(self):
+        return [f[0] for f in self._conexion.execute("SELECT DISTINCT ref FROM medidas ORDER BY ref")]
+
+    def indexar(self, directorio):
+        """Anota las medidas guardadas que haya bajo el directorio y
+        devuelve cuántas se anotaron"""
+        anotadas = 0
+        for raiz, _, archivos in os.walk(directorio):
+            for nombre in archivos:
+                if not nombre.lower().endswith(EXTENSIONES):
+                    continue
+                filename = os.path.join(raiz, nombre)
+                try:
+                    medida = cargar(filename)
+                except (OSError, ValueError, KeyError):
+                    # No es una medida, o está dañada
+                    continue
+                self.registrar(medida, filename)
+                anotadas += 1
+        return anotadas
+
+    def purgar(self):
+        """Quita las medidas cuyo archivo ya no existe y devuelve cuántas"""
+        perdidas = [(f["id"],) for f in self._conexion.execute("SELECT id, archivo FROM medidas")
+                    if not os.path.exists(f["archivo"])]
+        with self._conexion:
+            self._conexion.executemany("DELETE FROM medidas WHERE id = ?", perdidas)
+        return len(perdidas)
+
+
+def cargar(filename):
+    """Lee una medida guardada en NPZ o, con cualquier otra extensión, en CSV"""
+    if filename.lower().endswith(".npz"):
+        return cargar_npz(filename)
+    return cargar_csv(filename)
+
+
+def catalogar(medida, filename, archivo=ARCHIVO_CATALOGO):
+    """Anota una medida recién guardada; devuelve False si no se pudo"""
+    try:
+        with Catalogo(archivo) as catalogo:
+            catalogo.registrar(medida, filename)
+        return True
+    except (sqlite3.Error, OSError):
+        return False
+
+
+def _fecha(texto):
+    return datetime.strptime(texto, "%Y-%m-%d").date()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="USAL myDAQ - Catálogo de medidas")
+    parser.add_argument("--ref", help="referencia de la pieza; con * al final, las que empiezan así")
+    parser.add_argument("--tipo", help="tipo de medida, p. ej. \"Id-Vgs MOS\"")
+    parser.add_argument("--desde", type=_fecha, help="fecha inicial AAAA-MM-DD")
+    parser.add_argument("--hasta", type=_fecha, help="fecha final AAAA-MM-DD, incluida")
+    parser.add_argument("--indexar", nargs="+", metavar="DIRECTORIO",
+                        help="anotar antes las medidas guardadas en estos directorios")
+    parser.add_argument("--purgar", action="store_true",
+                        help="quitar las medidas cuyo archivo ya no existe")
+    args = parser.parse_args(argv)
+
+    with Catalogo() as catalogo:
+        for directorio in args.indexar or []:
+            print("{} medidas anotadas de {}".format(catalogo.indexar(directorio), directorio))
+        if args.purgar:
+            print("{} medidas sin archivo quitadas".format(catalogo.purgar()))
+        for fila in catalogo.buscar(args.ref, args.tipo, args.desde, args.hasta):
+            print("{fecha:.19}  {ref:<12} {tipo:<12} {curvas:>3} curvas {puntos:>6} puntos  {archivo}".format(**fila))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
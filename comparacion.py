@@ -0,0 +1,120 @@
+# comparacion.py
+"""Comparación de muchas medidas guardadas sobre los mismos ejes
+
+Las medidas se leen la primera vez que se piden y las curvas densas se
+dibujan diezmadas según la anchura en píxeles de la vista: en cada columna
+de píxeles se conservan el primer y el último punto y los de corriente
+mínima y máxima, así que la línea dibujada es la misma que con todos los
+puntos y la vista se puede mover y ampliar sin esperas.
+"""
+
+import os
+import threading
+import numpy as np
+from catalogo import cargar
+
+
+def _primeros(segmentos, posiciones):
+    """Primera de las posiciones, ya ordenadas, de cada segmento"""
+    segmentos = segmentos[posiciones]
+    return posiciones[np.flatnonzero(np.diff(segmentos, prepend=-1))]
+
+
+def diezmar(x, y, xmin, xmax, pixeles):
+    """Índices, en su orden, de los puntos que bastan para dibujar la curva
+    entre xmin y xmax con `pixeles` columnas
+
+    Los puntos fuera de la vista se reúnen en una columna a cada lado, para
+    que la línea siga llegando a los bordes. Los puntos con NaN se omiten.
+    En los barridos crecientes, los más habituales, solo se recorren los
+    puntos de la vista y no hace falta ordenar.
+    """
+    validos = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+    pixeles = max(1, int(pixeles))
+    if len(validos) <= 4*(pixeles + 2) or not xmax > xmin:
+        return validos
+    x, y = x[validos], y[validos]
+    orden = None
+    if np.all(x[1:] >= x[:-1]):
+        inicio, fin = np.searchsorted(x, [xmin, xmax])
+        inicio, fin = max(inicio - 1, 0), min(fin + 1, len(x))
+        validos, x, y = validos[inicio:fin], x[inicio:fin], y[inicio:fin]
+        if len(validos) <= 4*(pixeles + 2):
+            return validos
+    columnas = np.clip(np.floor((x - xmin)/(xmax - xmin)*pixeles), -1, pixeles).astype(np.int64)
+    if not np.all(columnas[1:] >= columnas[:-1]):
+        orden = np.argsort(columnas, kind='stable')
+        columnas, y = columnas[orden], y[orden]
+
+    # Con las columnas ordenadas, cada una es un segmento contiguo
+    inicios = np.concatenate(([0], np.flatnonzero(np.diff(columnas)) + 1))
+    longitudes = np.diff(np.append(inicios, len(y)))
+    segmentos = np.repeat(np.arange(len(inicios)), longitudes)
+    minimos = np.minimum.reduceat(y, inicios)[segmentos]
+    maximos = np.maximum.reduceat(y, inicios)[segmentos]
+    elegidos = np.concatenate((inicios, inicios + longitudes - 1,
+                               _primeros(segmentos, np.flatnonzero(y == minimos)),
+                               _primeros(segmentos, np.flatnonzero(y == maximos))))
+    if orden is not None:
+        elegidos = orden[elegidos]
+    return validos[np.unique(elegidos)]
+
+
+class Comparacion:
+    """Lista de medidas guardadas, cada una leída la primera vez que se pide
+
+    Todas las medidas deben ser del mismo tipo que la primera que se lee;
+    las de otro tipo dan ValueError al pedirlas. Las medidas pueden leerse
+    en un hilo mientras otro consulta las ya leídas.
+    """
+
+    def __init__(self, archivos=()):
+        self.archivos = []
+        self.tipo = None
+        self._medidas = {}
+        self._cerrojo = threading.Lock()
+        self.anadir(archivos)
+
+    def __len__(self):
+        return len(self.archivos)
+
+    def anadir(self, archivos):
+        """Añade los archivos que aún no están; devuelve sus posiciones"""
+        posiciones = []
+        for archivo in map(os.path.abspath, archivos):
+            if archivo not in self.archivos:
+                self.archivos.append(archivo)
+                posiciones.append(len(self.archivos) - 1)
+        return posiciones
+
+    def cargada(self, i):
+        with self._cerrojo:
+            return i in self._medidas
+
+    def medida(self, i):
+        """Medida del archivo i, leída del disco la primera vez"""
+        with self._cerrojo:
+            if i in self._medidas:
+                return self._medidas[i]
+        # El disco se lee fuera del cerrojo para no bloquear las consultas
+        medida = cargar(self.archivos[i])
+        with self._cerrojo:
+            if self.tipo is None:
+                self.tipo = medida.tipo
+            elif medida.tipo != self.tipo:
+                raise ValueError("{} es una medida {}, no {}".format(
+                    os.path.basename(self.archivos[i]), medida.tipo, self.tipo))
+            return self._medidas.setdefault(i, medida)
+
+    def nombre(self, i):
+        """Referencia de la medida i, o el nombre de su archivo si no tiene"""
+        with self._cerrojo:
+            medida = self._medidas.get(i)
+        if medida is not None and medida.ref:
+            return medida.ref
+        return os.path.splitext(os.path.basename(self.archivos[i]))[0]
+
+    def puntos(self):
+        with self._cerrojo:
+            medidas = list(self._medidas.values())
+        return sum(m.puntos for m in medidas)
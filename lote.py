@@ -0,0 +1,242 @@
+# lote.py
+"""Medidas por lotes a partir de recetas, sin interfaz gráfica
+
+Una receta es un archivo TOML o JSON. Las claves de primer nivel son
+comunes a todas las medidas y cada entrada de `medida` las completa o las
+cambia. Si `ref` es una lista se hace una medida por referencia, como en
+una bandeja de piezas:
+
+    tipo = "Id-Vds MOS"
+    salida = "resultados/{ref}-{fecha}-{tipo}.csv"
+
+    [[medida]]
+    ref = ["M1", "M2", "M3"]
+    vgs_max = 4
+
+La salida se guarda en NPZ si termina en .npz y si no en CSV, y se anota en
+el catálogo de medidas. Con el tipo "Superficie MOS" se guarda además la
+característica de transferencia, con "-transferencia" antes de la extensión.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from adquisicion import Adquisicion
+from analisis import resumen
+from backend import ErrorDispositivo, RegistroDispositivos, crear_backend
+from catalogo import catalogar
+from medidas import guardar_csv, guardar_npz
+from parametros import parametros_por_defecto
+from superficie import SuperficieMOS
+
+# Claves de la receta y variable del formulario que corresponde a cada una
+CLAVES = {
+    "tipo": 'Tipo de medida',
+    "ref": 'Ref',
+    "vdd_min": 'VDD Min',
+    "vdd_max": 'VDD Max',
+    "incremento": 'Incremento',
+    "vgs_min": 'VGS Min',
+    "vgs_max": 'VGS Max',
+    "incremento_vgs": 'IncrementoVGS',
+    "resistencia": 'Valor de R (Ohm)',
+    "temporizado": 'Temporizado por hardware',
+    "frecuencia": 'Frecuencia (S/s)',
+    "registro": 'Registro continuo',
+    "adaptativo": 'Barrido adaptativo',
+    "tolerancia": 'Tolerancia (mA)',
+    "puntos_max": 'Puntos máximos',
+    "muestras": 'Muestras por punto',
+    "muestras_bajas": 'Muestras con señal baja',
+    "umbral_bajo": 'Umbral señal baja (mA)',
+    "promedio": 'Promedio',
+    "asentamiento": 'Asentamiento',
+    "tolerancia_asentamiento": 'Tolerancia asentamiento (mV)',
+    "espera_max": 'Espera máxima (ms)',
+    "orden": 'Orden',
+    "repeticiones": 'Repeticiones',
+}
+
+SALIDA = "{ref}-{fecha}-{tipo}.csv"
+SALIDA_SIN_REF = "{fecha}-{tipo}.csv"
+
+
+def cargar_receta(filename):
+    """Lista de medidas de una receta, cada una como (parámetros, salida)
+
+    Los parámetros llevan los nombres del formulario y parten de los
+    valores que este propone para cada tipo de medida.
+    """
+    if filename.lower().endswith(".json"):
+        with open(filename, encoding='utf-8') as a_file:
+            receta = json.load(a_file)
+    else:
+        import tomllib
+        with open(filename, 'rb') as a_file:
+            receta = tomllib.load(a_file)
+
+    comunes = {k: v for k, v in receta.items() if k != "medida"}
+    medidas = []
+    for entrada in receta.get("medida", [{}]):
+        entrada = dict(comunes, **entrada)
+        refs = entrada.get("ref", "")
+        for ref in refs if isinstance(refs, list) else [refs]:
+            medidas.append(_preparar(dict(entrada, ref=ref)))
+    return medidas
+
+
+def _preparar(entrada):
+    desconocidas = set(entrada) - set(CLAVES) - {"salida"}
+    if desconocidas:
+        raise ValueError("Claves desconocidas en la receta: {}".format(", ".join(sorted(desconocidas))))
+    parametros = parametros_por_defecto(entrada.get("tipo", "I-V Diodo"))
+    for clave, valor in entrada.items():
+        if clave in CLAVES:
+            parametros[CLAVES[clave]] = type(parametros[CLAVES[clave]])(valor)
+    salida = entrada.get("salida", SALIDA)
+    if parametros['Ref'] == "" and salida == SALIDA:
+        salida = SALIDA_SIN_REF
+    return parametros, salida
+
+
+def guardar(medida, salida, sufijo=""):
+    """Guarda la medida en la ruta de salida, con sus campos rellenos y el
+    sufijo antes de la extensión"""
+    filename = salida.format(ref=medida.ref, tipo=medida.tipo,
+                             fecha=medida.fecha.strftime("%Y-%m-%d-%H%M%S"),
+                             dispositivo=medida.parametros.get('Dispositivo', ""),
+                             serie=medida.parametros.get('Serie', ""))
+    base, extension = os.path.splitext(filename)
+    filename = base + sufijo + extension
+    directorio = os.path.dirname(filename)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    if filename.lower().endswith(".npz"):
+        guardar_npz(medida, filename)
+    else:
+        guardar_csv(medida, filename)
+    return filename
+
+
+def medir(backend, dispositivo, parametros, salida, mensaje):
+    """Mide y guarda una medida de la receta
+
+    Devuelve la medida, o None si no se ha guardado. Los errores del
+    dispositivo y al guardar se propagan.
+    """
+    medida = Adquisicion(backend, dispositivo, parametros, mensaje).ejecutar()
+    if not medida:
+        mensaje("No se ha guardado la medida\n", 'red')
+        return None
+    mensaje(resumen(medida) + "\n", 'blue')
+    guardadas = [(medida, guardar(medida, salida))]
+    mensaje("Guardada en {}\n".format(guardadas[0][1]), 'green')
+    if parametros['Tipo de medida'] == "Superficie MOS":
+        # La característica de transferencia sale de la misma rejilla
+        transferencia = SuperficieMOS.desde_medida(medida).familia("Id-Vgs MOS")
+        guardadas.append((transferencia, guardar(transferencia, salida, "-transferencia")))
+        mensaje("Transferencia guardada en {}\n".format(guardadas[1][1]), 'green')
+    if not all(catalogar(*guardada) for guardada in guardadas):
+        mensaje("No se pudo anotar la medida en el catálogo\n", 'red')
+    return medida
+
+
+def ejecutar_lote(backend, dispositivo, medidas, mensaje, pausa=None):
+    """Mide y guarda cada medida de la lista en orden
+
+    pausa(parametros), si se da, se llama antes de cada medida para que se
+    pueda colocar la pieza. Devuelve cuántas medidas fallaron.
+    """
+    fallos = 0
+    for i, (parametros, salida) in enumerate(medidas):
+        nombre = parametros['Ref'] or parametros['Tipo de medida']
+        if pausa is not None:
+            pausa(parametros)
+        mensaje("[{}/{}] {}\n".format(i + 1, len(medidas), nombre), 'green')
+        try:
+            if medir(backend, dispositivo, parametros, salida, mensaje) is None:
+                fallos += 1
+        except (ErrorDispositivo, OSError, ValueError) as error:
+            mensaje("Error en la medida {}: {}\n".format(nombre, error), 'red')
+            fallos += 1
+    return fallos
+
+
+def ejecutar_paralelo(medidas, simulado, mensaje):
+    """Reparte las medidas entre todos los dispositivos conectados
+
+    Cada dispositivo mide en su propio proceso. Devuelve cuántas medidas
+    fallaron.
+    """
+    from planificador import Planificador
+    planificador = Planificador(simulado)
+    dispositivos = planificador.iniciar()
+    mensaje("Midiendo en paralelo con {}\n".format(", ".join(dispositivos)), 'green')
+    for parametros, salida in medidas:
+        planificador.encargar(parametros, salida)
+    fallos = 0
+    try:
+        while planificador.pendientes():
+            textos, resultados = planificador.recoger(espera=0.5)
+            for dispositivo, (texto, color) in textos:
+                mensaje("[{}] {}".format(dispositivo, texto), color)
+            for dispositivo, resultado in resultados:
+                nombre = resultado["ref"] or "#{}".format(resultado["numero"] + 1)
+                if resultado["error"]:
+                    fallos += 1
+                    mensaje("[{}] Error en la medida {}: {}\n".format(dispositivo, nombre, resultado["error"]), 'red')
+    finally:
+        planificador.terminar()
+    for dispositivo, estado in planificador.estado.items():
+        mensaje("{} ({}): {} hechas, {} fallidas\n".format(
+            dispositivo, estado["serie"], estado["hechas"], estado["fallidas"]), 'green')
+    return fallos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="USAL myDAQ - Medidas por lotes")
+    parser.add_argument("recetas", nargs="+", help="archivos de receta TOML o JSON")
+    parser.add_argument("--simulado", nargs="?", type=int, const=1, default=0, metavar="N",
+                        help="usar N myDAQ simulados con la placa USAL (1 si no se indica)")
+    parser.add_argument("--paralelo", action="store_true",
+                        help="repartir las medidas entre todos los dispositivos, sin pausas")
+    parser.add_argument("--sin-pausa", action="store_true",
+                        help="no esperar a que se coloque cada pieza")
+    parser.add_argument("--detalle", action="store_true",
+                        help="mostrar cada punto medido")
+    args = parser.parse_args(argv)
+
+    medidas = []
+    for filename in args.recetas:
+        try:
+            medidas.extend(cargar_receta(filename))
+        except (OSError, ValueError) as error:
+            sys.exit("Receta {} no válida: {}".format(filename, error))
+
+    def mensaje(texto, *color):
+        # Sin color solo van las lecturas de cada punto
+        if color or args.detalle:
+            print(texto, end="", flush=True)
+
+    def pausa(parametros):
+        input("Coloque {} y pulse Intro ".format(parametros['Ref'] or "el dispositivo"))
+
+    inicio = datetime.now()
+    if args.paralelo:
+        fallos = ejecutar_paralelo(medidas, args.simulado, mensaje)
+    else:
+        backend = RegistroDispositivos(crear_backend(args.simulado))
+        backend.actualizar()
+        dispositivos = backend.dispositivos()
+        if len(dispositivos) == 0:
+            sys.exit("No se encontraron dispositivos")
+        fallos = ejecutar_lote(backend, dispositivos[0], medidas, mensaje,
+                               None if args.sin_pausa else pausa)
+    print("{} medidas, {} fallidas, en {}".format(len(medidas), fallos, datetime.now() - inicio))
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,465 @@
+# medidas.py
+"""Almacenamiento en columnas de las medidas"""
+
+import csv
+import itertools
+import json
+import os
+import time
+from datetime import datetime
+import numpy as np
+from registros import DIRECTORIO_REGISTROS, bloquear, soltar
+
+# Columnas de cada tipo de medida. La primera es el parámetro de la curva
+# (en el diodo, la tensión de alimentación leída), la segunda el eje x y
+# la tercera la corriente.
+COLUMNAS = {
+    "I-V Diodo": ("VDD (V)", "Vpn (V)", "Id (mA)"),
+    "Id-Vds MOS": ("VGS (V)", "VDS (V)", "ID (mA)"),
+    "Id-Vgs MOS": ("VDS (V)", "VGS (V)", "ID (mA)"),
+    "Ic-Vce BJT": ("IB (µA)", "VCE (V)", "IC (mA)"),
+}
+
+
+class Medida:
+    """Medida de un barrido en arrays float64 reservados de antemano
+
+    `datos` tiene forma (columna, curva, punto). Cada curva guarda en `n`
+    cuántos puntos válidos tiene; el resto queda a NaN. `tiempos` guarda
+    para cada punto los segundos transcurridos desde `fecha`. Las curvas y
+    columnas se entregan como vistas, sin copias. Si se promedian varias
+    muestras por punto, `incertidumbre` guarda la de la corriente. La media
+    de varias repeticiones lleva en `estadistica` el número de
+    repeticiones, la desviación típica, el mínimo y el máximo de la
+    corriente en cada punto.
+    """
+
+    def __init__(self, tipo, ncurvas, npuntos, ref="", resistencia=None, parametros=None,
+                 incertidumbre=False):
+        self.tipo = tipo
+        self.columnas = COLUMNAS[tipo]
+        self.ref = ref
+        self.resistencia = resistencia
+        self.parametros = parametros or {}
+        self.fecha = datetime.now()
+        self.fin = None
+        self.datos = np.full((len(self.columnas), ncurvas, npuntos), np.nan)
+        self.tiempos = np.full((ncurvas, npuntos), np.nan)
+        self.incertidumbre = np.full((ncurvas, npuntos), np.nan) if incertidumbre else None
+        self.n = np.zeros(ncurvas, dtype=int)
+        self.ncurvas = 0
+        self.estadistica = None
+        self.registro = None
+        self._t0 = time.monotonic()
+
+    @property
+    def unidades(self):
+        return tuple(c[c.index("(")+1:c.index(")")] for c in self.columnas)
+
+    @property
+    def columna_incertidumbre(self):
+        """Nombre de la columna de incertidumbre de la corriente"""
+        return "u " + self.columnas[2]
+
+    @property
+    def columnas_estadistica(self):
+        """Nombres de las columnas de la estadística de las repeticiones"""
+        return ("n", "σ " + self.columnas[2], "min " + self.columnas[2], "max " + self.columnas[2])
+
+    @property
+    def columnas_exportadas(self):
+        """Columnas de cada curva al exportar, con incertidumbre y estadística si las hay"""
+        columnas = self.columnas
+        if self.incertidumbre is not None:
+            columnas = columnas + (self.columna_incertidumbre,)
+        if self.estadistica is not None:
+            columnas = columnas + self.columnas_estadistica
+        return columnas
+
+    @property
+    def parametro(self):
+        """Nombre del parámetro que distingue las curvas, o None"""
+        return None if self.tipo == "I-V Diodo" else self.columnas[0]
+
+    @property
+    def puntos(self):
+        return int(self.n.sum())
+
+    def __bool__(self):
+        return self.puntos > 0
+
+    def empezar_curva(self, curva):
+        """Cuenta la curva aunque acabe sin puntos"""
+        self.ncurvas = max(self.ncurvas, curva + 1)
+
+    def agregar(self, curva, *fila, incertidumbre=np.nan, instante=None):
+        """Añade un punto al final de la curva
+
+        instante es el time.monotonic() de la lectura, si no es ahora.
+        """
+        self.empezar_curva(curva)
+        self.datos[:, curva, self.n[curva]] = fila
+        self.tiempos[curva, self.n[curva]] = (time.monotonic() if instante is None else instante) - self._t0
+        if self.incertidumbre is not None:
+            self.incertidumbre[curva, self.n[curva]] = incertidumbre
+            fila = fila + (incertidumbre,)
+        self.n[curva] += 1
+        if self.registro is not None:
+            self.registro.agregar(curva, fila)
+
+    def agregar_bloque(self, curva, *columnas, incertidumbre=np.nan):
+        """Añade de una vez varios puntos, uno por elemento de cada columna"""
+        self.empezar_curva(curva)
+        inicio = self.n[curva]
+        fin = inicio + len(columnas[0])
+        self.datos[:, curva, inicio:fin] = columnas
+        self.tiempos[curva, inicio:fin] = time.monotonic() - self._t0
+        if self.incertidumbre is not None:
+            self.incertidumbre[curva, inicio:fin] = incertidumbre
+        self.n[curva] = fin
+        if self.registro is not None:
+            for i in range(inicio, fin):
+                self.registro.agregar(curva, self.fila(curva, i))
+
+    def fila(self, curva, punto):
+        """Valores de un punto, con su incertidumbre y su estadística al
+        final si las hay"""
+        fila = tuple(self.datos[:, curva, punto])
+        if self.incertidumbre is not None:
+            fila += (self.incertidumbre[curva, punto],)
+        if self.estadistica is not None:
+            fila += tuple(self.estadistica[:, curva, punto])
+        return fila
+
+    def ordenar_curva(self, curva):
+        """Ordena los puntos de la curva según el eje x"""
+        n = self.n[curva]
+        orden = np.argsort(self.datos[1, curva, :n], kind='stable')
+        self.datos[:, curva, :n] = self.datos[:, curva, orden]
+        self.tiempos[curva, :n] = self.tiempos[curva, orden]
+        if self.incertidumbre is not None:
+            self.incertidumbre[curva, :n] = self.incertidumbre[curva, orden]
+        if self.estadistica is not None:
+            self.estadistica[:, curva, :n] = self.estadistica[:, curva, orden]
+
+    def terminar(self):
+        self.fin = datetime.now()
+
+    def metadatos(self):
+        return {
+            "tipo": self.tipo, "ref": self.ref, "resistencia": self.resistencia,
+            "parametros": self.parametros, "columnas": list(self.columnas),
+            "unidades": list(self.unidades), "fecha": self.fecha.isoformat(),
+            "fin": self.fin.isoformat() if self.fin else None,
+            "forma": list(self.datos.shape[1:]),
+            "incertidumbre": self.incertidumbre is not None,
+            "estadistica": self.estadistica is not None,
+        }
+
+    def columna(self, indice, curva=0):
+        return self.datos[indice, curva, :self.n[curva]]
+
+    def curva(self, curva=0):
+        """Vista (columna, punto) de los puntos válidos de la curva"""
+        return self.datos[:, curva, :self.n[curva]]
+
+    def valor_parametro(self, curva):
+        return self.datos[0, curva, 0]
+
+
+class Estadistica:
+    """Media, varianza, mínimo y máximo de cada consigna a lo largo de
+    varias repeticiones de un barrido
+
+    Se actualizan con el algoritmo de Welford a medida que llegan los
+    puntos, así que la memoria no crece con el número de repeticiones.
+    Los arrays tienen forma (columna, curva, consigna).
+    """
+
+    def __init__(self, ncolumnas, ncurvas, npuntos):
+        self.n = np.zeros((ncurvas, npuntos), dtype=int)
+        self.media = np.zeros((ncolumnas, ncurvas, npuntos))
+        self._m2 = np.zeros((ncolumnas, ncurvas, npuntos))
+        self.minimo = np.full((ncolumnas, ncurvas, npuntos), np.inf)
+        self.maximo = np.full((ncolumnas, ncurvas, npuntos), -np.inf)
+
+    def agregar(self, curva, indices, columnas):
+        """Añade los valores medidos en las consignas `indices` de la curva
+
+        indices es un entero o un array sin repeticiones, y columnas tiene
+        un valor o un array por columna.
+        """
+        indices = np.atleast_1d(indices)
+        columnas = np.asarray(columnas, dtype=float).reshape(len(self.media), len(indices))
+        n = self.n[curva, indices] + 1
+        delta = columnas - self.media[:, curva, indices]
+        self.media[:, curva, indices] += delta/n
+        self._m2[:, curva, indices] += delta*(columnas - self.media[:, curva, indices])
+        self.minimo[:, curva, indices] = np.minimum(self.minimo[:, curva, indices], columnas)
+        self.maximo[:, curva, indices] = np.maximum(self.maximo[:, curva, indices], columnas)
+        self.n[curva, indices] = n
+
+    @property
+    def varianza(self):
+        """Varianza muestral de cada consigna; NaN con menos de dos valores"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.n > 1, self._m2/(self.n - 1), np.nan)
+
+    def medida(self, tipo, ref="", resistencia=None, parametros=None):
+        """Medida con la media de cada consigna medida al menos una vez
+
+        La incertidumbre de la corriente es el error típico de la media.
+        """
+        ncurvas, npuntos = self.n.shape
+        medida = Medida(tipo, ncurvas, npuntos, ref, resistencia, parametros, incertidumbre=True)
+        medida.estadistica = np.full((4, ncurvas, npuntos), np.nan)
+        desviacion = np.sqrt(self.varianza[2])
+        for curva in range(ncurvas):
+            medidos = np.flatnonzero(self.n[curva])
+            medida.agregar_bloque(curva, *self.media[:, curva, medidos],
+                                  incertidumbre=desviacion[curva, medidos]/np.sqrt(self.n[curva, medidos]))
+            medida.estadistica[:, curva, :len(medidos)] = (
+                self.n[curva, medidos], desviacion[curva, medidos],
+                self.minimo[2, curva, medidos], self.maximo[2, curva, medidos])
+        return medida
+
+
+def guardar_csv(medida, filename):
+    """Escribe la medida en el CSV separado por ';' de siempre
+
+    Una fila de cabecera con los nombres de las columnas y, en las familias
+    de curvas, tres columnas por curva una junto a otra. Si la medida tiene
+    incertidumbres, cada curva lleva una cuarta columna con la de la
+    corriente, y si es la media de varias repeticiones, otras cuatro con su
+    estadística.
+    """
+    filas = max(medida.n[:medida.ncurvas], default=0)
+    columnas = medida.columnas_exportadas
+    with open(filename, 'w', newline='') as a_file:
+        if medida.ref != "":
+            a_file.write(f"Dispositivo: {medida.ref}\n")
+        else:
+            a_file.write("Dispositivo sin referencia\n")
+        writer = csv.writer(a_file, delimiter=";")
+        writer.writerow(columnas*medida.ncurvas)
+        for i in range(filas):
+            fila = []
+            for curva in range(medida.ncurvas):
+                if i < medida.n[curva]:
+                    fila.extend("%.4f" % v for v in medida.fila(curva, i))
+                else:
+                    fila.extend([""]*len(columnas))
+            writer.writerow(fila)
+
+
+class RegistroContinuo:
+    """Copia en disco de una medida, escrita a medida que se adquiere
+
+    El archivo se llama *.parcial mientras se mide. La primera línea es un
+    comentario con los metadatos en JSON, luego una cabecera y una fila por
+    punto con el número de curva y los valores a precisión completa. Las
+    escrituras van a un búfer que se vuelca como mucho cada segundo y con
+    fsync al acabar cada curva. Al cerrar se le quita el sufijo .parcial.
+    Mientras tanto se mantiene bloqueado el cerrojo *.parcial.lock.
+    """
+
+    def __init__(self, medida, directorio=DIRECTORIO_REGISTROS):
+        os.makedirs(directorio, exist_ok=True)
+        nombre = "{}-{}".format(medida.fecha.strftime("%Y-%m-%d-%H%M%S"), medida.tipo)
+        if medida.ref != "":
+            nombre = "{}-{}".format(medida.ref, nombre)
+        dispositivo = medida.parametros.get('Dispositivo')
+        if dispositivo:
+            nombre = "{}-{}".format(nombre, dispositivo)
+        # Nunca se sobrescribe otro registro, aunque empiece en el mismo segundo
+        for numero in itertools.count(1):
+            sufijo = "" if numero == 1 else "-{}".format(numero)
+            self.filename = os.path.join(directorio, nombre + sufijo + ".csv.parcial")
+            if os.path.exists(self.filename[:-len(".parcial")]):
+                continue
+            # El cerrojo va antes que el registro para que nadie lo vea libre
+            self._cerrojo = bloquear(self.filename + ".lock")
+            if self._cerrojo is None:
+                continue
+            try:
+                self._archivo = open(self.filename, 'x', newline='', encoding='utf-8')
+                break
+            except FileExistsError:
+                soltar(self._cerrojo)
+                continue
+        self._archivo.write("# " + json.dumps(medida.metadatos(), ensure_ascii=False) + "\n")
+        columnas = medida.columnas
+        if medida.incertidumbre is not None:
+            columnas = columnas + (medida.columna_incertidumbre,)
+        self._archivo.write(";".join(("Curva",) + columnas) + "\n")
+        self._curva = 0
+        self._volcado = time.monotonic()
+
+    def agregar(self, curva, fila):
+        if curva != self._curva:
+            self.sincronizar()
+            self._curva = curva
+        self._archivo.write("{};{}\n".format(curva, ";".join("%.17g" % v for v in fila)))
+        if time.monotonic() - self._volcado > 1:
+            self._archivo.flush()
+            self._volcado = time.monotonic()
+
+    def sincronizar(self):
+        """Vuelca el búfer y lo asegura en disco"""
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self._volcado = time.monotonic()
+
+    def cerrar(self):
+        """Cierra el registro de una medida terminada"""
+        self.sincronizar()
+        self._archivo.close()
+        final = self.filename[:-len(".parcial")]
+        os.replace(self.filename, final)
+        soltar(self._cerrojo)
+        os.remove(self.filename + ".lock")
+        self.filename = final
+
+
+def recuperar(filename):
+    """Reconstruye la medida de un registro continuo, aunque esté incompleto
+
+    Se descarta una posible última línea a medio escribir.
+    """
+    with open(filename, encoding='utf-8') as a_file:
+        metadatos = json.loads(a_file.readline()[2:])
+        a_file.readline()
+        ncurvas, npuntos = metadatos["forma"]
+        medida = Medida(metadatos["tipo"], ncurvas, npuntos, metadatos["ref"],
+                        metadatos["resistencia"], metadatos.get("parametros"),
+                        metadatos.get("incertidumbre", False))
+        medida.fecha = datetime.fromisoformat(metadatos["fecha"])
+        ncampos = len(medida.columnas) + 1 + (medida.incertidumbre is not None)
+        for linea in a_file:
+            campos = linea.rstrip("\n").split(";")
+            if not linea.endswith("\n") or len(campos) != ncampos:
+                break
+            try:
+                valores = [float(v) for v in campos[1:]]
+                if medida.incertidumbre is not None:
+                    medida.agregar(int(campos[0]), *valores[:-1], incertidumbre=valores[-1])
+                else:
+                    medida.agregar(int(campos[0]), *valores)
+            except (ValueError, IndexError):
+                break
+    return medida
+
+
+def guardar_npz(medida, filename):
+    """Guarda la medida a precisión completa en un NPZ comprimido
+
+    Incluye los tiempos de cada punto, las incertidumbres y la estadística
+    de las repeticiones si las hay y, como
+    JSON, los metadatos: tipo, referencia, resistencia, parámetros del
+    barrido, inicio y fin.
+    """
+    arrays = dict(
+        datos=medida.datos[:, :medida.ncurvas],
+        tiempos=medida.tiempos[:medida.ncurvas],
+        n=medida.n[:medida.ncurvas],
+        metadatos=json.dumps(medida.metadatos(), ensure_ascii=False))
+    if medida.incertidumbre is not None:
+        arrays["incertidumbre"] = medida.incertidumbre[:medida.ncurvas]
+    if medida.estadistica is not None:
+        arrays["estadistica"] = medida.estadistica[:, :medida.ncurvas]
+    np.savez_compressed(filename, **arrays)
+
+
+def cargar_npz(filename):
+    """Lee una medida guardada con guardar_npz"""
+    with np.load(filename) as archivo:
+        metadatos = json.loads(str(archivo["metadatos"]))
+        medida = Medida(metadatos["tipo"], 0, 0, metadatos["ref"],
+                        metadatos["resistencia"], metadatos["parametros"])
+        medida.datos = archivo["datos"]
+        medida.tiempos = archivo["tiempos"]
+        medida.n = archivo["n"]
+        if "incertidumbre" in archivo:
+            medida.incertidumbre = archivo["incertidumbre"]
+        if "estadistica" in archivo:
+            medida.estadistica = archivo["estadistica"]
+    medida.ncurvas = len(medida.n)
+    medida.fecha = datetime.fromisoformat(metadatos["fecha"])
+    if metadatos["fin"]:
+        medida.fin = datetime.fromisoformat(metadatos["fin"])
+    return medida
+
+
+def cargar_csv(filename):
+    """Lee una medida guardada con guardar_csv
+
+    El tipo se deduce de las columnas de la cabecera. El CSV no guarda la
+    fecha de la medida, así que se toma la del archivo, ni sus parámetros.
+    """
+    with open(filename, newline='') as a_file:
+        primera = a_file.readline().rstrip("\r\n")
+        ref = primera[len("Dispositivo: "):] if primera.startswith("Dispositivo: ") else ""
+        filas = list(csv.reader(a_file, delimiter=";"))
+    if not filas:
+        raise ValueError("El archivo no tiene cabecera")
+    cabecera = filas[0]
+    tipos = [t for t, columnas in COLUMNAS.items() if tuple(cabecera[:3]) == columnas]
+    if not tipos:
+        raise ValueError("Columnas desconocidas: {}".format(";".join(cabecera[:3])))
+    ancho = cabecera.index(cabecera[0], 1) if cabecera.count(cabecera[0]) > 1 else len(cabecera)
+    ncurvas, npuntos = len(cabecera)//ancho, len(filas) - 1
+    medida = Medida(tipos[0], ncurvas, npuntos, ref, incertidumbre=ancho in (4, 8))
+    if ancho >= 7:
+        medida.estadistica = np.full((4, ncurvas, npuntos), np.nan)
+    for fila in filas[1:]:
+        for curva in range(ncurvas):
+            valores = fila[curva*ancho:(curva + 1)*ancho]
+            if not valores or valores[0] == "":
+                continue
+            valores = [float(v) for v in valores]
+            punto = medida.n[curva]
+            medida.agregar(curva, *valores[:3], incertidumbre=valores[3] if ancho in (4, 8) else np.nan)
+            if medida.estadistica is not None:
+                medida.estadistica[:, curva, punto] = valores[-4:]
+    medida.ncurvas = ncurvas
+    medida.fecha = medida.fin = datetime.fromtimestamp(os.path.getmtime(filename))
+    return medida
+
+
+def convertir(tipo, valor, consigna, ai0, ai1, resistencia):
+    """Fila de la medida a partir de las consignas y las lecturas
+
+    valor es la consigna de la curva exterior y consigna la del barrido
+    interior; admite escalares o arrays. Devuelve las tres columnas y si
+    la lectura es válida: en el MOSFET, ai0 debe quedar dentro de los
+    10.5 V que puede leer la entrada analógica.
+    """
+    if tipo == "I-V Diodo":
+        return (ai0, consigna, (ai0-consigna)/resistencia*1000), True
+    if tipo == "Ic-Vce BJT":
+        return (valor*10 + 0*consigna, ai0-ai1, (consigna-ai0)/resistencia*1000), True
+    vds = consigna if tipo == "Id-Vds MOS" else valor
+    validos = np.abs(ai0) < 10.5
+    return (valor + 0*consigna, consigna, (ai0-vds)/resistencia*1000), validos
+
+
+def reducir(muestras, metodo="media"):
+    """Valor e incertidumbre de cada fila de muestras, por el último eje
+
+    metodo es "media", "mediana" o "recortada" (media sin el 10 % más alto
+    ni el 10 % más bajo). La incertidumbre es el error típico del valor:
+    la desviación típica entre la raíz del número de muestras, por
+    sqrt(pi/2) en la mediana.
+    """
+    muestras = np.asarray(muestras, dtype=float)
+    n = muestras.shape[-1]
+    error = muestras.std(axis=-1, ddof=1)/np.sqrt(n) if n > 1 else np.zeros(muestras.shape[:-1])
+    if metodo == "mediana":
+        return np.median(muestras, axis=-1), error*np.sqrt(np.pi/2)
+    if metodo == "recortada":
+        k = int(0.1*n)
+        ordenadas = np.sort(muestras, axis=-1)
+        return ordenadas[..., k:n-k].mean(axis=-1), error
+    if metodo != "media":
+        raise ValueError("Promedio desconocido: {}".format(metodo))
+    return muestras.mean(axis=-1), error
@@ -0,0 +1,170 @@
+# mydaq.py
+"""Sesiones de tareas persistentes para el myDAQ"""
+
+import functools
+import numpy as np
+import nidaqmx
+import nidaqmx.system
+from nidaqmx.constants import AcquisitionType, Edge, TaskMode
+from nidaqmx.errors import DaqError
+from backend import BackendDAQ, ErrorDispositivo, SesionDAQ
+
+CANALES_AO = ("ao0", "ao1")
+CANALES_AI = ("ai0", "ai1")
+
+
+def resolver_canales(dispositivo):
+    """Ruta física y rango de tensión de cada canal analógico del dispositivo"""
+    device = nidaqmx.system.Device(dispositivo)
+    canales = {}
+    for fisicos, rangos in ((device.ao_physical_chans, device.ao_voltage_rngs),
+                            (device.ai_physical_chans, device.ai_voltage_rngs)):
+        rango = (min(rangos), max(rangos))
+        for ruta in fisicos.channel_names:
+            canales[ruta.rsplit('/', 1)[-1]] = (ruta, rango)
+    return canales
+
+
+def _errores_dispositivo(metodo):
+    """Traduce los errores del driver a ErrorDispositivo"""
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        try:
+            return metodo(self, *args, **kwargs)
+        except DaqError as error:
+            raise ErrorDispositivo(str(error)) from error
+    return envoltura
+
+
+class SesionmyDAQ(SesionDAQ):
+    """Tareas AO y AI creadas y confirmadas una sola vez por barrido
+
+    El myDAQ solo admite una tarea reservada por subsistema, así que los
+    dos canales de salida comparten una tarea AO y los dos de entrada una
+    tarea AI. La salida que no se escribe mantiene su último valor.
+    """
+
+    def __init__(self, dispositivo, canales):
+        super().__init__(dispositivo, canales)
+        self._ao = None
+        self._ai = None
+        self._valores_ao = dict.fromkeys(CANALES_AO, 0.0)
+
+    @_errores_dispositivo
+    def abrir(self):
+        """Crea y confirma las tareas de salida y entrada"""
+        self._ao = nidaqmx.Task()
+        for canal in CANALES_AO:
+            self._ao.ao_channels.add_ao_voltage_chan(self.canales[canal][0])
+        self._ao.control(TaskMode.TASK_COMMIT)
+        self._ai = nidaqmx.Task()
+        for canal in CANALES_AI:
+            self._ai.ai_channels.add_ai_voltage_chan(self.canales[canal][0])
+        self._ai.control(TaskMode.TASK_COMMIT)
+
+    @_errores_dispositivo
+    def cerrar(self):
+        """Libera las tareas"""
+        tareas, self._ao, self._ai = (self._ao, self._ai), None, None
+        for task in tareas:
+            if task is not None:
+                task.close()
+
+    @property
+    def abierta(self):
+        return self._ao is not None
+
+    @_errores_dispositivo
+    def escribir(self, canal, valor):
+        if not self.abierta:
+            self.abrir()
+        self._valores_ao[canal] = float(valor)
+        self._ao.write([self._valores_ao[c] for c in CANALES_AO])
+
+    @_errores_dispositivo
+    def leer(self, canal):
+        if not self.abierta:
+            self.abrir()
+        return self._ai.read()[CANALES_AI.index(canal)]
+
+    @_errores_dispositivo
+    def leer_muestras(self, n):
+        """n muestras de las dos entradas en una sola lectura del driver"""
+        if not self.abierta:
+            self.abrir()
+        return self._ai.read(number_of_samples_per_channel=n)
+
+    @_errores_dispositivo
+    def barrido(self, frecuencia, **canales):
+        """Barrido temporizado por hardware
+
+        Cada argumento con nombre de canal AO es un array de consignas; los
+        canales omitidos se mantienen en su último valor. Las dos entradas
+        se muestrean con el reloj de muestreo de la salida, en el flanco de
+        bajada, de modo que cada lectura llega medio periodo después de su
+        consigna. Se repite la primera consigna una vez para dejar asentar
+        el salto inicial. Devuelve un array (2, n) con ai0 y ai1.
+        """
+        n = len(next(iter(canales.values())))
+        ondas = np.empty((len(CANALES_AO), n + 1))
+        for i, canal in enumerate(CANALES_AO):
+            if canal in canales:
+                ondas[i, 1:] = canales[canal]
+                ondas[i, 0] = ondas[i, 1]
+            else:
+                ondas[i] = self._valores_ao[canal]
+
+        # Las tareas bajo demanda reservan los subsistemas: se liberan
+        # y se volverán a crear en la siguiente escritura o lectura
+        self.cerrar()
+        with nidaqmx.Task() as ao, nidaqmx.Task() as ai:
+            for canal in CANALES_AO:
+                ao.ao_channels.add_ao_voltage_chan(self.canales[canal][0])
+            for canal in CANALES_AI:
+                ai.ai_channels.add_ai_voltage_chan(self.canales[canal][0])
+            ao.timing.cfg_samp_clk_timing(
+                frecuencia, sample_mode=AcquisitionType.FINITE, samps_per_chan=n + 1)
+            ai.timing.cfg_samp_clk_timing(
+                frecuencia, source='/{}/ao/SampleClock'.format(self.dispositivo),
+                active_edge=Edge.FALLING, sample_mode=AcquisitionType.FINITE,
+                samps_per_chan=n + 1)
+            ao.write(ondas, auto_start=False)
+            ai.start()
+            ao.start()
+            lecturas = np.asarray(ai.read(
+                number_of_samples_per_channel=n + 1, timeout=(n + 1)/frecuencia + 10))
+            ao.wait_until_done()
+
+        self._valores_ao.update((c, float(v)) for c, v in zip(CANALES_AO, ondas[:, -1]))
+        return lecturas[:, 1:]
+
+
+class BackendNI(BackendDAQ):
+    """myDAQ conectados al equipo, a través de nidaqmx"""
+
+    def __init__(self):
+        self.system = nidaqmx.system.System.local()
+
+    def dispositivos(self):
+        return [dispositivo.name for dispositivo in self.system.devices]
+
+    def canales(self, dispositivo):
+        return resolver_canales(dispositivo)
+
+    def sesion(self, dispositivo, canales=None):
+        return SesionmyDAQ(dispositivo, canales or resolver_canales(dispositivo))
+
+    def serie(self, dispositivo):
+        try:
+            return "{:X}".format(nidaqmx.system.Device(dispositivo).dev_serial_num)
+        except DaqError:
+            return ""
+
+    @_errores_dispositivo
+    def tarea_suelta(self, ruta, valor=None):
+        with nidaqmx.Task() as task:
+            if valor is None:
+                task.ai_channels.add_ai_voltage_chan(ruta)
+                return task.read()
+            task.ao_channels.add_ao_voltage_chan(ruta)
+            task.write(valor)
@@ -0,0 +1,55 @@
+# parametros.py
+"""Parámetros de los barridos con los nombres del formulario
+
+Solo datos, sin numpy, para que la ventana los use al arrancar sin cargar
+el código de medida.
+"""
+
+TIPOS = ("I-V Diodo", "Id-Vds MOS", "Id-Vgs MOS", "Ic-Vce BJT", "Superficie MOS")
+
+# Parámetros comunes a todos los tipos, con los nombres del formulario
+PARAMETROS = {
+    'Tipo de medida': "I-V Diodo",
+    'Ref': "",
+    'Temporizado por hardware': False,
+    'Frecuencia (S/s)': 1000.0,
+    'Registro continuo': False,
+    'Barrido adaptativo': False,
+    'Tolerancia (mA)': 0.05,
+    'Puntos máximos': 100,
+    'Muestras por punto': 1,
+    'Muestras con señal baja': 1,
+    'Umbral señal baja (mA)': 0.1,
+    'Promedio': "media",
+    'Asentamiento': "ninguno",
+    'Tolerancia asentamiento (mV)': 1.0,
+    'Espera máxima (ms)': 100.0,
+    'Orden': "ascendente",
+    'Repeticiones': 1,
+}
+
+# Valores que el formulario propone al elegir cada tipo de medida
+VALORES_POR_DEFECTO = {
+    "I-V Diodo": {'VDD Min': -2.0, 'VDD Max': 2.0, 'Incremento': 0.02,
+                  'VGS Min': 0.0, 'VGS Max': 5.0, 'IncrementoVGS': 0.5,
+                  'Valor de R (Ohm)': 100.0},
+    "Id-Vds MOS": {'VDD Min': 0.0, 'VDD Max': 10.0, 'Incremento': 0.2,
+                   'VGS Min': 0.0, 'VGS Max': 5.0, 'IncrementoVGS': 0.5,
+                   'Valor de R (Ohm)': 100.0},
+    "Id-Vgs MOS": {'VDD Min': 1.0, 'VDD Max': 5.0, 'Incremento': 1.0,
+                   'VGS Min': -2.0, 'VGS Max': 5.0, 'IncrementoVGS': 0.05,
+                   'Valor de R (Ohm)': 100.0},
+    "Ic-Vce BJT": {'VDD Min': 0.0, 'VDD Max': 5.0, 'Incremento': 0.1,
+                   'VGS Min': 0.0, 'VGS Max': 50.0, 'IncrementoVGS': 10.0,
+                   'Valor de R (Ohm)': 100.0},
+    "Superficie MOS": {'VDD Min': 0.0, 'VDD Max': 10.0, 'Incremento': 0.2,
+                       'VGS Min': 0.0, 'VGS Max': 5.0, 'IncrementoVGS': 0.1,
+                       'Valor de R (Ohm)': 100.0},
+}
+
+
+def parametros_por_defecto(tipo):
+    """Todos los parámetros de un barrido del tipo dado, como en el formulario"""
+    if tipo not in TIPOS:
+        raise ValueError("Tipo de medida desconocido: {}".format(tipo))
+    return dict(PARAMETROS, **VALORES_POR_DEFECTO[tipo], **{'Tipo de medida': tipo})
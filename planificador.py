@@ -0,0 +1,162 @@
+# planificador.py
+"""Medidas en paralelo con varios myDAQ, un proceso por dispositivo"""
+
+import multiprocessing
+import queue
+from backend import ErrorDispositivo, RegistroDispositivos, crear_backend
+
+
+def _trabajador(dispositivo, simulado, encargos, avisos):
+    """Mide en un dispositivo los encargos de su cola hasta recibir None
+
+    Todo lo que pasa se comunica por la cola de avisos como tuplas
+    (clase, dispositivo, datos).
+    """
+    try:
+        from lote import SALIDA, SALIDA_SIN_REF, medir
+        backend = RegistroDispositivos(crear_backend(simulado))
+        backend.actualizar()
+        serie = backend.serie(dispositivo)
+    except Exception as error:
+        # Sin dispositivo no se puede medir: cada encargo vuelve con el error
+        avisos.put(("estado", dispositivo, {"estado": "error", "ref": ""}))
+        while True:
+            encargo = encargos.get()
+            if encargo is None:
+                return
+            avisos.put(("resultado", dispositivo, {"numero": encargo[0], "ref": encargo[1]['Ref'], "serie": "",
+                                                   "medida": None, "error": str(error)}))
+    avisos.put(("estado", dispositivo, {"serie": serie, "estado": "libre", "ref": ""}))
+
+    while True:
+        encargo = encargos.get()
+        if encargo is None:
+            break
+        numero, parametros, salida = encargo
+        ref = parametros['Ref']
+        avisos.put(("estado", dispositivo, {"estado": "midiendo", "ref": ref}))
+        # Dos estaciones que acaban a la vez no deben compartir archivo
+        if salida in (SALIDA, SALIDA_SIN_REF):
+            salida = salida[:-len(".csv")] + "-{dispositivo}.csv"
+        resultado = {"numero": numero, "ref": ref, "serie": serie, "medida": None, "error": None}
+
+        def mensaje(texto, *color):
+            # Sin color solo van las lecturas de cada punto
+            if color:
+                avisos.put(("mensaje", dispositivo, (texto, color[0])))
+
+        try:
+            resultado["medida"] = medir(backend, dispositivo, parametros, salida, mensaje)
+            if resultado["medida"] is None:
+                resultado["error"] = "No se ha guardado la medida"
+        except Exception as error:
+            # Cualquier fallo, también los del driver sin traducir, debe
+            # llegar como resultado para que el encargo no quede pendiente
+            resultado["error"] = str(error) or type(error).__name__
+        avisos.put(("resultado", dispositivo, resultado))
+        avisos.put(("estado", dispositivo, {"estado": "libre", "ref": ""}))
+    avisos.put(("estado", dispositivo, {"estado": "terminado", "ref": ""}))
+
+
+class Planificador:
+    """Reparte medidas entre todos los myDAQ conectados
+
+    Cada dispositivo tiene un proceso con su propia cola de encargos, así
+    que cada uno mide su pieza a la vez que los demás. Los procesos avisan
+    de su estado, de sus mensajes y de cada medida terminada por una cola
+    común que se vacía con recoger(). `estado` guarda por dispositivo su
+    número de serie, qué hace, la pieza en curso y cuántas medidas tiene
+    pendientes, hechas y fallidas.
+    """
+
+    def __init__(self, simulado=False):
+        self.simulado = simulado
+        self.estado = {}
+        self.resultados = []
+        self._contexto = multiprocessing.get_context("spawn")
+        self._avisos = self._contexto.Queue()
+        self._trabajadores = {}
+        self._encargados = 0
+        self._en_cola = {}
+
+    def iniciar(self):
+        """Arranca un proceso por dispositivo conectado y devuelve la lista"""
+        registro = RegistroDispositivos(crear_backend(self.simulado))
+        registro.actualizar()
+        for dispositivo in registro.dispositivos():
+            encargos = self._contexto.Queue()
+            proceso = self._contexto.Process(
+                target=_trabajador, args=(dispositivo, self.simulado, encargos, self._avisos), daemon=True)
+            proceso.start()
+            self._trabajadores[dispositivo] = (proceso, encargos)
+            self._en_cola[dispositivo] = {}
+            self.estado[dispositivo] = {"serie": "", "estado": "arrancando", "ref": "",
+                                        "pendientes": 0, "hechas": 0, "fallidas": 0}
+        return list(self._trabajadores)
+
+    def encargar(self, parametros, salida, dispositivo=None):
+        """Pone una medida en la cola del dispositivo dado o, si no se da,
+        en la del que menos tiene pendiente. Devuelve el dispositivo"""
+        if not self._trabajadores:
+            raise ErrorDispositivo("No hay dispositivos en el planificador")
+        if dispositivo is None:
+            dispositivo = min(self._trabajadores, key=lambda d: self.estado[d]["pendientes"])
+        self._trabajadores[dispositivo][1].put((self._encargados, parametros, salida))
+        self._en_cola[dispositivo][self._encargados] = parametros['Ref']
+        self._encargados += 1
+        self.estado[dispositivo]["pendientes"] += 1
+        return dispositivo
+
+    def pendientes(self):
+        return sum(e["pendientes"] for e in self.estado.values())
+
+    def recoger(self, espera=0):
+        """Atiende los avisos de los procesos y devuelve los mensajes, como
+        (texto, color), y los resultados nuevos en listas de (dispositivo, datos)
+
+        Espera hasta `espera` segundos al primer aviso; después solo toma
+        los que ya hayan llegado. Los encargos de un proceso que ha muerto
+        sin devolverlos cuentan como fallidos.
+        """
+        # Lo que un proceso envió antes de morir ya está en la cola: se
+        # comprueba antes de vaciarla
+        muertos = [d for d, (proceso, _) in self._trabajadores.items()
+                   if not proceso.is_alive() and self._en_cola[d]]
+        mensajes, resultados = [], []
+        while True:
+            try:
+                clase, dispositivo, datos = self._avisos.get(timeout=espera) if espera else self._avisos.get_nowait()
+            except queue.Empty:
+                break
+            espera = 0
+            if clase == "estado":
+                self.estado[dispositivo].update(datos)
+            elif clase == "mensaje":
+                mensajes.append((dispositivo, datos))
+            else:
+                self._anotar(dispositivo, datos)
+                resultados.append((dispositivo, datos))
+        for dispositivo in muertos:
+            self.estado[dispositivo].update(estado="caído", ref="")
+            for numero, ref in list(self._en_cola[dispositivo].items()):
+                datos = {"numero": numero, "ref": ref, "serie": self.estado[dispositivo]["serie"],
+                         "medida": None, "error": "El proceso del dispositivo terminó sin acabar la medida"}
+                self._anotar(dispositivo, datos)
+                resultados.append((dispositivo, datos))
+        return mensajes, resultados
+
+    def _anotar(self, dispositivo, datos):
+        estado = self.estado[dispositivo]
+        self._en_cola[dispositivo].pop(datos["numero"], None)
+        estado["pendientes"] = len(self._en_cola[dispositivo])
+        estado["fallidas" if datos["error"] else "hechas"] += 1
+        self.resultados.append((dispositivo, datos))
+
+    def terminar(self):
+        """Termina cada proceso cuando acabe sus encargos"""
+        for proceso, encargos in self._trabajadores.values():
+            encargos.put(None)
+        for proceso, _ in self._trabajadores.values():
+            proceso.join()
+        self.recoger()
+        self._trabajadores = {}
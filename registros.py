@@ -0,0 +1,64 @@
+# registros.py
+"""Archivos de los registros continuos y su cerrojo
+
+Mientras un proceso escribe un registro *.parcial tiene bloqueado el
+archivo *.parcial.lock de al lado. Un registro cuyo cerrojo está libre
+se quedó a medias porque su proceso terminó. Sin numpy, para que la
+ventana busque registros al arrancar sin cargar el código de medida.
+"""
+
+import os
+
+DIRECTORIO_REGISTROS = os.path.join(os.path.expanduser("~"), "USALmyDAQ", "registros")
+
+
+def bloquear(filename):
+    """Abre y bloquea un cerrojo sin esperar; None si lo tiene otro proceso"""
+    cerrojo = open(filename, 'a')
+    try:
+        try:
+            import fcntl
+        except ImportError:     # Windows
+            import msvcrt
+            cerrojo.seek(0)
+            msvcrt.locking(cerrojo.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(cerrojo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        cerrojo.close()
+        return None
+    return cerrojo
+
+
+def soltar(cerrojo):
+    """Desbloquea y cierra un cerrojo abierto con bloquear"""
+    try:
+        import msvcrt
+    except ImportError:
+        pass
+    else:
+        cerrojo.seek(0)
+        msvcrt.locking(cerrojo.fileno(), msvcrt.LK_UNLCK, 1)
+    cerrojo.close()
+
+
+def registros_parciales(directorio=DIRECTORIO_REGISTROS):
+    """Registros de medidas que no llegaron a terminar
+
+    Se saltan los que todavía está escribiendo otro proceso. El cerrojo de
+    los abandonados se borra.
+    """
+    if not os.path.isdir(directorio):
+        return []
+    abandonados = []
+    for f in sorted(os.listdir(directorio)):
+        if not f.endswith(".parcial"):
+            continue
+        filename = os.path.join(directorio, f)
+        cerrojo = bloquear(filename + ".lock")
+        if cerrojo is None:
+            continue
+        soltar(cerrojo)
+        os.remove(filename + ".lock")
+        abandonados.append(filename)
+    return abandonados
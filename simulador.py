@@ -0,0 +1,222 @@
+# simulador.py
+"""myDAQ simulado con la placa USAL y el dispositivo bajo prueba"""
+
+import time
+import numpy as np
+from backend import BackendDAQ, SesionDAQ
+
+VT = 0.02585        # Tensión térmica a 300 K (V)
+LIMITE_AI = 10.6    # Saturación de las entradas analógicas (V)
+RANGO = (-10.0, 10.0)   # Rango de los canales analógicos del myDAQ (V)
+
+
+class ModeloUSAL:
+    """Respuesta en continua de la placa USAL
+
+    Diodo y MOSFET: la placa fuerza la consigna de ao0 (Vpn o VDS) sobre el
+    dispositivo y ai0 lee esa tensión más la caída en la resistencia serie.
+    BJT: ao0 inyecta la corriente de base a través de RB, ao1 es la
+    alimentación del colector a través de RC, ai0 lee el colector y ai1 el
+    emisor.
+    """
+
+    def __init__(self, i_s=1e-12, n=1.8,
+                 vth=2.0, k=2e-3, lam=0.02,
+                 i_s_bjt=1e-14, beta_f=150, beta_r=2, va=80, rb=100e3, rc=10):
+        self.i_s = i_s
+        self.n = n
+        self.vth = vth
+        self.k = k
+        self.lam = lam
+        self.i_s_bjt = i_s_bjt
+        self.beta_f = beta_f
+        self.beta_r = beta_r
+        self.va = va
+        self.rb = rb
+        self.rc = rc
+
+    def diodo(self, vpn):
+        """Shockley"""
+        return self.i_s*np.expm1(np.minimum(vpn/(self.n*VT), 200))
+
+    def mos(self, vgs, vds):
+        """Ley cuadrática con modulación de canal, simétrica en VDS"""
+        vov = np.maximum(vgs - self.vth, 0)
+        v = np.abs(vds)
+        lineal = self.k*(vov*v - v**2/2)
+        saturacion = self.k/2*vov**2
+        return np.sign(vds)*np.where(v < vov, lineal, saturacion)*(1 + self.lam*v)
+
+    def bjt(self, ib, vce):
+        """Ebers-Moll de transporte con efecto Early, a IB y VCE dados"""
+        inv_bf, inv_br = 1/self.beta_f, 1/self.beta_r
+        e_ce = np.exp(-np.clip(vce, -1, None)/VT)
+        # IB fija exp(VBE/VT) de forma explícita: IB/IS = (a-1)/βF + (a·e_ce-1)/βR
+        a = (np.maximum(ib, 0)/self.i_s_bjt + inv_bf + inv_br)/(inv_bf + e_ce*inv_br)
+        transporte = a*(1 - e_ce)*(1 + np.maximum(vce, 0)/self.va)
+        return self.i_s_bjt*(transporte - (a*e_ce - 1)*inv_br)
+
+    def lecturas(self, tipo, resistencia, ao0, ao1):
+        """Tensiones de ai0 y ai1 en continua para las consignas dadas"""
+        ao0, ao1 = np.broadcast_arrays(np.asarray(ao0, dtype=float), np.asarray(ao1, dtype=float))
+        if tipo == "I-V Diodo":
+            ai0 = ao0 + self.diodo(ao0)*resistencia
+            ai1 = np.zeros_like(ao0)
+        elif tipo == "Ic-Vce BJT":
+            ib = ao0/self.rb
+            # VCC = VCE + IC·RC es monótona en VCE: bisección vectorizada
+            bajo = np.full_like(ao1, -0.5)
+            alto = np.maximum(ao1, 0) + 0.5
+            for _ in range(60):
+                medio = (bajo + alto)/2
+                exceso = medio + self.bjt(ib, medio)*self.rc > ao1
+                alto = np.where(exceso, medio, alto)
+                bajo = np.where(exceso, bajo, medio)
+            ai0 = (bajo + alto)/2
+            ai1 = np.zeros_like(ao0)
+        else:
+            ai0 = ao0 + self.mos(ao1, ao0)*resistencia
+            ai1 = np.zeros_like(ao0)
+        return np.clip(ai0, -LIMITE_AI, LIMITE_AI), ai1
+
+
+class SesionSimulada(SesionDAQ):
+    """Sesión sobre el myDAQ simulado
+
+    El tiempo es virtual: cada operación lo avanza en `latencia` segundos y
+    las entradas siguen a cada consigna con una constante de tiempo `tau`,
+    así que dos ejecuciones con la misma semilla dan las mismas lecturas.
+    Con `tiempo_real` además se espera esa latencia de verdad. Las lecturas
+    de varias muestras las toman separadas `intervalo` segundos.
+    """
+
+    intervalo = 1e-4
+
+    def __init__(self, dispositivo, canales, modelo, ruido, tau, latencia, tiempo_real, semilla):
+        super().__init__(dispositivo, canales)
+        self.modelo = modelo
+        self.ruido = ruido
+        self.tau = tau
+        self.latencia = latencia
+        self.tiempo_real = tiempo_real
+        self._rng = np.random.default_rng(semilla)
+        self._tipo = "I-V Diodo"
+        self._resistencia = 100.0
+        self._valores_ao = {"ao0": 0.0, "ao1": 0.0}
+        self._reloj = 0.0
+        self._cambio = 0.0
+        self._inicial = np.zeros(2)
+        self._final = np.zeros(2)
+
+    def configurar(self, tipo, resistencia):
+        self._tipo = tipo
+        self._resistencia = resistencia
+        self._final = self._continua()
+        self._inicial = self._final
+
+    def abrir(self):
+        pass
+
+    def cerrar(self):
+        pass
+
+    def esperar(self, segundos):
+        self._avanzar(segundos)
+
+    def reloj(self):
+        return self._reloj
+
+    def _avanzar(self, segundos):
+        self._reloj += segundos
+        if self.tiempo_real and segundos > 0:
+            time.sleep(segundos)
+
+    def _continua(self):
+        ai0, ai1 = self.modelo.lecturas(
+            self._tipo, self._resistencia, self._valores_ao["ao0"], self._valores_ao["ao1"])
+        return np.array([ai0, ai1], dtype=float)
+
+    def _transitorio(self):
+        if self.tau <= 0:
+            return self._final
+        return self._final + (self._inicial - self._final)*np.exp(-(self._reloj - self._cambio)/self.tau)
+
+    def escribir(self, canal, valor):
+        self._avanzar(self.latencia)
+        self._inicial = self._transitorio()
+        self._valores_ao[canal] = float(valor)
+        self._final = self._continua()
+        self._cambio = self._reloj
+
+    def leer(self, canal):
+        self._avanzar(self.latencia)
+        lectura = self._transitorio()[int(canal[-1])]
+        return float(lectura + self._rng.normal(0, self.ruido) if self.ruido else lectura)
+
+    def leer_muestras(self, n):
+        self._avanzar(self.latencia)
+        t = self._reloj - self._cambio + self.intervalo*np.arange(n)
+        lecturas = np.repeat(self._final[:, None], n, axis=1)
+        if self.tau > 0:
+            lecturas = lecturas + (self._inicial - self._final)[:, None]*np.exp(-t/self.tau)
+        if self.ruido:
+            lecturas = lecturas + self._rng.normal(0, self.ruido, lecturas.shape)
+        self._avanzar(self.intervalo*(n - 1))
+        return lecturas
+
+    def barrido(self, frecuencia, **canales):
+        n = len(next(iter(canales.values())))
+        ao0 = np.asarray(canales.get("ao0", np.full(n, self._valores_ao["ao0"])), dtype=float)
+        ao1 = np.asarray(canales.get("ao1", np.full(n, self._valores_ao["ao1"])), dtype=float)
+        final = np.array(self.modelo.lecturas(self._tipo, self._resistencia, ao0, ao1))
+        # Cada muestra se toma medio periodo después de su consigna
+        anterior = np.column_stack([self._transitorio(), final[:, :-1]])
+        if self.tau > 0:
+            lecturas = final + (anterior - final)*np.exp(-0.5/frecuencia/self.tau)
+        else:
+            lecturas = final
+        if self.ruido:
+            lecturas = lecturas + self._rng.normal(0, self.ruido, lecturas.shape)
+
+        self._avanzar(n/frecuencia)
+        self._valores_ao.update(ao0=float(ao0[-1]), ao1=float(ao1[-1]))
+        self._inicial = self._final = final[:, -1]
+        self._cambio = self._reloj
+        return lecturas
+
+
+class BackendSimulado(BackendDAQ):
+    """Uno o varios myDAQ simulados, todos con la misma placa
+
+    Cada dispositivo conserva una sola sesión para que sus salidas
+    mantengan el último valor entre barridos, como en el real. Quitar o
+    añadir nombres de `conectados` simula desconectar o conectar un myDAQ.
+    """
+
+    def __init__(self, modelo=None, ruido=0.0005, tau=0.0, latencia=0.0,
+                 tiempo_real=False, semilla=0, dispositivos=1):
+        self.modelo = modelo or ModeloUSAL()
+        self.ruido = ruido
+        self.tau = tau
+        self.latencia = latencia
+        self.tiempo_real = tiempo_real
+        self.semilla = semilla
+        self.conectados = ["SimDAQ{}".format(i + 1) for i in range(dispositivos)]
+        self._sesiones = {}
+
+    def dispositivos(self):
+        return list(self.conectados)
+
+    def canales(self, dispositivo):
+        return {canal: ("{}/{}".format(dispositivo, canal), RANGO)
+                for canal in ("ao0", "ao1", "ai0", "ai1")}
+
+    def serie(self, dispositivo):
+        return "SIM-" + dispositivo[len("SimDAQ"):]
+
+    def sesion(self, dispositivo, canales=None):
+        if dispositivo not in self._sesiones:
+            self._sesiones[dispositivo] = SesionSimulada(
+                dispositivo, canales or self.canales(dispositivo), self.modelo, self.ruido,
+                self.tau, self.latencia, self.tiempo_real, self.semilla)
+        return self._sesiones[dispositivo]
@@ -0,0 +1,110 @@
+# superficie.py
+"""Superficie ID(VGS, VDS) del MOSFET medida una sola vez
+
+Las características de salida y de transferencia son cortes de la misma
+superficie. Se mide la rejilla VGS × VDS como una familia Id-Vds y de ella
+se obtienen las dos familias sin volver a medir.
+"""
+
+import numpy as np
+from barrido import rango
+from medidas import Medida
+
+
+class SuperficieMOS:
+    """Rejilla de corrientes ID con una fila por VGS y una columna por VDS
+
+    Los puntos que no se midieron, por el límite de potencia o porque la
+    lectura no era válida, quedan a NaN. Las familias se calculan la primera
+    vez que se piden y se guardan; las curvas fuera de la rejilla se
+    interpolan linealmente entre las dos filas o columnas vecinas.
+    """
+
+    def __init__(self, vgs, vds, corriente, incertidumbre=None, ref="", resistencia=None, parametros=None,
+                 fecha=None):
+        self.vgs = np.asarray(vgs, dtype=float)
+        self.vds = np.asarray(vds, dtype=float)
+        self.corriente = np.asarray(corriente, dtype=float)
+        self.incertidumbre = incertidumbre
+        self.ref = ref
+        self.resistencia = resistencia
+        self.parametros = parametros or {}
+        self.fecha = fecha
+        self._familias = {}
+
+    @classmethod
+    def desde_medida(cls, medida):
+        """Superficie de una medida Id-Vds tomada sobre una rejilla fija
+
+        La rejilla se reconstruye con los parámetros de la medida, así que
+        también sirve para medidas abiertas de un NPZ. El CSV no guarda los
+        parámetros: una medida leída de él da KeyError.
+        """
+        if medida.tipo != "Id-Vds MOS":
+            raise ValueError("La superficie se obtiene de una medida Id-Vds MOS")
+        p = medida.parametros
+        vds = rango(p['VDD Min'], p['VDD Max'], p['Incremento'], "VDS")
+        vgs = rango(p['VGS Min'], p['VGS Max'], p['IncrementoVGS'], "VGS")
+        corriente = np.full((len(vgs), len(vds)), np.nan)
+        incertidumbre = None if medida.incertidumbre is None else corriente.copy()
+        paso = abs(vds[1] - vds[0]) if len(vds) > 1 else 1.0
+        for curva in range(min(medida.ncurvas, len(vgs))):
+            x = medida.columna(1, curva)
+            columnas = np.clip(np.searchsorted(vds, x - paso/2), 0, len(vds) - 1)
+            corriente[curva, columnas] = medida.columna(2, curva)
+            if incertidumbre is not None:
+                incertidumbre[curva, columnas] = medida.incertidumbre[curva, :medida.n[curva]]
+        return cls(vgs, vds, corriente, incertidumbre, medida.ref, medida.resistencia, p, medida.fecha)
+
+    def _corte(self, eje, valor, matriz):
+        """Fila de `matriz` en el valor dado del eje de las filas"""
+        if matriz is None:
+            return None
+        i = int(np.searchsorted(eje, valor))
+        if i < len(eje) and np.isclose(eje[i], valor):
+            return matriz[i]
+        if i == 0 or i == len(eje):
+            raise ValueError("{:g} V está fuera de la rejilla medida".format(valor))
+        peso = (valor - eje[i - 1])/(eje[i] - eje[i - 1])
+        return (1 - peso)*matriz[i - 1] + peso*matriz[i]
+
+    def salida(self, vgs):
+        """ID frente a VDS para una VGS, dentro o fuera de la rejilla"""
+        return self._corte(self.vgs, vgs, self.corriente), self._corte(self.vgs, vgs, self.incertidumbre)
+
+    def transferencia(self, vds):
+        """ID frente a VGS para una VDS, dentro o fuera de la rejilla"""
+        return (self._corte(self.vds, vds, self.corriente.T),
+                self._corte(self.vds, vds, None if self.incertidumbre is None else self.incertidumbre.T))
+
+    def familia(self, tipo, valores=None):
+        """Medida "Id-Vds MOS" o "Id-Vgs MOS" con una curva por valor
+
+        Sin valores se toman todas las filas o columnas de la rejilla.
+        """
+        if tipo == "Id-Vds MOS":
+            eje, corte = self.vds, self.salida
+            valores = self.vgs if valores is None else valores
+        elif tipo == "Id-Vgs MOS":
+            eje, corte = self.vgs, self.transferencia
+            valores = self.vds if valores is None else valores
+        else:
+            raise ValueError("Tipo de medida desconocido: {}".format(tipo))
+        clave = (tipo, tuple(np.round(valores, 9)))
+        if clave not in self._familias:
+            self._familias[clave] = self._medida(tipo, eje, valores, corte)
+        return self._familias[clave]
+
+    def _medida(self, tipo, eje, valores, corte):
+        medida = Medida(tipo, len(valores), len(eje), self.ref, self.resistencia,
+                        dict(self.parametros, **{'Tipo de medida': tipo}),
+                        incertidumbre=self.incertidumbre is not None)
+        for curva, valor in enumerate(valores):
+            corriente, incertidumbre = corte(valor)
+            validos = ~np.isnan(corriente)
+            medida.agregar_bloque(curva, np.full(validos.sum(), valor), eje[validos], corriente[validos],
+                                  incertidumbre=np.nan if incertidumbre is None else incertidumbre[validos])
+        medida.terminar()
+        if self.fecha is not None:
+            medida.fecha = self.fecha
+        return medida
@@ -0,0 +1,55 @@
+# test_analisis.py
+"""Extracción de parámetros de curvas simuladas con parámetros conocidos"""
+
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adquisicion import Adquisicion
+from analisis import analizar, resumen
+from parametros import parametros_por_defecto
+from simulador import BackendSimulado, ModeloUSAL
+
+
+def _medir(tipo, modelo=None):
+    modelo = modelo or ModeloUSAL()
+    return Adquisicion(BackendSimulado(modelo=modelo), "SimDAQ1", parametros_por_defecto(tipo),
+                       lambda *a: None).ejecutar()
+
+
+def test_diodo():
+    _, por_curva = analizar(_medir("I-V Diodo"))
+    assert np.allclose(por_curva["n"], 1.8, rtol=0.01)
+    assert np.allclose(por_curva["Is"], 1e-12, rtol=0.1)
+
+
+def test_mos_salida():
+    medida = _medir("Id-Vds MOS")
+    familia, por_curva = analizar(medida)
+    assert np.isclose(familia["Vth"], 2, atol=0.01)
+    assert np.isclose(familia["k"], 2, rtol=0.01)
+    # Las curvas por debajo de Vth no conducen
+    vgs = medida.datos[0, :medida.ncurvas, 0]
+    conducen = vgs > 2.1
+    assert np.isnan(por_curva["λ"][~conducen]).all()
+    assert np.allclose(por_curva["λ"][conducen], 0.02, rtol=0.05)
+    assert np.allclose(por_curva["gm"][conducen], 2*(vgs[conducen] - 2), rtol=0.01)
+    assert resumen(medida).count("\n") == medida.ncurvas
+
+
+def test_mos_transferencia():
+    medida = _medir("Id-Vgs MOS")
+    _, por_curva = analizar(medida)
+    assert np.allclose(por_curva["Vth"], 2, atol=0.02)
+    # La modulación de canal sube la k aparente con VDS
+    vds = medida.datos[0, :medida.ncurvas, 0]
+    assert np.allclose(por_curva["k"], 2*(1 + 0.02*vds), rtol=0.03)
+
+
+def test_bjt():
+    medida = _medir("Ic-Vce BJT", ModeloUSAL(beta_f=150))
+    _, por_curva = analizar(medida)
+    # La primera curva es IB = 0
+    assert np.isnan(por_curva["β"][0])
+    assert np.allclose(por_curva["β"][1:], 150, rtol=0.02)
@@ -0,0 +1,71 @@
+# test_catalogo.py
+"""Búsquedas en el catálogo de medidas"""
+
+import os
+import sys
+from datetime import date, datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adquisicion import Adquisicion
+from catalogo import Catalogo
+from medidas import Medida
+from parametros import parametros_por_defecto
+from simulador import BackendSimulado
+
+# Referencia, tipo y fecha de cada medida anotada
+MEDIDAS = (
+    ("Q1", "Ic-Vce BJT", datetime(2026, 3, 1, 9, 30)),
+    ("Q10", "Ic-Vce BJT", datetime(2026, 3, 1, 23, 59, 59)),
+    ("Q2", "Ic-Vce BJT", datetime(2026, 3, 2, 0, 0)),
+    ("QA", "Ic-Vce BJT", datetime(2026, 2, 28, 12, 0)),
+    ("Q", "I-V Diodo", datetime(2026, 3, 3, 8, 0)),
+    ("R1", "Ic-Vce BJT", datetime(2026, 3, 1, 10, 0)),
+    ("Q1", "I-V Diodo", datetime(2026, 3, 4, 8, 0)),
+)
+
+
+def _catalogo():
+    catalogo = Catalogo(":memory:")
+    for i, (ref, tipo, fecha) in enumerate(MEDIDAS):
+        medida = Medida(tipo, 1, 1, ref, 100.0, {})
+        medida.fecha = fecha
+        catalogo.registrar(medida, "m{}.csv".format(i))
+    return catalogo
+
+
+def _refs(filas):
+    return [(f["ref"], f["tipo"]) for f in filas]
+
+
+def test_buscar_por_prefijo_de_referencia():
+    with _catalogo() as catalogo:
+        # De la más reciente a la más antigua
+        assert _refs(catalogo.buscar(ref="Q1*")) == [
+            ("Q1", "I-V Diodo"), ("Q10", "Ic-Vce BJT"), ("Q1", "Ic-Vce BJT")]
+        assert _refs(catalogo.buscar(ref="Q1")) == [("Q1", "I-V Diodo"), ("Q1", "Ic-Vce BJT")]
+        assert len(catalogo.buscar(ref="Q*")) == 6
+        assert _refs(catalogo.buscar(ref="Q*", tipo="I-V Diodo")) == [("Q1", "I-V Diodo"), ("Q", "I-V Diodo")]
+        assert catalogo.buscar(ref="S*") == []
+        assert len(catalogo.buscar(ref="*")) == len(MEDIDAS)
+
+
+def test_buscar_por_fechas():
+    with _catalogo() as catalogo:
+        # hasta con solo una fecha incluye todo ese día
+        del_dia = catalogo.buscar(desde=date(2026, 3, 1), hasta=date(2026, 3, 1))
+        assert _refs(del_dia) == [("Q10", "Ic-Vce BJT"), ("R1", "Ic-Vce BJT"), ("Q1", "Ic-Vce BJT")]
+        # Con hora, los límites son exactos: desde incluido y hasta excluido
+        assert _refs(catalogo.buscar(desde=datetime(2026, 3, 1, 10, 0), hasta=datetime(2026, 3, 2))) == [
+            ("Q10", "Ic-Vce BJT"), ("R1", "Ic-Vce BJT")]
+        assert _refs(catalogo.buscar(ref="Q*", hasta=date(2026, 2, 28))) == [("QA", "Ic-Vce BJT")]
+        assert len(catalogo.buscar(desde=date(2026, 3, 2))) == 3
+        assert len(catalogo.buscar(limite=2)) == 2
+
+
+def test_medida_anota_dispositivo_y_serie():
+    parametros = parametros_por_defecto("I-V Diodo")
+    medida = Adquisicion(BackendSimulado(), "SimDAQ1", parametros, lambda *a: None).ejecutar()
+    with Catalogo(":memory:") as catalogo:
+        catalogo.registrar(medida, "m.csv")
+        fila, = catalogo.buscar()
+    assert (fila["dispositivo"], fila["serie"]) == ("SimDAQ1", "SIM-1")
@@ -0,0 +1,59 @@
+# test_comparacion.py
+"""Diezmado de las curvas densas por columnas de píxeles"""
+
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comparacion import diezmar
+
+
+def _comprobar(x, y, xmin, xmax, pixeles):
+    """Cada columna de píxeles conserva su mínimo, su máximo y sus extremos"""
+    indices = diezmar(x, y, xmin, xmax, pixeles)
+    assert np.array_equal(indices, np.unique(indices))
+    assert len(indices) <= 4*(pixeles + 2)
+    assert not np.isnan(x[indices]).any() and not np.isnan(y[indices]).any()
+    validos = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+    columnas = np.clip(np.floor((x[validos] - xmin)/(xmax - xmin)*pixeles), -1, pixeles)
+    elegidos = set(indices)
+    for columna in range(pixeles):
+        en_columna = validos[columnas == columna]
+        if len(en_columna) == 0:
+            continue
+        assert en_columna[0] in elegidos and en_columna[-1] in elegidos
+        assert y[en_columna].min() == y[indices[np.isin(indices, en_columna)]].min()
+        assert y[en_columna].max() == y[indices[np.isin(indices, en_columna)]].max()
+    return indices
+
+
+def test_curvas_cortas_enteras_sin_nan():
+    x = np.linspace(0, 1, 50)
+    y = np.sin(x)
+    y[[3, 10]] = np.nan
+    assert np.array_equal(diezmar(x, y, 0, 1, 100), np.delete(np.arange(50), [3, 10]))
+
+
+def test_barrido_creciente():
+    rng = np.random.default_rng(4)
+    x = np.linspace(0, 10, 100000)
+    y = np.exp(x/2) + rng.normal(0, 1, len(x))
+    y[rng.integers(0, len(x), 100)] = np.nan
+    for xmin, xmax, pixeles in ((0, 10, 800), (2.5, 3.5, 300), (9.9, 12, 50)):
+        indices = _comprobar(x, y, xmin, xmax, pixeles)
+        # La línea sigue hasta los bordes con un punto fuera a cada lado
+        if xmin > x[0]:
+            assert x[indices[0]] < xmin
+        if xmax < x[-1]:
+            assert x[indices[-1]] > xmax
+
+
+def test_barrido_desordenado():
+    rng = np.random.default_rng(5)
+    # Ida y vuelta, como en una serpentina, y un barrido adaptativo desordenado
+    ida = np.linspace(0, 5, 20000)
+    for x in (np.concatenate((ida, ida[::-1])), rng.permutation(ida)):
+        y = np.sin(3*x) + rng.normal(0, 0.1, len(x))
+        for xmin, xmax, pixeles in ((0, 5, 400), (1, 2, 100)):
+            _comprobar(x, y, xmin, xmax, pixeles)
@@ -0,0 +1,72 @@
+# test_limite_potencia.py
+"""Regresiones del límite de potencia con la placa simulada"""
+
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adquisicion import Adquisicion
+from parametros import parametros_por_defecto
+from simulador import BackendSimulado, ModeloUSAL
+
+
+def _familia_bjt(modelo, ib_max, paso):
+    parametros = parametros_por_defecto("Ic-Vce BJT")
+    parametros.update({'VGS Min': 0.0, 'VGS Max': float(ib_max), 'IncrementoVGS': float(paso)})
+    mensajes = []
+    medida = Adquisicion(BackendSimulado(modelo=modelo), "SimDAQ1", parametros,
+                         lambda texto, *color: color and mensajes.append(texto)).ejecutar()
+    return medida, mensajes
+
+
+def test_codo_de_saturacion_no_corta_las_curvas():
+    # IB = 80 y 100 µA llegan a 12.75 y 15.94 mA, por debajo de 16.67 mA
+    medida, mensajes = _familia_bjt(ModeloUSAL(), 100, 20)
+    assert list(medida.n[:medida.ncurvas]) == [51]*6
+    assert not [m for m in mensajes if "potencia" in m]
+
+
+def test_codo_de_saturacion_con_beta_alta():
+    # Con βF = 400, IB = 30 µA queda en unos 12.8 mA
+    medida, _ = _familia_bjt(ModeloUSAL(beta_f=400), 50, 10)
+    assert list(medida.n[:4]) == [51]*4
+
+
+def _consignas_excedidas(modelo, tipo, **cambios):
+    """Consignas aplicadas con más corriente de la disponible"""
+    backend = BackendSimulado(modelo=modelo)
+    sesion = backend.sesion("SimDAQ1")
+    escribir, barrido, excedidas = sesion.escribir, sesion.barrido, []
+
+    def comprobar(ao0, ao1):
+        ao0, ao1 = np.broadcast_arrays(ao0, ao1)
+        corriente = modelo.diodo(ao0) if tipo == "I-V Diodo" else modelo.mos(ao1, ao0)
+        excedidas.extend(zip(ao0[np.abs(corriente)*1000 > 500/30], ao1[np.abs(corriente)*1000 > 500/30]))
+
+    def vigilar(canal, valor):
+        escribir(canal, valor)
+        comprobar(sesion._valores_ao["ao0"], sesion._valores_ao["ao1"])
+
+    def vigilar_barrido(frecuencia, **canales):
+        comprobar(canales.get("ao0", sesion._valores_ao["ao0"]), canales.get("ao1", sesion._valores_ao["ao1"]))
+        return barrido(frecuencia, **canales)
+    sesion.escribir = vigilar
+    sesion.barrido = vigilar_barrido
+    parametros = parametros_por_defecto(tipo)
+    parametros.update(cambios)
+    Adquisicion(backend, "SimDAQ1", parametros, lambda *a: None).ejecutar()
+    return excedidas
+
+
+def test_mosfet_no_aplica_consignas_excesivas():
+    for orden in ("ascendente", "serpentina"):
+        assert _consignas_excedidas(ModeloUSAL(k=8e-3), "Id-Vds MOS", Orden=orden) == []
+
+
+def test_diodo_adaptativo_no_aplica_consignas_excesivas():
+    assert _consignas_excedidas(ModeloUSAL(), "I-V Diodo", **{'Barrido adaptativo': True}) == []
+
+
+def test_diodo_temporizado_por_hardware_no_aplica_consignas_excesivas():
+    assert _consignas_excedidas(ModeloUSAL(), "I-V Diodo", **{'Temporizado por hardware': True}) == []
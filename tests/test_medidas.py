@@ -0,0 +1,176 @@
+# test_medidas.py
+"""Estadística de las repeticiones, formatos de archivo y registro continuo"""
+
+import os
+import sys
+import warnings
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalogo import cargar
+from registros import registros_parciales, soltar
+from medidas import (Estadistica, Medida, RegistroContinuo, cargar_csv, cargar_npz,
+                     guardar_csv, guardar_npz, recuperar)
+
+
+def _repeticiones(rng, repeticiones=7, ncurvas=3, npuntos=20):
+    """Barridos repetidos, (repetición, columna, curva, punto), con NaN en
+    los puntos que no se midieron: curvas cortadas a distinta longitud en
+    cada repetición y algunas lecturas no válidas sueltas"""
+    valores = rng.normal(5, 2, (repeticiones, 3, ncurvas, npuntos))
+    for r in range(repeticiones):
+        for curva in range(ncurvas):
+            valores[r, :, curva, rng.integers(npuntos//2, npuntos + 1):] = np.nan
+    sueltos = rng.random((repeticiones, ncurvas, npuntos)) < 0.1
+    for r, curva, punto in zip(*np.nonzero(sueltos)):
+        valores[r, :, curva, punto] = np.nan
+    return valores
+
+
+def _acumular(valores):
+    _, ncolumnas, ncurvas, npuntos = valores.shape
+    estadistica = Estadistica(ncolumnas, ncurvas, npuntos)
+    for repeticion in valores:
+        for curva in range(ncurvas):
+            indices = np.flatnonzero(~np.isnan(repeticion[2, curva]))
+            estadistica.agregar(curva, indices, repeticion[:, curva, indices])
+    return estadistica
+
+
+def test_media_y_desviacion_como_numpy():
+    valores = _repeticiones(np.random.default_rng(1))
+    estadistica = _acumular(valores)
+    n = (~np.isnan(valores[:, 2])).sum(axis=0)
+    assert np.array_equal(estadistica.n, n)
+    medidos = n > 0
+    with warnings.catch_warnings():
+        # Las consignas que no se midieron nunca dan avisos de numpy
+        warnings.simplefilter('ignore', RuntimeWarning)
+        media = np.nanmean(valores, axis=0)
+        desviacion = np.nanstd(valores, axis=0, ddof=1)
+        minimo, maximo = np.nanmin(valores, axis=0), np.nanmax(valores, axis=0)
+    assert np.allclose(estadistica.media[:, medidos], media[:, medidos])
+    assert np.allclose(estadistica.minimo[:, medidos], minimo[:, medidos])
+    assert np.allclose(estadistica.maximo[:, medidos], maximo[:, medidos])
+    varios = n > 1
+    assert np.allclose(np.sqrt(estadistica.varianza[:, varios]), desviacion[:, varios])
+    assert np.isnan(estadistica.varianza[:, ~varios]).all()
+
+
+def test_medida_de_la_media():
+    valores = _repeticiones(np.random.default_rng(2))
+    estadistica = _acumular(valores)
+    medida = estadistica.medida("Id-Vds MOS")
+    for curva in range(valores.shape[2]):
+        medidos = np.flatnonzero(estadistica.n[curva])
+        assert medida.n[curva] == len(medidos)
+        assert np.allclose(medida.curva(curva), estadistica.media[:, curva, medidos])
+        n = estadistica.n[curva, medidos]
+        assert np.array_equal(medida.estadistica[0, curva, :len(medidos)], n)
+        desviacion = np.sqrt(estadistica.varianza[2, curva, medidos])
+        incertidumbre = medida.incertidumbre[curva, :len(medidos)]
+        assert np.allclose(incertidumbre, desviacion/np.sqrt(n), equal_nan=True)
+
+
+def _medida_de_prueba(incertidumbre=True, estadistica=True):
+    """Familia Id-Vds con curvas de distinta longitud"""
+    rng = np.random.default_rng(3)
+    parametros = {'Tipo de medida': "Id-Vds MOS", 'VGS Min': 0.0, 'Dispositivo': "SimDAQ1"}
+    medida = Medida("Id-Vds MOS", 3, 10, "M1", 100.0, parametros, incertidumbre=incertidumbre)
+    if estadistica:
+        medida.estadistica = np.full((4, 3, 10), np.nan)
+    for curva, n in enumerate((10, 7, 4)):
+        for punto in range(n):
+            medida.agregar(curva, curva*0.5, punto*0.2, rng.uniform(0, 10),
+                           incertidumbre=rng.uniform(0, 0.1))
+            if estadistica:
+                medida.estadistica[:, curva, punto] = (5, *rng.uniform(0, 1, 3))
+    medida.terminar()
+    return medida
+
+
+def _comparar(leida, medida, decimales=None):
+    assert leida.tipo == medida.tipo and leida.ref == medida.ref
+    assert leida.columnas == medida.columnas
+    assert list(leida.n[:leida.ncurvas]) == list(medida.n[:medida.ncurvas])
+    cerca = np.array_equal if decimales is None else (
+        lambda a, b: np.allclose(a, b, atol=10**-decimales/2 + 1e-12))
+    for curva in range(medida.ncurvas):
+        n = medida.n[curva]
+        assert cerca(leida.curva(curva), medida.curva(curva))
+        if medida.incertidumbre is None:
+            assert leida.incertidumbre is None
+        else:
+            assert cerca(leida.incertidumbre[curva, :n], medida.incertidumbre[curva, :n])
+        if medida.estadistica is None:
+            assert leida.estadistica is None
+        else:
+            assert cerca(leida.estadistica[:, curva, :n], medida.estadistica[:, curva, :n])
+
+
+def test_npz_conserva_todo(tmp_path):
+    for opciones in ({}, {'incertidumbre': False, 'estadistica': False}):
+        medida = _medida_de_prueba(**opciones)
+        archivo = str(tmp_path / "m.npz")
+        guardar_npz(medida, archivo)
+        leida = cargar_npz(archivo)
+        _comparar(leida, medida)
+        assert leida.parametros == medida.parametros
+        assert leida.resistencia == medida.resistencia
+        assert leida.fecha == medida.fecha and leida.fin == medida.fin
+        assert np.array_equal(leida.tiempos[:, :10], medida.tiempos[:, :10], equal_nan=True)
+
+
+def test_csv_conserva_columnas_con_cuatro_decimales(tmp_path):
+    for opciones in ({}, {'estadistica': False}, {'incertidumbre': False, 'estadistica': False}):
+        medida = _medida_de_prueba(**opciones)
+        archivo = str(tmp_path / "m.csv")
+        guardar_csv(medida, archivo)
+        leida = cargar_csv(archivo)
+        _comparar(leida, medida, decimales=4)
+        # El CSV de siempre no tiene sitio para los parámetros
+        assert leida.parametros == {}
+
+
+def test_cargar_elige_el_formato_por_la_extension(tmp_path):
+    medida = _medida_de_prueba()
+    for extension, guardar in ((".npz", guardar_npz), (".csv", guardar_csv)):
+        archivo = str(tmp_path / ("m" + extension))
+        guardar(medida, archivo)
+        _comparar(cargar(archivo), medida, decimales=None if extension == ".npz" else 4)
+
+
+def test_recuperar_registro_cortado_a_media_curva(tmp_path):
+    medida = _medida_de_prueba(estadistica=False)
+    registro = RegistroContinuo(medida, directorio=str(tmp_path))
+    for curva in range(medida.ncurvas):
+        for punto in range(medida.n[curva]):
+            registro.agregar(curva, [*medida.datos[:, curva, punto],
+                                     medida.incertidumbre[curva, punto]])
+    registro.sincronizar()
+    with open(registro.filename, 'rb') as a_file:
+        lineas = a_file.read().split(b"\n")
+    # Cabecera, la primera curva entera, 3 puntos de la segunda y media línea
+    cortado = b"\n".join(lineas[:2 + 10 + 3]) + b"\n" + lineas[2 + 10 + 3][:9]
+    with open(registro.filename, 'wb') as a_file:
+        a_file.write(cortado)
+    leida = recuperar(registro.filename)
+    assert leida.tipo == medida.tipo and leida.ref == medida.ref
+    assert leida.parametros == medida.parametros
+    assert list(leida.n[:2]) == [10, 3] and leida.n[2] == 0
+    assert np.array_equal(leida.curva(0), medida.curva(0))
+    assert np.array_equal(leida.curva(1), medida.curva(1)[:, :3])
+    assert np.array_equal(leida.incertidumbre[1, :3], medida.incertidumbre[1, :3])
+
+
+def test_solo_se_recuperan_los_registros_abandonados(tmp_path):
+    escribiendo = RegistroContinuo(_medida_de_prueba(), directorio=str(tmp_path))
+    abandonado = RegistroContinuo(_medida_de_prueba(), directorio=str(tmp_path))
+    # Como si su proceso hubiera terminado sin cerrarlo
+    soltar(abandonado._cerrojo)
+    assert registros_parciales(str(tmp_path)) == [abandonado.filename]
+    assert not os.path.exists(abandonado.filename + ".lock")
+    escribiendo.cerrar()
+    assert registros_parciales(str(tmp_path)) == [abandonado.filename]
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        os.path.basename(f) for f in (escribiendo.filename, abandonado.filename))